@@ -0,0 +1,362 @@
+import logging
+from match_statistics import EloRatings, calculate_match_score, calculate_match_points, set_scoring_rules
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_TABLES = ("PlayerStatsAgg", "CombinationStatsAgg", "PartStatsAgg", "StadiumStatsAgg", "CombinationTypeMatchupAgg")
+
+# One row per (match, side) straight from Matches: side {n}'s player,
+# combination and launcher, side {o} as the opponent, and side {n}'s result.
+_SIDE_SQL = """
+    SELECT m.match_id, {n} AS side, m.tournament_id, m.stadium_id, m.end_time, m.finish_type,
+           m.player{n}_id AS player_id, m.player{n}_combination_id AS combination_id, m.player{n}_launcher_id AS launcher_id,
+           m.player{o}_id AS opponent_player_id, m.player{o}_combination_id AS opponent_combination_id,
+           CASE WHEN m.draw = 1 THEN 0 WHEN m.winner_id = m.player{n}_id THEN 1 ELSE 0 END AS won,
+           CASE WHEN m.draw = 1 THEN 0 WHEN m.winner_id != m.player{n}_id THEN 1 ELSE 0 END AS lost,
+           CASE WHEN m.draw = 1 THEN 1 ELSE 0 END AS drawn,
+           CASE WHEN m.draw = 1 THEN 0 WHEN m.winner_id = m.player{n}_id THEN m.points ELSE 0 END AS points
+    FROM Matches m
+"""
+
+MATCH_SIDES_COLUMNS = (
+    "match_id", "side", "tournament_id", "stadium_id", "end_time", "finish_type",
+    "player_id", "combination_id", "launcher_id", "opponent_player_id", "opponent_combination_id",
+    "won", "lost", "drawn", "points",
+)
+
+# Fills MatchSides from Matches; used by the backfill and by migration 2.
+BACKFILL_MATCH_SIDES_SQL = (
+    f"INSERT IGNORE INTO MatchSides ({', '.join(MATCH_SIDES_COLUMNS)}) "
+    + _SIDE_SQL.format(n=1, o=2) + " UNION ALL " + _SIDE_SQL.format(n=2, o=1)
+)
+
+# One row per (match, side), read from the maintained MatchSides table so
+# per-participant filters are plain indexed equality lookups.
+MATCH_SIDES_SQL = """
+    SELECT match_id, tournament_id, end_time, finish_type, player_id, combination_id, won, lost, drawn, points
+    FROM MatchSides
+"""
+
+_COUNTER_UPDATE = """
+    ON DUPLICATE KEY UPDATE
+        matches_played = matches_played + VALUES(matches_played),
+        wins = wins + VALUES(wins),
+        losses = losses + VALUES(losses),
+        draws = draws + VALUES(draws),
+        points = points + VALUES(points)
+"""
+
+def match_side_results(match):
+    """Returns (player_id, combination_id, won, lost, drawn, points) for both sides of a match dict."""
+    match_points = match.get("points")
+    if match_points is None:
+        match_points = calculate_match_points(match.get("finish_type"), match.get("winner_id"), match.get("draw"))
+    sides = []
+    for n in (1, 2):
+        player_id = match.get(f"player{n}_id")
+        won = lost = drawn = points = 0
+        if match.get("draw"):
+            drawn = 1
+        elif match.get("winner_id") is not None and match["winner_id"] == player_id:
+            won = 1
+            points = match_points
+        elif match.get("winner_id") is not None:
+            lost = 1
+        sides.append((player_id, match.get(f"player{n}_combination_id"), won, lost, drawn, points))
+    return sides
+
+def insert_match_sides(cursor, match):
+    """Writes the two MatchSides rows for one newly inserted match dict (which must carry match_id)."""
+    rows = []
+    for n, (player_id, combination_id, won, lost, drawn, points) in enumerate(match_side_results(match), start=1):
+        o = 3 - n
+        rows.append((
+            match["match_id"], n, match.get("tournament_id"), match.get("stadium_id"), match.get("end_time"),
+            match.get("finish_type"), player_id, combination_id, match.get(f"player{n}_launcher_id"),
+            match.get(f"player{o}_id"), match.get(f"player{o}_combination_id"), won, lost, drawn, points,
+        ))
+    cursor.executemany(
+        f"INSERT INTO MatchSides ({', '.join(MATCH_SIDES_COLUMNS)}) VALUES ({', '.join(['%s'] * len(MATCH_SIDES_COLUMNS))})",
+        rows,
+    )
+
+def backfill_match_sides(cursor):
+    """Rebuilds MatchSides from the full Matches history. Returns the number of rows written."""
+    cursor.execute("DELETE FROM MatchSides")
+    cursor.execute(BACKFILL_MATCH_SIDES_SQL)
+    return cursor.rowcount
+
+def apply_match_to_aggregates(cursor, match):
+    """Adds one newly inserted match to MatchSides and every aggregate table.
+
+    Runs on the caller's cursor so the deltas commit (or roll back) in the same
+    transaction as the match insert. Each statement touches a fixed number of
+    rows, independent of how many matches already exist.
+    """
+    insert_match_sides(cursor, match)
+    for player_id, combination_id, won, lost, drawn, points in match_side_results(match):
+        counters = (1, won, lost, drawn, points)
+        if player_id is not None:
+            cursor.execute(
+                "INSERT INTO PlayerStatsAgg (player_id, matches_played, wins, losses, draws, points) "
+                "VALUES (%s, %s, %s, %s, %s, %s)" + _COUNTER_UPDATE,
+                (player_id, *counters),
+            )
+        if combination_id is not None:
+            cursor.execute(
+                "INSERT INTO CombinationStatsAgg (combination_id, matches_played, wins, losses, draws, points) "
+                "VALUES (%s, %s, %s, %s, %s, %s)" + _COUNTER_UPDATE,
+                (combination_id, *counters),
+            )
+            cursor.execute(
+                """
+                INSERT INTO PartStatsAgg (part_type, part_id, matches_played, wins, losses, draws, points)
+                SELECT * FROM (
+                    SELECT 'Blade' AS part_type, blade_id AS part_id, %s AS matches_played, %s AS wins, %s AS losses, %s AS draws, %s AS points
+                    FROM BeybladeCombinations WHERE combination_id = %s AND blade_id IS NOT NULL
+                    UNION ALL
+                    SELECT 'Ratchet', ratchet_id, %s, %s, %s, %s, %s
+                    FROM BeybladeCombinations WHERE combination_id = %s AND ratchet_id IS NOT NULL
+                    UNION ALL
+                    SELECT 'Bit', bit_id, %s, %s, %s, %s, %s
+                    FROM BeybladeCombinations WHERE combination_id = %s AND bit_id IS NOT NULL
+                ) AS parts
+                """ + _COUNTER_UPDATE,
+                (*counters, combination_id) * 3,
+            )
+
+    apply_match_to_elo_ratings(cursor, match)
+    apply_match_to_combination_types(cursor, match)
+
+    if match.get("stadium_id") is not None:
+        finish_type = match.get("finish_type")
+        cursor.execute(
+            """
+            INSERT INTO StadiumStatsAgg (stadium_id, matches_played, draws, survivor_finishes, ko_finishes, burst_finishes, extreme_finishes)
+            VALUES (%s, 1, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                matches_played = matches_played + 1,
+                draws = draws + VALUES(draws),
+                survivor_finishes = survivor_finishes + VALUES(survivor_finishes),
+                ko_finishes = ko_finishes + VALUES(ko_finishes),
+                burst_finishes = burst_finishes + VALUES(burst_finishes),
+                extreme_finishes = extreme_finishes + VALUES(extreme_finishes)
+            """,
+            (
+                match["stadium_id"],
+                1 if match.get("draw") else 0,
+                int(finish_type == "Survivor"),
+                int(finish_type == "KO"),
+                int(finish_type == "Burst"),
+                int(finish_type == "Extreme"),
+            ),
+        )
+
+def apply_match_to_elo_ratings(cursor, match):
+    """Updates the stored player and combination ratings for one new match.
+
+    ELO depends on match order, and replay_elo_ratings applies matches in
+    (end_time, match_id) order. When the new match sorts last, which is
+    the usual case for the add_match route, the current ratings of both sides are
+    locked and loaded into EloRatings, and the match is applied on top. The
+    result is what a replay would give. A back-dated match changes every later
+    update, so in that case the ratings are replayed from the full history
+    instead. Expects the aggregate rows for both sides to exist already, which
+    apply_match_to_aggregates guarantees by upserting them first.
+    """
+    if calculate_match_score(match.get("player1_id"), match.get("winner_id"), match.get("draw")) is None:
+        return
+    if not is_latest_match(cursor, match):
+        logger.info(f"Match {match['match_id']} was recorded out of end_time order; replaying ELO ratings")
+        store_elo_ratings(cursor, replay_elo_ratings(cursor))
+        return
+
+    ratings = EloRatings()
+    sides = (
+        ("PlayerStatsAgg", "player_id", ratings.players, match.get("player1_id"), match.get("player2_id")),
+        ("CombinationStatsAgg", "combination_id", ratings.combinations, match.get("player1_combination_id"), match.get("player2_combination_id")),
+    )
+    for table, id_column, stored, id1, id2 in sides:
+        if id1 is None or id2 is None:
+            continue
+        cursor.execute(f"SELECT {id_column}, elo_rating FROM {table} WHERE {id_column} IN (%s, %s) FOR UPDATE", (id1, id2))
+        stored.update(cursor.fetchall())
+
+    ratings.record(
+        match.get("player1_id"), match.get("player2_id"),
+        match.get("player1_combination_id"), match.get("player2_combination_id"),
+        match.get("winner_id"), match.get("draw"),
+    )
+    store_elo_ratings(cursor, ratings)
+
+def is_latest_match(cursor, match):
+    """Returns True if no other match sorts after this one in (end_time, match_id) order, the order replays use."""
+    end_time = match.get("end_time")
+    if end_time is None:
+        # NULL end_times sort first, so any match with a time (or a later id) comes after
+        cursor.execute("SELECT 1 FROM Matches WHERE end_time IS NOT NULL OR match_id > %s LIMIT 1", (match["match_id"],))
+    else:
+        cursor.execute(
+            "SELECT 1 FROM Matches WHERE end_time > %s OR (end_time = %s AND match_id > %s) LIMIT 1",
+            (end_time, end_time, match["match_id"]),
+        )
+    return cursor.fetchone() is None
+
+def store_elo_ratings(cursor, ratings):
+    """Writes the ratings held by an EloRatings to PlayerStatsAgg and CombinationStatsAgg."""
+    if ratings.players:
+        cursor.executemany(
+            "UPDATE PlayerStatsAgg SET elo_rating = %s WHERE player_id = %s",
+            [(rating, player_id) for player_id, rating in ratings.players.items()],
+        )
+    if ratings.combinations:
+        cursor.executemany(
+            "UPDATE CombinationStatsAgg SET elo_rating = %s WHERE combination_id = %s",
+            [(rating, combination_id) for combination_id, rating in ratings.combinations.items()],
+        )
+
+def apply_match_to_combination_types(cursor, match):
+    """Counts one new match in the type-vs-type matchup table.
+
+    The winning side is resolved from winner_id, and the pairing is stored
+    sorted by type name so (Attack, Defense) and (Defense, Attack) share a row.
+    A combination without a type counts as 'Unknown'.
+    """
+    combination1_id, combination2_id = match.get("player1_combination_id"), match.get("player2_combination_id")
+    cursor.execute(
+        "SELECT combination_id, combination_type FROM BeybladeCombinations WHERE combination_id IN (%s, %s)",
+        (combination1_id, combination2_id),
+    )
+    types = dict(cursor.fetchall())
+    type1 = types.get(combination1_id) or "Unknown"
+    type2 = types.get(combination2_id) or "Unknown"
+
+    winner_type = None
+    if not match.get("draw") and match.get("winner_id") is not None:
+        winner_type = type1 if match["winner_id"] == match.get("player1_id") else type2
+
+    low, high = sorted((type1, type2))
+    cursor.execute(
+        """
+        INSERT INTO CombinationTypeMatchupAgg (type1, type2, matches_played, type1_wins, type2_wins)
+        VALUES (%s, %s, 1, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            matches_played = matches_played + 1,
+            type1_wins = type1_wins + VALUES(type1_wins),
+            type2_wins = type2_wins + VALUES(type2_wins)
+        """,
+        (low, high, int(winner_type == low), int(winner_type == high and low != high)),
+    )
+
+def replay_elo_ratings(cursor, batch_size=5000):
+    """Recomputes every rating by streaming Matches in end_time order, in batches of plain tuples."""
+    ratings = EloRatings()
+    cursor.execute("""
+        SELECT player1_id, player2_id, player1_combination_id, player2_combination_id, winner_id, draw
+        FROM Matches
+        ORDER BY end_time, match_id
+    """)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            ratings.record(*row)
+    return ratings
+
+def bump_stored_match_generation(cursor):
+    """Records in DataGenerations that match data changed, for the web processes to notice (see sync_match_generation)."""
+    cursor.execute("UPDATE DataGenerations SET generation = generation + 1 WHERE name = 'matches'")
+
+def load_stored_match_generation(cursor):
+    """Returns the match generation stored in DataGenerations."""
+    cursor.execute("SELECT generation FROM DataGenerations WHERE name = 'matches'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def load_scoring_rules(cursor):
+    """Loads the ScoringRules table into FINISH_TYPE_POINTS, which every Python-side points calculation reads."""
+    cursor.execute("SELECT finish_type, points FROM ScoringRules")
+    rules = dict(cursor.fetchall())
+    if rules:
+        set_scoring_rules(rules)
+    return rules
+
+def recompute_match_points(cursor):
+    """Rewrites Matches.points from the current ScoringRules (after a rule change). Returns the rows changed.
+
+    MatchSides and the aggregate tables carry copies of the points, so follow
+    this with rebuild_aggregates().
+    """
+    cursor.execute("""
+        UPDATE Matches m
+        LEFT JOIN ScoringRules r ON r.finish_type = m.finish_type
+        SET m.points = CASE WHEN m.draw = 1 OR m.winner_id IS NULL THEN 0 ELSE COALESCE(r.points, 0) END
+    """)
+    return cursor.rowcount
+
+def rebuild_aggregates(cursor):
+    """Recomputes MatchSides and every aggregate table from the full Matches history (for backfills)."""
+    backfill_match_sides(cursor)
+    for table in AGGREGATE_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+
+    cursor.execute(f"""
+        INSERT INTO PlayerStatsAgg (player_id, matches_played, wins, losses, draws, points)
+        SELECT player_id, COUNT(*), SUM(won), SUM(lost), SUM(drawn), SUM(points)
+        FROM ({MATCH_SIDES_SQL}) AS sides
+        WHERE player_id IS NOT NULL
+        GROUP BY player_id
+    """)
+    cursor.execute(f"""
+        INSERT INTO CombinationStatsAgg (combination_id, matches_played, wins, losses, draws, points)
+        SELECT combination_id, COUNT(*), SUM(won), SUM(lost), SUM(drawn), SUM(points)
+        FROM ({MATCH_SIDES_SQL}) AS sides
+        WHERE combination_id IS NOT NULL
+        GROUP BY combination_id
+    """)
+    for part_type, part_column in (("Blade", "blade_id"), ("Ratchet", "ratchet_id"), ("Bit", "bit_id")):
+        cursor.execute(f"""
+            INSERT INTO PartStatsAgg (part_type, part_id, matches_played, wins, losses, draws, points)
+            SELECT '{part_type}', bc.{part_column}, COUNT(*), SUM(sides.won), SUM(sides.lost), SUM(sides.drawn), SUM(sides.points)
+            FROM ({MATCH_SIDES_SQL}) AS sides
+            JOIN BeybladeCombinations bc ON bc.combination_id = sides.combination_id
+            WHERE bc.{part_column} IS NOT NULL
+            GROUP BY bc.{part_column}
+        """)
+    cursor.execute("""
+        INSERT INTO StadiumStatsAgg (stadium_id, matches_played, draws, survivor_finishes, ko_finishes, burst_finishes, extreme_finishes)
+        SELECT stadium_id, COUNT(*),
+               SUM(CASE WHEN draw = 1 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN finish_type = 'Survivor' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN finish_type = 'KO' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN finish_type = 'Burst' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN finish_type = 'Extreme' THEN 1 ELSE 0 END)
+        FROM Matches
+        WHERE stadium_id IS NOT NULL
+        GROUP BY stadium_id
+    """)
+    cursor.execute("""
+        INSERT INTO CombinationTypeMatchupAgg (type1, type2, matches_played, type1_wins, type2_wins)
+        SELECT type1, type2, COUNT(*),
+               SUM(CASE WHEN winner_type = type1 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN winner_type = type2 AND type1 != type2 THEN 1 ELSE 0 END)
+        FROM (
+            SELECT LEAST(side1_type, side2_type) AS type1, GREATEST(side1_type, side2_type) AS type2,
+                   CASE WHEN draw = 1 OR winner_id IS NULL THEN NULL
+                        WHEN winner_id = player1_id THEN side1_type
+                        ELSE side2_type END AS winner_type
+            FROM (
+                SELECT m.draw, m.winner_id, m.player1_id,
+                       COALESCE(CAST(bc1.combination_type AS CHAR), 'Unknown') AS side1_type,
+                       COALESCE(CAST(bc2.combination_type AS CHAR), 'Unknown') AS side2_type
+                FROM Matches m
+                LEFT JOIN BeybladeCombinations bc1 ON bc1.combination_id = m.player1_combination_id
+                LEFT JOIN BeybladeCombinations bc2 ON bc2.combination_id = m.player2_combination_id
+            ) AS typed
+        ) AS pairings
+        GROUP BY type1, type2
+    """)
+
+    store_elo_ratings(cursor, replay_elo_ratings(cursor))
+    logger.info("Statistics aggregates rebuilt")
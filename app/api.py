@@ -1,7 +1,7 @@
-import threading
-import time
 import json
-from flask import Flask, jsonify, request, Blueprint
+import logging
+from dataclasses import asdict
+from flask import jsonify, request, Blueprint, g, make_response
 import sqlalchemy as sa
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import and_, or_, case, func, desc, cast, Float
@@ -10,20 +10,51 @@ from sqlalchemy import and_, or_, case, func, desc, cast, Float
 from db import SessionLocal, engine
 
 # Import statistics module
-from statistics import *
+from match_statistics import *
+from part_statistics import compute_part_stats, PART_COLUMNS
 
-from app import publish_mqtt_message, MQTT_TOPIC_PREFIX, client, connected_flag
+from serialization import encode_json, json_response
+from app import publish_mqtt_message, publish_discovery_once, MQTT_TOPIC_PREFIX, MQTT_DISCOVERY_PREFIX, MQTT_BULK_MODE
+from app import API_CACHE_MAX_AGE, cache_validators, is_not_modified, set_cache_headers
 
 # Import models
-from models import Player, BeybladeCombination, Tournament, Stadium, StadiumClass, Launcher, LauncherClass, Match, TournamentParticipant
+from models import Player, BeybladeCombination, Tournament, Stadium, StadiumClass, Launcher, LauncherClass, Match, TournamentParticipant, CombinationStatsAgg
 
-# Define the Blueprint object
-api = Blueprint('api', __name__)
+logger = logging.getLogger(__name__)
+
+def publish_and_respond(topic, data):
+    """Encodes data once and sends the same bytes to MQTT and back as the HTTP response."""
+    payload = encode_json(data)
+    publish_mqtt_message(topic, payload)
+    return json_response(payload)
 
-# Create Flask application instance
-app = Flask(__name__)
+# Every /api view lives on this blueprint, which app.py registers under /api
+api = Blueprint('api', __name__)
 
-@app.route("/api/players")
+# Every /api response is built from match data plus these reference tables, so
+# its validators change exactly when one of them does.
+API_CACHE_TABLES = ("Players", "BeybladeCombinations", "Blades", "Ratchets", "Bits", "Launchers", "Stadiums", "Tournaments")
+
+@api.before_request
+def answer_conditional_request():
+    """Answers a conditional GET with 304 before the view (and its queries) run."""
+    if request.method != "GET":
+        return None
+    etag, last_modified = cache_validators(API_CACHE_TABLES)
+    g.cache_validators = (etag, last_modified)
+    if is_not_modified(etag, last_modified):
+        return set_cache_headers(make_response("", 304), etag, last_modified, API_CACHE_MAX_AGE)
+    return None
+
+@api.after_request
+def add_cache_headers(response):
+    """Tags successful GET responses with the validators computed before the view ran."""
+    validators = g.pop("cache_validators", None)
+    if validators is None or response.status_code != 200:
+        return response
+    return set_cache_headers(response, *validators, API_CACHE_MAX_AGE)
+
+@api.route("/players")
 def get_players():
     db = SessionLocal()
     players = db.query(Player).all()
@@ -34,46 +65,68 @@ def get_players():
             "player_name": player.player_name
         })
     db.close()
-    players_data = jsonify(player_list)
-    publish_mqtt_message("beyblade/players", players_data)
-    return players_data
-
-@app.route("/api/part/<int:part_id>/usage_frequency")
-def get_part_usage_frequency(part_id):
-    usage_frequency = calculate_part_usage_frequency(part_id)
-    data = jsonify({"usage_frequency": usage_frequency})
-    publish_mqtt_message(f"beyblade/parts/{part_id}/usage_frequency", data)
-    return data
-
-@app.route("/api/part/<int:part_id>/win_rate")
-def get_part_win_rate(part_id):
-    win_rate = calculate_part_win_rate(part_id)
-    data = jsonify({"win_rate": win_rate})
-    publish_mqtt_message(f"beyblade/parts/{part_id}/win_rate", data)
-    return data
-
-@app.route("/api/part/<int:part_id>/most_common_combinations")
-def get_part_most_common_combinations(part_id):
-    common_combinations = calculate_most_common_combinations_with_part(part_id)
-    data = jsonify({"most_common_combinations": common_combinations})
-    publish_mqtt_message(f"beyblade/parts/{part_id}/most_common_combinations", data)
-    return data
-
-@app.route("/api/part/<int:part_id>/total_points")
-def get_part_total_points(part_id):
-    total_points = calculate_part_total_points(part_id)
-    data = jsonify({"total_points": total_points})
-    publish_mqtt_message(f"beyblade/parts/{part_id}/total_points", data)
-    return data
-
-@app.route("/api/part/<int:part_id>/average_points_per_match")
-def get_part_average_points_per_match(part_id):
-    average_points = calculate_part_average_points_per_match(part_id)
-    data = jsonify({"average_points_per_match": average_points})
-    publish_mqtt_message(f"beyblade/parts/{part_id}/average_points_per_match", data)
-    return data
-
-@app.route("/api/player/<int:player_id>")
+    return publish_and_respond("beyblade/players", player_list)
+
+def load_part_stats(part_type, part_id):
+    """Returns one part's PartStats (optionally for ?tournament_id=), or None if the part type or part is unknown."""
+    if part_type not in PART_COLUMNS:
+        return None
+    tournament_id = request.args.get("tournament_id", type=int)
+    db = SessionLocal()
+    try:
+        return compute_part_stats(db, part_type, tournament_id, part_ids=[part_id]).get(part_id)
+    finally:
+        db.close()
+
+def part_stat_response(part_type, part_id, field):
+    """Responds with (and publishes) one PartStats field for a single part."""
+    part_stats = load_part_stats(part_type, part_id)
+    if part_stats is None:
+        return jsonify({"error": "Part not found"}), 404
+    return publish_and_respond(f"beyblade/parts/{part_type.lower()}/{part_id}/{field}", {field: getattr(part_stats, field)})
+
+@api.route("/part/<string:part_type>/<int:part_id>/usage_frequency")
+def get_part_usage_frequency(part_type, part_id):
+    return part_stat_response(part_type, part_id, "usage_frequency")
+
+@api.route("/part/<string:part_type>/<int:part_id>/win_rate")
+def get_part_win_rate(part_type, part_id):
+    return part_stat_response(part_type, part_id, "win_rate")
+
+@api.route("/part/<string:part_type>/<int:part_id>/most_common_combinations")
+def get_part_most_common_combinations(part_type, part_id):
+    if part_type not in PART_COLUMNS:
+        return jsonify({"error": "Unknown part type"}), 404
+    db = SessionLocal()
+    try:
+        combinations = [
+            {"combination_id": combination.combination_id, "combination_name": combination.combination_name}
+            for combination in calculate_most_common_combinations_with_part(db, part_type, part_id)
+        ]
+    finally:
+        db.close()
+    return publish_and_respond(
+        f"beyblade/parts/{part_type.lower()}/{part_id}/most_common_combinations", {"most_common_combinations": combinations}
+    )
+
+@api.route("/part/<string:part_type>/<int:part_id>/total_points")
+def get_part_total_points(part_type, part_id):
+    return part_stat_response(part_type, part_id, "total_points")
+
+@api.route("/part/<string:part_type>/<int:part_id>/average_points_per_match")
+def get_part_average_points_per_match(part_type, part_id):
+    return part_stat_response(part_type, part_id, "average_points_per_match")
+
+@api.route("/parts/<string:part_type>/stats")
+def get_parts_stats(part_type):
+    if part_type not in PART_COLUMNS:
+        return jsonify({"error": "Unknown part type"}), 404
+    db = SessionLocal()
+    part_stats = compute_part_stats(db, part_type)
+    db.close()
+    return publish_and_respond(f"beyblade/parts/{part_type.lower()}/stats", [asdict(stats) for stats in part_stats.values()])
+
+@api.route("/player/<int:player_id>")
 def get_player(player_id):
     db = SessionLocal()
     player = db.query(Player).filter(Player.player_id == player_id).first()
@@ -84,21 +137,12 @@ def get_player(player_id):
     stats = {
         "player_id": player.player_id,
         "player_name": player.player_name,
-        "matches_played": calculate_player_matches_played(player_id),
-        "win_percentage": calculate_player_win_percentage(player_id),
-        "wins": calculate_player_wins(player_id),
-        "losses": calculate_player_losses(player_id),
-        "draws": calculate_player_draws(player_id),
-        "most_common_winning_finish_type": calculate_player_most_common_winning_finish_type(player_id),
-        "win_streak": calculate_player_win_streak(player_id),
-        "loss_streak": calculate_player_loss_streak(player_id),
+        **asdict(calculate_player_aggregate(db, player_id)),
     }
     db.close()
-    player_stats = jsonify(stats)
-    publish_mqtt_message(f"beyblade/players/{player_id}/stats", player_stats)
-    return player_stats
+    return publish_and_respond(f"beyblade/players/{player_id}/stats", stats)
 
-@app.route("/api/combinations")
+@api.route("/combinations")
 def get_combinations():
     db = SessionLocal()
     combinations = db.query(BeybladeCombination).all()
@@ -109,12 +153,10 @@ def get_combinations():
             "combination_name": combination.combination_name
         })
     db.close()
-    combinations_data = jsonify(combination_list)
-    publish_mqtt_message("beyblade/combinations", combinations_data)
-    return combinations_data
+    return publish_and_respond("beyblade/combinations", combination_list)
 
 
-@app.route("/api/combination/<int:combination_id>")
+@api.route("/combination/<int:combination_id>")
 def get_combination(combination_id):
     db = SessionLocal()
     combination = db.query(BeybladeCombination).filter(BeybladeCombination.combination_id == combination_id).first()
@@ -122,30 +164,19 @@ def get_combination(combination_id):
         db.close()
         return jsonify({"error": "Combination not found"}), 404
 
+    elo_rating = db.query(CombinationStatsAgg.elo_rating).filter(CombinationStatsAgg.combination_id == combination_id).scalar()
+    combination_stats = build_combination_matchup_matrix(db, combination_id=combination_id).stats(
+        combination_id, elo_rating if elo_rating is not None else DEFAULT_ELO_RATING
+    )
     stats = {
         "combination_id": combination.combination_id,
         "combination_name": combination.combination_name,
-        "matches_played": calculate_combination_matches_played(combination_id),
-        "win_percentage": calculate_combination_win_percentage(combination_id),
-        "wins": calculate_combination_wins(combination_id),
-        "draws": calculate_combination_draws(combination_id),
-        "non_loss_percentage": calculate_combination_non_loss_percentage(combination_id),
-        "most_common_winning_finish_type": calculate_combination_most_common_winning_finish_type(combination_id),
-        "burst_rate": calculate_combination_burst_rate(combination_id),
-        "most_common_loss_type": calculate_combination_most_common_loss_type(combination_id),
-        "most_common_opponent": calculate_combination_most_common_opponent(combination_id),
-        "best_matchups": calculate_combination_best_matchups(combination_id),
-        "worst_matchups": calculate_combination_worst_matchups(combination_id),
-        "total_points": calculate_combination_total_points(combination_id),
-        "average_points_per_match": calculate_combination_average_points_per_match(combination_id),
-        "elo_rating": calculate_combination_elo_rating(combination_id)
+        **asdict(combination_stats),
     }
     db.close()
-    combination_stats = jsonify(stats)
-    publish_mqtt_message(f"beyblade/combinations/{combination_id}/stats", combination_stats)
-    return combination_stats
+    return publish_and_respond(f"beyblade/combinations/{combination_id}/stats", stats)
 
-@app.route("/api/tournaments")
+@api.route("/tournaments")
 def get_tournaments():
     db = SessionLocal()
     tournaments = db.query(Tournament).all()
@@ -159,11 +190,9 @@ def get_tournaments():
             "tournament_type": tournament.tournament_type
         })
     db.close()
-    tournaments_data = jsonify(tournament_list)
-    publish_mqtt_message("beyblade/tournaments", tournaments_data)
-    return tournaments_data
+    return publish_and_respond("beyblade/tournaments", tournament_list)
 
-@app.route("/api/tournament/<int:tournament_id>")
+@api.route("/tournament/<int:tournament_id>")
 def get_tournament(tournament_id):
     db = SessionLocal()
     tournament = db.query(Tournament).filter(Tournament.tournament_id == tournament_id).first()
@@ -179,11 +208,9 @@ def get_tournament(tournament_id):
         "tournament_type": tournament.tournament_type
     }
     db.close()
-    tournament_data_json = jsonify(tournament_data)
-    publish_mqtt_message(f"beyblade/tournaments/{tournament_id}", tournament_data_json)
-    return tournament_data_json
+    return publish_and_respond(f"beyblade/tournaments/{tournament_id}", tournament_data)
 
-@app.route("/api/tournament/<int:tournament_id>/standings")
+@api.route("/tournament/<int:tournament_id>/standings")
 def get_tournament_standings(tournament_id):
     db = SessionLocal()
     tournament = db.query(Tournament).filter(Tournament.tournament_id == tournament_id).first()
@@ -192,7 +219,7 @@ def get_tournament_standings(tournament_id):
         return jsonify({"error": "Tournament not found"}), 404
 
     participant_type = "Player" if tournament.tournament_type in ("Standard", "PlayerLadder") else "Combination"
-    standings = calculate_tournament_standings(tournament_id, participant_type)
+    standings = calculate_tournament_standings(db, tournament_id, participant_type)
 
     standings_with_names = []
     for participant in standings:
@@ -209,16 +236,14 @@ def get_tournament_standings(tournament_id):
         standings_with_names.append(participant_data)
 
     db.close()
-    standings_json = jsonify({
+    return publish_and_respond(f"beyblade/tournaments/{tournament_id}/standings", {
         "tournament_id": tournament_id,
         "tournament_name": tournament.tournament_name,
         "tournament_type": tournament.tournament_type,
         "standings": standings_with_names
     })
-    publish_mqtt_message(f"beyblade/tournaments/{tournament_id}/standings", standings_json)
-    return standings_json
 
-@app.route("/api/stadiums")
+@api.route("/stadiums")
 def get_stadiums():
     db = SessionLocal()
     stadiums = db.query(Stadium).all()
@@ -227,14 +252,13 @@ def get_stadiums():
         stadium_list.append({
             "stadium_id": stadium.stadium_id,
             "stadium_name": stadium.stadium_name,
-            "stadium_class": stadium.stadium_class
+            "stadium_class_id": stadium.stadium_class_id,
+            "stadium_class": stadium.stadium_class.name if stadium.stadium_class else None
         })
     db.close()
-    stadiums_json = jsonify(stadium_list)
-    publish_mqtt_message("beyblade/stadiums", stadiums_json)
-    return stadiums_json
+    return publish_and_respond("beyblade/stadiums", stadium_list)
 
-@app.route("/api/stadium/<int:stadium_id>")
+@api.route("/stadium/<int:stadium_id>")
 def get_stadium(stadium_id):
     db = SessionLocal()
     stadium = db.query(Stadium).filter(Stadium.stadium_id == stadium_id).first()
@@ -245,14 +269,13 @@ def get_stadium(stadium_id):
     stadium_data = {
         "stadium_id": stadium.stadium_id,
         "stadium_name": stadium.stadium_name,
-        "stadium_class": stadium.stadium_class
+        "stadium_class_id": stadium.stadium_class_id,
+        "stadium_class": stadium.stadium_class.name if stadium.stadium_class else None
     }
     db.close()
-    stadium_json = jsonify(stadium_data)
-    publish_mqtt_message(f"beyblade/stadiums/{stadium_id}", stadium_json)
-    return stadium_json
+    return publish_and_respond(f"beyblade/stadiums/{stadium_id}", stadium_data)
 
-@app.route("/api/stadium/<int:stadium_id>/matchups/<string:participant_type>")
+@api.route("/stadium/<int:stadium_id>/matchups/<string:participant_type>")
 def get_stadium_matchups(stadium_id, participant_type):
     db = SessionLocal()
     stadium = db.query(Stadium).filter(Stadium.stadium_id == stadium_id).first()
@@ -260,13 +283,11 @@ def get_stadium_matchups(stadium_id, participant_type):
         db.close()
         return jsonify({"error": "Stadium not found"}), 404
 
-    matchups = calculate_most_common_matchups_in_stadium(stadium_id, participant_type)
+    matchups = calculate_most_common_matchups_in_stadium(db, stadium_id, participant_type)
     db.close()
-    matchups_json = jsonify(matchups)
-    publish_mqtt_message(f"beyblade/stadiums/{stadium_id}/matchups/{participant_type}", matchups_json)
-    return matchups_json
+    return publish_and_respond(f"beyblade/stadiums/{stadium_id}/matchups/{participant_type}", matchups)
 
-@app.route("/api/stadium/<int:stadium_id>/finish_type_distribution")
+@api.route("/stadium/<int:stadium_id>/finish_type_distribution")
 def get_stadium_finish_type_distribution(stadium_id):
     db = SessionLocal()
     stadium = db.query(Stadium).filter(Stadium.stadium_id == stadium_id).first()
@@ -274,13 +295,11 @@ def get_stadium_finish_type_distribution(stadium_id):
         db.close()
         return jsonify({"error": "Stadium not found"}), 404
 
-    distribution = calculate_finish_type_distribution("Stadium", stadium_id)
+    distribution = calculate_finish_type_distribution(db, "Stadium", stadium_id)
     db.close()
-    distribution_json = jsonify(distribution)
-    publish_mqtt_message(f"beyblade/stadiums/{stadium_id}/finish_type_distribution",distribution_json)
-    return distribution_json
+    return publish_and_respond(f"beyblade/stadiums/{stadium_id}/finish_type_distribution", distribution)
 
-@app.route("/api/stadium_classes")
+@api.route("/stadium_classes")
 def get_stadium_classes():
     db = SessionLocal()
     stadium_classes = db.query(StadiumClass).all()
@@ -292,11 +311,9 @@ def get_stadium_classes():
             "stadium_class_description": stadium_class.description
         })
     db.close()
-    stadium_classes_json = jsonify(stadium_class_list)
-    publish_mqtt_message("beyblade/stadium_classes", stadium_classes_json)
-    return stadium_classes_json
+    return publish_and_respond("beyblade/stadium_classes", stadium_class_list)
 
-@app.route("/api/stadium_class/<int:stadium_class_id>")
+@api.route("/stadium_class/<int:stadium_class_id>")
 def get_stadium_class(stadium_class_id):
     db = SessionLocal()
     stadium_class = db.query(StadiumClass).filter(StadiumClass.id == stadium_class_id).first()
@@ -310,11 +327,9 @@ def get_stadium_class(stadium_class_id):
         "stadium_class_description": stadium_class.description
     }
     db.close()
-    stadium_class_json = jsonify(stadium_class_data)
-    publish_mqtt_message(f"beyblade/stadium_classes/{stadium_class_id}", stadium_class_json)
-    return stadium_class_json
+    return publish_and_respond(f"beyblade/stadium_classes/{stadium_class_id}", stadium_class_data)
 
-@app.route("/api/stadium_class/<int:stadium_class_id>/matchups/<string:participant_type>")
+@api.route("/stadium_class/<int:stadium_class_id>/matchups/<string:participant_type>")
 def get_stadium_class_matchups(stadium_class_id, participant_type):
     db = SessionLocal()
     stadium_class = db.query(StadiumClass).filter(StadiumClass.id == stadium_class_id).first()
@@ -322,13 +337,11 @@ def get_stadium_class_matchups(stadium_class_id, participant_type):
         db.close()
         return jsonify({"error": "Stadium Class not found"}), 404
 
-    matchups = calculate_most_common_matchups_in_stadium_class(stadium_class_id, participant_type)
+    matchups = calculate_most_common_matchups_in_stadium_class(db, stadium_class_id, participant_type)
     db.close()
-    matchups_json = jsonify(matchups)
-    publish_mqtt_message(f"beyblade/stadium_classes/{stadium_class_id}/matchups/{participant_type}", matchups_json)
-    return matchups_json
+    return publish_and_respond(f"beyblade/stadium_classes/{stadium_class_id}/matchups/{participant_type}", matchups)
 
-@app.route("/api/stadium_class/<int:stadium_class_id>/finish_type_distribution")
+@api.route("/stadium_class/<int:stadium_class_id>/finish_type_distribution")
 def get_stadium_class_finish_type_distribution(stadium_class_id):
     db = SessionLocal()
     stadium_class = db.query(StadiumClass).filter(StadiumClass.id == stadium_class_id).first()
@@ -336,55 +349,61 @@ def get_stadium_class_finish_type_distribution(stadium_class_id):
         db.close()
         return jsonify({"error": "Stadium Class not found"}), 404
 
-    distribution = calculate_finish_type_distribution("StadiumClass", stadium_class_id)
+    distribution = calculate_finish_type_distribution(db, "StadiumClass", stadium_class_id)
     db.close()
-    distribution_json = jsonify(distribution)
-    publish_mqtt_message(f"beyblade/stadium_classes/{stadium_class_id}/finish_type_distribution", distribution_json)
-    return distribution_json
+    return publish_and_respond(f"beyblade/stadium_classes/{stadium_class_id}/finish_type_distribution", distribution)
 
-@app.route("/api/stadium/<int:stadium_id>/matches_played")
+@api.route("/stadium/<int:stadium_id>/matches_played")
 def get_matches_played_in_stadium(stadium_id):
-    matches_played = calculate_matches_played_in_stadium(stadium_id)
-    data_json = jsonify({"matches_played": matches_played})
-    publish_mqtt_message(f"beyblade/stadiums/{stadium_id}/matches_played", data_json)
-    return data_json
-
-@app.route("/api/stadium/<int:stadium_id>/win_percentage/<string:participant_type>")
-def get_win_percentage_by_stadium(stadium_id, participant_type):
-    win_percentage = calculate_win_percentage_by_stadium(stadium_id, participant_type)
-    data_json = jsonify({"win_percentage": win_percentage})
-    publish_mqtt_message(f"beyblade/stadiums/{stadium_id}/win_percentage/{participant_type}", data_json)
-    return data_json
-
-@app.route("/api/stadium/<int:stadium_id>/most_common_win_type")
+    db = SessionLocal()
+    matches_played = calculate_matches_played_in_stadium(db, stadium_id)
+    db.close()
+    return publish_and_respond(f"beyblade/stadiums/{stadium_id}/matches_played", {"matches_played": matches_played})
+
+@api.route("/stadium/<int:stadium_id>/win_percentage/<string:participant_type>/<int:participant_id>")
+def get_win_percentage_by_stadium(stadium_id, participant_type, participant_id):
+    db = SessionLocal()
+    try:
+        win_percentage = calculate_win_percentage_by_stadium(db, stadium_id, participant_type, participant_id)
+    finally:
+        db.close()
+    return publish_and_respond(
+        f"beyblade/stadiums/{stadium_id}/win_percentage/{participant_type}/{participant_id}", {"win_percentage": win_percentage}
+    )
+
+@api.route("/stadium/<int:stadium_id>/most_common_win_type")
 def get_most_common_win_type_by_stadium(stadium_id):
-    most_common_win_type = calculate_most_common_win_type_by_stadium(stadium_id)
-    data_json = jsonify({"most_common_win_type": most_common_win_type})
-    publish_mqtt_message(f"beyblade/stadiums/{stadium_id}/most_common_win_type", data_json)
-    return data_json
+    db = SessionLocal()
+    most_common_win_type = calculate_most_common_win_type_by_stadium(db, stadium_id)
+    db.close()
+    return publish_and_respond(f"beyblade/stadiums/{stadium_id}/most_common_win_type", {"most_common_win_type": most_common_win_type})
 
-@app.route("/api/stadium_class/<int:stadium_class_id>/matches_played")
+@api.route("/stadium_class/<int:stadium_class_id>/matches_played")
 def get_matches_played_in_stadium_class(stadium_class_id):
-    matches_played = calculate_matches_played_in_stadium_class(stadium_class_id)
-    data_json = jsonify({"matches_played": matches_played})
-    publish_mqtt_message(f"beyblade/stadium_classes/{stadium_class_id}/matches_played", data_json)
-    return data_json
-
-@app.route("/api/stadium_class/<int:stadium_class_id>/win_percentage/<string:participant_type>")
-def get_win_percentage_by_stadium_class(stadium_class_id, participant_type):
-    win_percentage = calculate_win_percentage_by_stadium_class(stadium_class_id, participant_type)
-    data_json = jsonify({"win_percentage": win_percentage})
-    publish_mqtt_message(f"beyblade/stadium_classes/{stadium_class_id}/win_percentage/{participant_type}", data_json)
-    return data_json
-
-@app.route("/api/stadium_class/<int:stadium_class_id>/most_common_win_type")
+    db = SessionLocal()
+    matches_played = calculate_matches_played_in_stadium_class(db, stadium_class_id)
+    db.close()
+    return publish_and_respond(f"beyblade/stadium_classes/{stadium_class_id}/matches_played", {"matches_played": matches_played})
+
+@api.route("/stadium_class/<int:stadium_class_id>/win_percentage/<string:participant_type>/<int:participant_id>")
+def get_win_percentage_by_stadium_class(stadium_class_id, participant_type, participant_id):
+    db = SessionLocal()
+    try:
+        win_percentage = calculate_win_percentage_by_stadium_class(db, stadium_class_id, participant_type, participant_id)
+    finally:
+        db.close()
+    return publish_and_respond(
+        f"beyblade/stadium_classes/{stadium_class_id}/win_percentage/{participant_type}/{participant_id}", {"win_percentage": win_percentage}
+    )
+
+@api.route("/stadium_class/<int:stadium_class_id>/most_common_win_type")
 def get_most_common_win_type_by_stadium_class(stadium_class_id):
-    most_common_win_type = calculate_most_common_win_type_by_stadium_class(stadium_class_id)
-    data_json = jsonify({"most_common_win_type": most_common_win_type})
-    publish_mqtt_message(f"beyblade/stadium_classes/{stadium_class_id}/most_common_win_type", data_json)
-    return data_json
+    db = SessionLocal()
+    most_common_win_type = calculate_most_common_win_type_by_stadium_class(db, stadium_class_id)
+    db.close()
+    return publish_and_respond(f"beyblade/stadium_classes/{stadium_class_id}/most_common_win_type", {"most_common_win_type": most_common_win_type})
 
-@app.route("/api/launchers")
+@api.route("/launchers")
 def get_launchers():
     db = SessionLocal()
     launchers = db.query(Launcher).all()
@@ -396,11 +415,9 @@ def get_launchers():
             "launcher_class_id": launcher.launcher_class_id
         })
     db.close()
-    launchers_json = jsonify(launcher_list)
-    publish_mqtt_message("beyblade/launchers", launchers_json)
-    return launchers_json
+    return publish_and_respond("beyblade/launchers", launcher_list)
 
-@app.route("/api/launcher/<int:launcher_id>")
+@api.route("/launcher/<int:launcher_id>")
 def get_launcher(launcher_id):
     db = SessionLocal()
     launcher = db.query(Launcher).filter(Launcher.launcher_id == launcher_id).first()
@@ -412,15 +429,13 @@ def get_launcher(launcher_id):
         "launcher_id": launcher.launcher_id,
         "launcher_name": launcher.launcher_name,
         "launcher_class_id": launcher.launcher_class_id,
-        "usage_frequency": calculate_launcher_usage_frequency(launcher_id),
-        "win_percentage": calculate_win_percentage_by_launcher(launcher_id),
+        "usage_frequency": calculate_launcher_usage_frequency(db, launcher_id),
+        "win_percentage": calculate_win_percentage_by_launcher(db, launcher_id),
     }
     db.close()
-    launcher_stats_json = jsonify(stats)
-    publish_mqtt_message(f"beyblade/launchers/{launcher_id}/stats", launcher_stats_json)
-    return launcher_stats_json
+    return publish_and_respond(f"beyblade/launchers/{launcher_id}/stats", stats)
 
-@app.route("/api/launcher_classes")
+@api.route("/launcher_classes")
 def get_launcher_classes():
     db = SessionLocal()
     launcher_classes = db.query(LauncherClass).all()
@@ -432,11 +447,9 @@ def get_launcher_classes():
             "launcher_class_description": launcher_class.description
         })
     db.close()
-    launcher_classes_json = jsonify(launcher_class_list)
-    publish_mqtt_message("beyblade/launcher_classes", launcher_classes_json)
-    return launcher_classes_json
+    return publish_and_respond("beyblade/launcher_classes", launcher_class_list)
 
-@app.route("/api/launcher_class/<int:launcher_class_id>")
+@api.route("/launcher_class/<int:launcher_class_id>")
 def get_launcher_class(launcher_class_id):
     db = SessionLocal()
     launcher_class = db.query(LauncherClass).filter(LauncherClass.id == launcher_class_id).first()
@@ -448,14 +461,12 @@ def get_launcher_class(launcher_class_id):
         "launcher_class_id": launcher_class.id,
         "launcher_class_name": launcher_class.name,
         "launcher_class_description": launcher_class.description,
-        "most_common_win_type": calculate_most_common_win_type_by_launcher_class(launcher_class_id)
+        "most_common_win_type": calculate_most_common_win_type_by_launcher_class(db, launcher_class_id)
     }
     db.close()
-    launcher_class_json = jsonify(launcher_class_data)
-    publish_mqtt_message(f"beyblade/launcher_classes/{launcher_class_id}", launcher_class_json)
-    return launcher_class_json
+    return publish_and_respond(f"beyblade/launcher_classes/{launcher_class_id}", launcher_class_data)
 
-@app.route("/api/match/<int:match_id>")
+@api.route("/match/<int:match_id>")
 def get_match(match_id):
     db = SessionLocal()
     match = db.query(Match).filter(Match.match_id == match_id).first()
@@ -480,11 +491,9 @@ def get_match(match_id):
         "draw": match.draw
     }
     db.close()
-    match_json = jsonify(match_data)
-    publish_mqtt_message(f"beyblade/matches/{match_id}", match_json)
-    return match_json
+    return publish_and_respond(f"beyblade/matches/{match_id}", match_data)
 
-@app.route("/api/tournament/<int:tournament_id>/matches")
+@api.route("/tournament/<int:tournament_id>/matches")
 def get_tournament_matches(tournament_id):
     db = SessionLocal()
     matches = db.query(Match).filter(Match.tournament_id == tournament_id).all()
@@ -507,153 +516,242 @@ def get_tournament_matches(tournament_id):
             "draw": match.draw
         })
     db.close()
-    matches_json = jsonify(match_list)
-    publish_mqtt_message(f"beyblade/tournaments/{tournament_id}/matches", matches_json)
-    return matches_json
+    return publish_and_respond(f"beyblade/tournaments/{tournament_id}/matches", match_list)
 
-@app.route("/api/tournament/<int:tournament_id>/average_match_length")
+@api.route("/tournament/<int:tournament_id>/average_match_length")
 def get_tournament_average_match_length(tournament_id):
-    average_match_length = calculate_average_match_length(tournament_id)
-    data_json = jsonify({"average_match_length": average_match_length})
-    publish_mqtt_message(f"beyblade/tournaments/{tournament_id}/average_match_length", data_json)
-    return data_json
+    db = SessionLocal()
+    try:
+        average_match_length = calculate_average_match_length(db, tournament_id)
+    finally:
+        db.close()
+    return publish_and_respond(f"beyblade/tournaments/{tournament_id}/average_match_length", {"average_match_length": average_match_length})
 
-@app.route("/api/matchups/<string:participant_type>")
+@api.route("/matchups/<string:participant_type>")
 def get_most_common_matchups(participant_type):
-    matchups = calculate_most_common_matchups(participant_type)
-    matchups_json = jsonify(matchups)
-    publish_mqtt_message(f"beyblade/matchups/{participant_type}", matchups_json)
-    return matchups_json
+    db = SessionLocal()
+    try:
+        matchups = calculate_most_common_matchups(db, participant_type)
+    finally:
+        db.close()
+    return publish_and_respond(f"beyblade/matchups/{participant_type}", matchups)
 
-@app.route("/api/player/<int:player1_id>/matchup/<int:player2_id>")
+@api.route("/player/<int:player1_id>/matchup/<int:player2_id>")
 def get_player_matchup(player1_id, player2_id):
-    head_to_head = calculate_head_to_head_record(player1_id, player2_id)
-    win_percentage = calculate_head_to_head_win_percentage(player1_id, player2_id)
-    non_loss_percentage = calculate_head_to_head_non_loss_percentage(player1_id, player2_id)
+    db = SessionLocal()
+    head_to_head = calculate_head_to_head_record(db, player1_id, player2_id)
+    win_percentage = calculate_head_to_head_win_percentage(db, player1_id, player2_id)
+    non_loss_percentage = calculate_head_to_head_non_loss_percentage(db, player1_id, player2_id)
+    db.close()
     data = {
         "head_to_head": head_to_head,
         "win_percentage": win_percentage,
         "non_loss_percentage": non_loss_percentage
     }
-    data_json = jsonify(data)
-    publish_mqtt_message(f"beyblade/matchups/players/{player1_id}/{player2_id}", data_json)
-    return data_json
+    return publish_and_respond(f"beyblade/matchups/players/{player1_id}/{player2_id}", data)
 
-@app.route("/api/finish_type_distribution/<string:participant_type>/<int:participant_id>")
+@api.route("/finish_type_distribution/<string:participant_type>/<int:participant_id>")
 def get_finish_type_distribution(participant_type, participant_id):
-    distribution = calculate_finish_type_distribution(participant_type, participant_id)
-    distribution_json = jsonify(distribution)
-    publish_mqtt_message(f"beyblade/finish_types/{participant_type}/{participant_id}", distribution_json)
-    return distribution_json
+    db = SessionLocal()
+    distribution = calculate_finish_type_distribution(db, participant_type, participant_id)
+    db.close()
+    return publish_and_respond(f"beyblade/finish_types/{participant_type}/{participant_id}", distribution)
 
-@app.route("/api/finish_type_distribution/stadium/<int:stadium_id>")
-def get_stadium_finish_type_distribution(stadium_id):
-    distribution = calculate_finish_type_distribution("Stadium", stadium_id)
-    distribution_json = jsonify(distribution)
-    publish_mqtt_message(f"beyblade/finish_types/stadiums/{stadium_id}", distribution_json)
-    return distribution_json
+@api.route("/finish_type_distribution/stadium/<int:stadium_id>")
+def get_finish_type_distribution_for_stadium(stadium_id):
+    db = SessionLocal()
+    distribution = calculate_finish_type_distribution(db, "Stadium", stadium_id)
+    db.close()
+    return publish_and_respond(f"beyblade/finish_types/stadiums/{stadium_id}", distribution)
+
+# State field each bulk-mode sensor shows; the rest of the entity's stats become its attributes.
+BULK_SENSOR_STATE_FIELDS = {
+    "players": "elo_rating",
+    "combinations": "elo_rating",
+    "parts/blade": "win_rate",
+    "parts/ratchet": "win_rate",
+    "parts/bit": "win_rate",
+    "stadiums": "matches_played",
+    "stadium_classes": "matches_played",
+    "launchers": "usage_frequency",
+    "launcher_classes": "most_common_win_type",
+}
+
+# Bulk mode: entity class -> {entity_id: latest stats}, so a partial refresh
+# can republish the whole class document.
+_bulk_documents = {}
+
+def publish_entity_stats(entity_class, entity_id, stats, name=None):
+    """Publishes one entity's stats on its own topic or, in bulk mode, stages it in its class document.
+
+    Staged documents go out on the next flush_bulk_documents().
+    """
+    if not MQTT_BULK_MODE:
+        publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}{entity_class}/{entity_id}/stats", stats)
+        return
+
+    _bulk_documents.setdefault(entity_class, {})[str(entity_id)] = stats
+    sensor_id = f"beyblade_{entity_class.replace('/', '_')}_{entity_id}"
+    publish_discovery_once(f"{MQTT_DISCOVERY_PREFIX}/sensor/{sensor_id}/config", {
+        "name": f"Beyblade {name or entity_class.replace('/', ' ').title() + ' ' + str(entity_id)}",
+        "unique_id": sensor_id,
+        "state_topic": f"{MQTT_TOPIC_PREFIX}{entity_class}",
+        "value_template": f"{{{{ value_json['{entity_id}'].{BULK_SENSOR_STATE_FIELDS[entity_class]} }}}}",
+        "json_attributes_topic": f"{MQTT_TOPIC_PREFIX}{entity_class}",
+        "json_attributes_template": f"{{{{ value_json['{entity_id}'] | tojson }}}}",
+    })
+
+def flush_bulk_documents():
+    """Publishes every bulk-mode class document; unchanged ones are skipped by the delta layer."""
+    for entity_class, document in _bulk_documents.items():
+        publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}{entity_class}", document)
+
+def publish_player_statistics(db, player_ids=None):
+    """Publishes stats for the given players, or for every player when player_ids is None."""
+    query = db.query(Player)
+    if player_ids is None:
+        all_player_stats = compute_all_player_stats(db)
+    else:
+        query = query.filter(Player.player_id.in_(player_ids))
+    for player in query.all():
+        stats = { # Recreate the stats dictionary from the API endpoint
+            "player_id": player.player_id,
+            "player_name": player.player_name,
+            **asdict(all_player_stats[player.player_id] if player_ids is None else calculate_player_aggregate(db, player.player_id)),
+        }
+        publish_entity_stats("players", player.player_id, stats, player.player_name)
+
+def publish_combination_statistics(db, combination_ids=None):
+    """Publishes stats for the given combinations, or for every combination when combination_ids is None."""
+    query = db.query(BeybladeCombination)
+    if combination_ids is None:
+        all_combination_stats = compute_all_combination_stats(db)
+    else:
+        query = query.filter(BeybladeCombination.combination_id.in_(combination_ids))
+        elo_ratings = dict(
+            db.query(CombinationStatsAgg.combination_id, CombinationStatsAgg.elo_rating)
+            .filter(CombinationStatsAgg.combination_id.in_(combination_ids))
+            .all()
+        )
+    for combination in query.all():
+        if combination_ids is None:
+            combination_stats = all_combination_stats[combination.combination_id]
+        else:
+            combination_stats = build_combination_matchup_matrix(db, combination_id=combination.combination_id).stats(
+                combination.combination_id, elo_ratings.get(combination.combination_id, DEFAULT_ELO_RATING)
+            )
+        stats = {
+            "combination_id": combination.combination_id,
+            "combination_name": combination.combination_name,
+            **asdict(combination_stats),
+        }
+        publish_entity_stats("combinations", combination.combination_id, stats, combination.combination_name)
+
+def publish_part_statistics(db, part_ids=None):
+    """Publishes stats for the given parts ({part_type: ids}), or for every part when part_ids is None."""
+    for part_type in PART_COLUMNS:
+        if part_ids is not None and not part_ids.get(part_type):
+            continue
+        ids = None if part_ids is None else part_ids[part_type]
+        for part_id, stats in compute_part_stats(db, part_type, part_ids=ids).items():
+            publish_entity_stats(f"parts/{part_type.lower()}", part_id, asdict(stats))
+
+def publish_stadium_statistics(db, stadium_ids=None):
+    """Publishes stats for the given stadiums, or for every stadium when stadium_ids is None."""
+    query = db.query(Stadium)
+    if stadium_ids is not None:
+        query = query.filter(Stadium.stadium_id.in_(stadium_ids))
+    for stadium in query.all():
+        data = {
+            "matches_played": calculate_matches_played_in_stadium(db, stadium.stadium_id),
+            "most_common_win_type": calculate_most_common_win_type_by_stadium(db, stadium.stadium_id)
+        }
+        publish_entity_stats("stadiums", stadium.stadium_id, data, stadium.stadium_name)
+
+def publish_stadium_class_statistics(db):
+    """Publishes stats for every stadium class."""
+    stadium_classes = db.query(StadiumClass).all()
+    for stadium_class in stadium_classes:
+        data = {
+            "matches_played": calculate_matches_played_in_stadium_class(db, stadium_class.id),
+            "most_common_win_type": calculate_most_common_win_type_by_stadium_class(db, stadium_class.id)
+        }
+        publish_entity_stats("stadium_classes", stadium_class.id, data, stadium_class.name)
+
+def publish_launcher_statistics(db, launcher_ids=None):
+    """Publishes stats for the given launchers and their classes, or for every launcher and class when launcher_ids is None."""
+    query = db.query(Launcher)
+    if launcher_ids is not None:
+        query = query.filter(Launcher.launcher_id.in_(launcher_ids))
+    launchers = query.all()
+    for launcher in launchers:
+        data = {
+            "usage_frequency": calculate_launcher_usage_frequency(db, launcher.launcher_id),
+            "win_percentage": calculate_win_percentage_by_launcher(db, launcher.launcher_id)
+        }
+        publish_entity_stats("launchers", launcher.launcher_id, data, launcher.launcher_name)
+
+    query = db.query(LauncherClass)
+    if launcher_ids is not None:
+        query = query.filter(LauncherClass.id.in_({launcher.launcher_class_id for launcher in launchers}))
+    for launcher_class in query.all():
+        data = {
+            "most_common_win_type": calculate_most_common_win_type_by_launcher_class(db, launcher_class.id)
+        }
+        publish_entity_stats("launcher_classes", launcher_class.id, data, launcher_class.name)
 
 def publish_all_statistics():
     db = SessionLocal()
     try:
-        # Players
-        players = db.query(Player).all()
-        for player in players:
-            stats = { # Recreate the stats dictionary from the API endpoint
-                "player_id": player.player_id,
-                "player_name": player.player_name,
-                "matches_played": calculate_player_matches_played(player.player_id),
-                "win_percentage": calculate_player_win_percentage(player.player_id),
-                "wins": calculate_player_wins(player.player_id),
-                "losses": calculate_player_losses(player.player_id),
-                "draws": calculate_player_draws(player.player_id),
-                "most_common_winning_finish_type": calculate_player_most_common_winning_finish_type(player.player_id),
-                "win_streak": calculate_player_win_streak(player.player_id),
-                "loss_streak": calculate_player_loss_streak(player.player_id),
-                "total_points": calculate_player_total_points(player.player_id),
-                "average_points_per_match": calculate_player_average_points_per_match(player.player_id),
-                "elo_rating": calculate_player_elo_rating(player.player_id)
-            }
-            publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}players/{player.player_id}/stats", jsonify(stats))
-
-        # Combinations (Similar structure as Players)
-        combinations = db.query(BeybladeCombination).all()
-        for combination in combinations:
-            stats = {
-                "combination_id": combination.combination_id,
-                "combination_name": combination.combination_name,
-                "matches_played": calculate_combination_matches_played(combination.combination_id),
-                "win_percentage": calculate_combination_win_percentage(combination.combination_id),
-                "wins": calculate_combination_wins(combination.combination_id),
-                "draws": calculate_combination_draws(combination.combination_id),
-                "non_loss_percentage": calculate_combination_non_loss_percentage(combination.combination_id),
-                "most_common_winning_finish_type": calculate_combination_most_common_winning_finish_type(combination.combination_id),
-                "burst_rate": calculate_combination_burst_rate(combination.combination_id),
-                "most_common_loss_type": calculate_combination_most_common_loss_type(combination.combination_id),
-                "most_common_opponent": calculate_combination_most_common_opponent(combination.combination_id),
-                "best_matchups": calculate_combination_best_matchups(combination.combination_id),
-                "worst_matchups": calculate_combination_worst_matchups(combination.combination_id),
-                "total_points": calculate_combination_total_points(combination.combination_id),
-                "average_points_per_match": calculate_combination_average_points_per_match(combination.combination_id),
-                "elo_rating": calculate_combination_elo_rating(combination.combination_id)
-            }
-            publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}combinations/{combination.combination_id}/stats", jsonify(stats))
-
-        #Stadiums
-        stadiums = db.query(Stadium).all()
-        for stadium in stadiums:
-            data = {
-                "matches_played": calculate_matches_played_in_stadium(stadium.stadium_id),
-                "win_percentage_players": calculate_win_percentage_by_stadium(stadium.stadium_id, "Player"),
-                "win_percentage_combinations": calculate_win_percentage_by_stadium(stadium.stadium_id, "Combination"),
-                "most_common_win_type": calculate_most_common_win_type_by_stadium(stadium.stadium_id)
-            }
-            publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}stadiums/{stadium.stadium_id}/stats", jsonify(data))
-        
-        #Stadium Classes
-        stadium_classes = db.query(StadiumClass).all()
-        for stadium_class in stadium_classes:
-            data = {
-                "matches_played": calculate_matches_played_in_stadium_class(stadium_class.id),
-                "win_percentage_players": calculate_win_percentage_by_stadium_class(stadium_class.id, "Player"),
-                "win_percentage_combinations": calculate_win_percentage_by_stadium_class(stadium_class.id, "Combination"),
-                "most_common_win_type": calculate_most_common_win_type_by_stadium_class(stadium_class.id)
-            }
-            publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}stadium_classes/{stadium_class.id}/stats", jsonify(data))
-
-        #Launchers
-        launchers = db.query(Launcher).all()
-        for launcher in launchers:
-            data = {
-                "usage_frequency": calculate_launcher_usage_frequency(launcher.launcher_id),
-                "win_percentage": calculate_win_percentage_by_launcher(launcher.launcher_id)
-            }
-            publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}launchers/{launcher.launcher_id}/stats", jsonify(data))
-
-        #Launcher Classes
-        launcher_classes = db.query(LauncherClass).all()
-        for launcher_class in launcher_classes:
-            data = {
-                "most_common_win_type": calculate_most_common_win_type_by_launcher_class(launcher_class.id)
-            }
-            publish_mqtt_message(f"{MQTT_TOPIC_PREFIX}launcher_classes/{launcher_class.id}/stats", jsonify(data))
-
+        publish_player_statistics(db)
+        publish_combination_statistics(db)
+        publish_part_statistics(db)
+        publish_stadium_statistics(db)
+        publish_stadium_class_statistics(db)
+        publish_launcher_statistics(db)
+        flush_bulk_documents()
     except Exception as e:
         logger.error(f"Error publishing statistics: {e}")
     finally:
         db.close()
 
-def run_statistics_loop():
-    while True:
-        if client and connected_flag:
-            logger.info("Publishing statistics...")
-            publish_all_statistics()
-            logger.info("Statistics published.")
-        else:
-            logger.error("MQTT Client not connected, skipping statistics publishing")
-        time.sleep(15 * 60)  # Sleep for 15 minutes
+def publish_match_statistics(matches):
+    """Publishes only the statistics touched by newly inserted matches.
+
+    Each match is a dict with the player, combination, launcher and stadium
+    ids of both sides, as queued by add_match.
+    """
+    player_ids, combination_ids, launcher_ids, stadium_ids = set(), set(), set(), set()
+    for match in matches:
+        for n in (1, 2):
+            player_ids.add(match.get(f"player{n}_id"))
+            combination_ids.add(match.get(f"player{n}_combination_id"))
+            launcher_ids.add(match.get(f"player{n}_launcher_id"))
+        stadium_ids.add(match.get("stadium_id"))
+    for ids in (player_ids, combination_ids, launcher_ids, stadium_ids):
+        ids.discard(None)
 
-def start_statistics_thread():
-    statistics_thread = threading.Thread(target=run_statistics_loop)
-    statistics_thread.daemon = True  # Allow the main program to exit even if the thread is running
-    statistics_thread.start()
\ No newline at end of file
+    db = SessionLocal()
+    try:
+        part_ids = {part_type: set() for part_type in PART_COLUMNS}
+        if combination_ids:
+            for combination in db.query(BeybladeCombination).filter(BeybladeCombination.combination_id.in_(combination_ids)):
+                for part_type, part_column in PART_COLUMNS.items():
+                    part_id = getattr(combination, part_column.key)
+                    if part_id is not None:
+                        part_ids[part_type].add(part_id)
+
+        if player_ids:
+            publish_player_statistics(db, player_ids)
+        if combination_ids:
+            publish_combination_statistics(db, combination_ids)
+            publish_part_statistics(db, part_ids)
+        if stadium_ids:
+            publish_stadium_statistics(db, stadium_ids)
+        if launcher_ids:
+            publish_launcher_statistics(db, launcher_ids)
+        flush_bulk_documents()
+    except Exception as e:
+        logger.error(f"Error publishing match statistics: {e}")
+    finally:
+        db.close()
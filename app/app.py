@@ -3,19 +3,28 @@ global client  # Declare client as global at the beginning
 import os
 from dotenv import load_dotenv
 import mysql.connector
-from flask import Flask, jsonify, request, render_template, redirect, url_for, g
-from datetime import datetime
+from flask import Flask, jsonify, request, render_template, redirect, url_for, g, make_response
+from datetime import datetime, timezone
 from urllib.parse import unquote
 import logging
 from collections import Counter
 import operator
 import paho.mqtt.client as mqtt
 import json
-import time
+import click
+import functools
 import threading
+import time
 from decimal import Decimal
-from api import api
-from api import publish_all_statistics
+from dataclasses import asdict
+from aggregates import apply_match_to_aggregates, rebuild_aggregates, backfill_match_sides, load_scoring_rules, recompute_match_points, load_stored_match_generation, bump_stored_match_generation, MATCH_SIDES_SQL
+from match_statistics import calculate_match_points
+from db import SessionLocal, get_raw_connection, remove_session, pool_status
+from cache import GenerationCache, ReferenceCache, bump_match_generation, bump_reference_version, data_etag, get_last_change_time, sync_match_generation
+from publisher import DebouncedPublisher, DeltaPublisher, MqttPublisher
+from serialization import encode_json, json_response
+from elo_tuning import load_match_history, sweep_elo_parameters
+from migrations import apply_migrations, explain_hot_queries
 
 MQTT_DISCOVERY_PREFIX = "homeassistant"  # Standard Home Assistant discovery prefix
 
@@ -27,7 +36,6 @@ logger = logging.getLogger(__name__) #get a logger object
 
 
 app = Flask(__name__)
-app.register_blueprint(api, url_prefix='/api')
 
 #Database info
 DB_HOST = os.environ.get("DB_HOST")
@@ -41,21 +49,31 @@ MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
 MQTT_USER = os.environ.get("MQTT_USER")
 MQTT_PASSWORD = os.environ.get("MQTT_PASSWORD")
 MQTT_TOPIC_PREFIX = os.environ.get("MQTT_TOPIC_PREFIX", "beyblade/stats/")  # Set a default value
+MQTT_QOS = int(os.environ.get("MQTT_QOS", 0))
+MQTT_MAX_INFLIGHT = int(os.environ.get("MQTT_MAX_INFLIGHT", 100))  # Messages awaiting broker acknowledgement
+MQTT_QUEUE_SIZE = int(os.environ.get("MQTT_QUEUE_SIZE", 10000))  # Outbound messages buffered before dropping
+MQTT_BATCH_SIZE = int(os.environ.get("MQTT_BATCH_SIZE", 200))
+# Bulk mode publishes one JSON document per entity class instead of a topic (or five) per entity.
+MQTT_BULK_MODE = os.environ.get("MQTT_BULK_MODE", "false").lower() in ("1", "true", "yes")
+
+# Seconds a shared cache (the nginx service) may serve an /api response without
+# revalidating; 0 means every request is revalidated with the ETag.
+API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", 0))
+
+# Seconds between checks of DataGenerations for match data rewritten by a CLI
+# command (recompute-points, backfill-match-sides, rebuild-stats).
+GENERATION_CHECK_INTERVAL = float(os.environ.get("GENERATION_CHECK_INTERVAL", 5))
 
 def get_db_connection():
+    # Borrowed from the shared SQLAlchemy engine pool; conn.close() hands it back.
     try:
-        conn = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME")
-        )
-        return conn
-    except mysql.connector.Error as e:
+        return get_raw_connection()
+    except Exception as e:
         logger.debug(f"Database connection error: {e}")
         return None
 
 client = None  # Global client variable initialized to None
+mqtt_publisher = None  # Outbound queue for client, created with it
 connected_flag = False
 
 def on_connect(client, userdata, flags, rc):  # Move to global scope
@@ -63,6 +81,8 @@ def on_connect(client, userdata, flags, rc):  # Move to global scope
     if rc == 0:
         #logger.info("Connected to MQTT Broker!")
         connected_flag = True
+        mqtt_delta.forget()  # The broker may have lost retained messages; republish everything once
+        stats_scheduler.request(FULL_REFRESH)
     else:
         logger.error(f"Failed to connect to MQTT, return code {rc}")
 
@@ -70,59 +90,77 @@ def on_disconnect(client, userdata, rc):  # Move to global scope
     global connected_flag
     connected_flag = False
     if rc != 0:
+        # paho's network thread (loop_start) reconnects on its own, backing off up to a minute.
         logger.error(f"Disconnected from MQTT Broker with code {rc}. Attempting to reconnect...")
-        time.sleep(5)  # Wait before retrying
-        connect_mqtt()
 
 def connect_mqtt():
-    global client # This is needed to modify the global client variable
+    global client, mqtt_publisher # This is needed to modify the global client variable
     if client is None:  # Correct check: if client is None
         client = mqtt.Client()
         client.on_connect = on_connect
         client.on_disconnect = on_disconnect
         client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
+        client.reconnect_delay_set(min_delay=1, max_delay=60)
+        mqtt_publisher = MqttPublisher(
+            client,
+            max_queue=MQTT_QUEUE_SIZE,
+            max_inflight=MQTT_MAX_INFLIGHT,
+            batch_size=MQTT_BATCH_SIZE,
+            qos=MQTT_QOS,
+        )
         try:
-            client.connect(MQTT_BROKER, MQTT_PORT)
+            client.connect_async(MQTT_BROKER, MQTT_PORT)
             return client
         except Exception as e:
             logger.error(f"MQTT connection error: {e}")
             return None
     return client # Return the client whether it's new or existing
 
-def mqtt_loop():
-    global client
-    while True:
-        if client:
-            client.loop(timeout=0.1)  # Process MQTT events with a timeout
-        time.sleep(0.01)   
+def send_mqtt_message(topic, payload, retain=False, on_failure=None):
+    """Queues one encoded payload for the MQTT publisher; returns True if it was accepted.
+
+    on_failure is called if the client refuses the message once it is dequeued.
+    """
+    if mqtt_publisher is None:
+        return False
+    return mqtt_publisher.enqueue(topic, payload, retain=retain, on_failure=on_failure)
+
+# Remembers what was last published on every topic so unchanged payloads are not resent.
+mqtt_delta = DeltaPublisher(send_mqtt_message)
 
 def publish_mqtt_message(topic, payload):
     global client  # Use the global client variable
     if client and connected_flag:  # Check if client is connected and connection flag is set
         try:
-            client.publish(topic, json.dumps(payload))
-            logger.info(f"Published to topic: {topic}")
+            # payload may already be encoded (bytes shared with an HTTP response); otherwise encode it once here.
+            if mqtt_delta.publish(topic, encode_json(payload)):
+                logger.debug(f"Queued for topic: {topic}")
         except Exception as e:
             logger.error(f"Error publishing to MQTT: {e}")
     else:
         logger.error("MQTT client is not connected or connection flag is not set. Cannot publish message.")
 
-def run_statistics_loop():
-    while True:
-        if client and connected_flag:
-            logger.info("Publishing statistics...")
-            publish_all_statistics()
-            logger.info("Statistics published.")
-        else:
-            logger.error("MQTT Client not connected, skipping statistics publishing")
-        time.sleep(15 * 60)  # Sleep for 15 minutes
-
-def start_statistics_thread():
-    statistics_thread = threading.Thread(target=run_statistics_loop)
-    statistics_thread.daemon = True
-    statistics_thread.start()
-
-start_statistics_thread() # Start the statistics publishing thread
+def publish_discovery_once(topic, config):
+    """Publishes a Home Assistant discovery config the first time this process sees its topic."""
+    if client and connected_flag:
+        mqtt_delta.publish_once(topic, json.dumps(config), retain=True)
+
+def publish_discovery_config():
+    """Announces the summary sensors to Home Assistant; each config is sent once per process."""
+    for key, name, unit in (
+        ("player_stats", "Beyblade Player Stats", "Players"),
+        ("combination_stats", "Beyblade Combination Stats", "Combinations"),
+        ("recent_matches", "Beyblade Recent Matches", "Matches"),
+    ):
+        mqtt_delta.publish_once(f"{MQTT_DISCOVERY_PREFIX}/sensor/beyblade_{key}/config", json.dumps({
+            "name": name,
+            "state_topic": MQTT_TOPIC_PREFIX + key,
+            "value_template": "{{ value_json | count }}",
+            "json_attributes_topic": MQTT_TOPIC_PREFIX + key,
+            "json_attributes_template": "{{ {'items': value_json} | tojson }}",
+            "unit_of_measurement": unit,
+            "unique_id": f"beyblade_{key}",
+        }), retain=True)
 
 def publish_stats():
     global connected_flag
@@ -136,46 +174,19 @@ def publish_stats():
         player_stats = []
         with conn.cursor() as cursor_player:
             try:
-                cursor_player.execute("SELECT player_id, player_name FROM Players")
+                cursor_player.execute("""
+                    SELECT p.player_id, p.player_name,
+                           COALESCE(a.wins, 0), COALESCE(a.losses, 0), COALESCE(a.draws, 0), COALESCE(a.points, 0)
+                    FROM Players p
+                    LEFT JOIN PlayerStatsAgg a ON a.player_id = p.player_id
+                """)
                 players = cursor_player.fetchall()
-                #logger.info(f"Players retrieved: {players}")
 
-                for player_id, player_name in players:
+                for player_id, player_name, wins, losses, draws, points in players:
                     if not player_id:
                         logger.warning(f"Skipping player with invalid ID: {player_name}")
                         continue
 
-                    sql = """
-                        SELECT
-                            COUNT(CASE WHEN winner_id = %(player_id)s THEN 1 END) AS wins,
-                            COUNT(CASE WHEN (player1_id = %(player_id)s OR player2_id = %(player_id)s) AND winner_id IS NOT NULL AND winner_id != %(player_id)s THEN 1 END) AS losses,
-                            COUNT(CASE WHEN (player1_id = %(player_id)s OR player2_id = %(player_id)s) AND draw = 1 THEN 1 END) AS draws,
-                            SUM(CASE
-                                WHEN winner_id = %(player_id)s AND finish_type = 'Survivor' THEN 1
-                                WHEN winner_id = %(player_id)s AND finish_type = 'KO' THEN 2
-                                WHEN winner_id = %(player_id)s AND finish_type = 'Burst' THEN 2
-                                WHEN winner_id = %(player_id)s AND finish_type = 'Extreme' THEN 3
-                                ELSE 0
-                            END) AS points
-                        FROM Matches
-                        WHERE player1_id = %(player_id)s OR player2_id = %(player_id)s;
-                    """
-                    parameters = {'player_id': player_id}
-                    #logger.info(f"Player ID: {player_id}")
-                    #logger.info(f"Player Name: {player_name}")
-                    #logger.info(f"SQL: {sql}")
-                    #logger.info(f"Parameters: {parameters}")
-
-                    cursor_player.execute(sql, parameters)
-                    result = cursor_player.fetchone()
-                    #logger.info(f"Result: {result}")
-
-                    if result:
-                        wins, losses, draws, points = result
-                        points = int(points) if points is not None and isinstance(points, Decimal) else points if points is not None else 0
-                    else:
-                        wins, losses, draws, points = 0, 0, 0, 0
-
                     total_matches = wins + losses
                     total_possible_matches = wins + losses + draws
 
@@ -214,52 +225,21 @@ def publish_stats():
         combination_stats = []
         with conn.cursor() as cursor_combination:
             try:
-                cursor_combination.execute("SELECT combination_id, combination_name FROM BeybladeCombinations")
+                cursor_combination.execute("""
+                    SELECT bc.combination_id, bc.combination_name,
+                           COALESCE(a.matches_played, 0), COALESCE(a.wins, 0), COALESCE(a.draws, 0), COALESCE(a.points, 0)
+                    FROM BeybladeCombinations bc
+                    LEFT JOIN CombinationStatsAgg a ON a.combination_id = bc.combination_id
+                """)
                 combinations = cursor_combination.fetchall()
-                #logger.info(f"Combinations retrieved: {combinations}")
 
-                for combination_id, combination_name in combinations:
+                for combination_id, combination_name, matches_played, wins, draws, points in combinations:
                     if not combination_id:
                         logger.warning(f"Skipping combination with invalid ID: {combination_name}")
                         continue
 
-                    sql = """
-                        SELECT
-                            COUNT(DISTINCT m.match_id) AS matches_played,
-                            COUNT(CASE WHEN m.player1_combination_id = %(combination_id)s AND m.winner_id = m.player1_id THEN 1 WHEN m.player2_combination_id = %(combination_id)s AND m.winner_id = m.player2_id THEN 1 END) AS wins,
-                            SUM(CASE
-                                WHEN m.player1_combination_id = %(combination_id)s AND m.winner_id = m.player1_id AND m.finish_type = 'Survivor' THEN 1
-                                WHEN m.player1_combination_id = %(combination_id)s AND m.winner_id = m.player1_id AND m.finish_type = 'KO' THEN 2
-                                WHEN m.player1_combination_id = %(combination_id)s AND m.winner_id = m.player1_id AND m.finish_type = 'Burst' THEN 2
-                                WHEN m.player1_combination_id = %(combination_id)s AND m.winner_id = m.player1_id AND m.finish_type = 'Extreme' THEN 3
-                                WHEN m.player2_combination_id = %(combination_id)s AND m.winner_id = m.player2_id AND m.finish_type = 'Survivor' THEN 1
-                                WHEN m.player2_combination_id = %(combination_id)s AND m.winner_id = m.player2_id AND m.finish_type = 'KO' THEN 2
-                                WHEN m.player2_combination_id = %(combination_id)s AND m.winner_id = m.player2_id AND m.finish_type = 'Burst' THEN 2
-                                WHEN m.player2_combination_id = %(combination_id)s AND m.winner_id = m.player2_id AND m.finish_type = 'Extreme' THEN 3
-                                ELSE 0
-                            END) AS points
-                        FROM BeybladeCombinations bc
-                        LEFT JOIN Matches m ON bc.combination_id = m.player1_combination_id OR bc.combination_id = m.player2_combination_id
-                        WHERE bc.combination_id = %(combination_id)s
-                    """
-                    parameters = {'combination_id': combination_id}
-                    #logger.info(f"Combination ID: {combination_id}")
-                    #logger.info(f"Combination Name: {combination_name}")
-                    #logger.info(f"SQL: {sql}")
-                    #logger.info(f"Parameters: {parameters}")
-
-                    cursor_combination.execute(sql, parameters)
-                    result = cursor_combination.fetchone()
-                    #logger.info(f"Result: {result}")
-
-                    if result:
-                        matches_played, wins, points = result
-                        points = int(points) if points is not None and isinstance(points, Decimal) else points if points is not None else 0
-                    else:
-                        matches_played, wins, points = 0, 0, 0
-
                     win_rate = (wins / matches_played) * 100 if matches_played > 0 else 0
-                    non_loss_rate = ((wins + (matches_played - wins)) / matches_played) * 100 if matches_played > 0 else 0
+                    non_loss_rate = ((wins + draws) / matches_played) * 100 if matches_played > 0 else 0
 
                     combination_stats.append({
                         "name": combination_name,
@@ -275,9 +255,9 @@ def publish_stats():
                 logger.error(f"Combination stats error: {e}")
 
         try:
-            player_stats_json = json.dumps(player_stats, default=str)
-            recent_matches_json = json.dumps(recent_matches, default=str)
-            combination_stats_json = json.dumps(combination_stats, default=str)
+            player_stats_json = encode_json(player_stats)
+            recent_matches_json = encode_json(recent_matches)
+            combination_stats_json = encode_json(combination_stats)
         except TypeError as e:
             logger.error(f"JSON Encoding Error: {e}")
             return
@@ -285,15 +265,15 @@ def publish_stats():
             logger.error(f"Unexpected error during JSON encoding: {e}")
             return
 
-        client = g.mqtt_client
-
+        # Runs on the background publisher thread, so use the module-level
+        # client rather than the request-scoped g.mqtt_client.
         if client and connected_flag:
-            publish_discovery_config(client, player_stats, combination_stats)  # Publish the discovery config
+            publish_discovery_config()  # Sent once per process
 
             try:
-                publish_mqtt_message(client, "player_stats", player_stats_json)
-                publish_mqtt_message(client, "recent_matches", recent_matches_json)
-                publish_mqtt_message(client, "combination_stats", combination_stats_json)
+                publish_mqtt_message(MQTT_TOPIC_PREFIX + "player_stats", player_stats_json)
+                publish_mqtt_message(MQTT_TOPIC_PREFIX + "recent_matches", recent_matches_json)
+                publish_mqtt_message(MQTT_TOPIC_PREFIX + "combination_stats", combination_stats_json)
             except Exception as e:
                 logger.error(f"Error publishing stats: {e}")
         else:
@@ -305,8 +285,56 @@ def publish_stats():
     except Exception as e:
         logger.error(f"Error publishing stats to MQTT: {e}")
 
+FULL_REFRESH = "full_refresh"  # Scheduler event asking for every topic, e.g. after (re)connecting to the broker
+
+def publish_statistics_events(events):
+    """Publishes the summary topics plus the statistics of every entity the queued match events touched."""
+    try:
+        publish_stats()
+        if FULL_REFRESH in events:
+            publish_all_statistics()
+        else:
+            publish_match_statistics(events)
+    finally:
+        remove_session()  # The publisher thread's session, like a request's, ends with each run
+
+# The single place statistics are published from. Match inserts (and broker
+# connects) only queue an event; a burst of them is published once, off the
+# request thread, for just the entities involved.
+stats_scheduler = DebouncedPublisher(publish_statistics_events)
+
+# Every route and the publisher thread share SessionLocal; end each request's session here.
+app.teardown_appcontext(remove_session)
+
+_next_generation_check = 0.0
+_generation_check_lock = threading.Lock()
+
+def check_stored_match_generation():
+    """Drops this process's cached statistics once a CLI command has rewritten match data.
+
+    The CLI runs in its own process, so it bumps the generation stored in
+    DataGenerations; this reads it at most once per GENERATION_CHECK_INTERVAL.
+    """
+    global _next_generation_check
+    now = time.monotonic()
+    with _generation_check_lock:
+        if now < _next_generation_check:
+            return
+        _next_generation_check = now + GENERATION_CHECK_INTERVAL
+    conn = get_db_connection()
+    if conn is None:
+        return
+    cursor = conn.cursor()
+    try:
+        sync_match_generation(load_stored_match_generation(cursor))
+    except mysql.connector.Error as e:
+        logger.error(f"Error reading the stored match generation: {e}")
+    finally:
+        conn.close()
+
 @app.before_request
 def before_request():
+    check_stored_match_generation()  # Runs before the /api blueprint computes its ETags
     g.mqtt_client = client
 
 
@@ -315,54 +343,85 @@ def teardown_request(exception):
     if hasattr(g, 'mqtt_client'):
         g.mqtt_client = None
 
-# Start MQTT loop in a separate thread when the app starts
+# Start paho's network thread and the publisher's flusher when the app starts
 client = connect_mqtt()
 if client:
-    mqtt_thread = threading.Thread(target=mqtt_loop)
-    mqtt_thread.daemon = True
-    mqtt_thread.start()
+    mqtt_publisher.start()
 else:
     logger.error("Failed to establish initial MQTT connection")
 
 def publish_stats_at_startup():
     #logger.info("Publishing stats at startup")
     if client:  # Check if MQTT client is connected
-        publish_stats()
+        stats_scheduler.request(FULL_REFRESH)
+
+def load_scoring_rules_at_startup():
+    """Scores new matches with the ScoringRules table instead of the built-in defaults."""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Could not connect to database to load scoring rules; using the defaults")
+        return
+    cursor = conn.cursor()
+    try:
+        load_scoring_rules(cursor)
+    except mysql.connector.Error as e:
+        logger.error(f"Error loading scoring rules, using the defaults: {e}")
+    finally:
+        conn.close()
+
+# Reference tables that forms refer to by name: table -> (id column, name column)
+NAME_COLUMNS = {
+    "Players": ("player_id", "player_name"),
+    "BeybladeCombinations": ("combination_id", "combination_name"),
+    "Launchers": ("launcher_id", "launcher_name"),
+    "Stadiums": ("stadium_id", "stadium_name"),
+    "Tournaments": ("tournament_id", "tournament_name"),
+}
+
+name_index = ReferenceCache()  # table -> {lowercased name: id}, refreshed when an add_* route changes the table
+
+def load_name_index(cursor, table):
+    """Loads one table's case-insensitive name -> id map in a single query."""
+    id_column, name_column = NAME_COLUMNS[table]
+    cursor.execute(f"SELECT {name_column}, {id_column} FROM {table}")
+    return {name.strip().lower(): row_id for name, row_id in cursor.fetchall() if name is not None}
+
+def resolve_names(cursor, names_by_table):
+    """Resolves {table: [names]} to {table: {name: id}}, with at most one query per table.
+
+    Name maps are served from memory until the table's add_* route bumps its
+    version. A name missing from a cached map reloads that table once, in case
+    it was added outside this app; names still not found map to None.
+    """
+    resolved = {}
+    for table, names in names_by_table.items():
+        names = [name for name in names if name]
+        loaded = []
+
+        def load(table=table):
+            loaded.append(table)
+            return load_name_index(cursor, table)
+
+        index = name_index.get_or_load((table,), table, load)
+        if not loaded and any(name.strip().lower() not in index for name in names):
+            name_index.invalidate(table)
+            index = name_index.get_or_load((table,), table, load)
+        resolved[table] = {name: index.get(name.strip().lower()) for name in names}
+    return resolved
 
 def get_id_by_name(table, name, id_column):
+    if table not in NAME_COLUMNS or NAME_COLUMNS[table][0] != id_column:
+        logger.error(f"get_id_by_name: Invalid table name: {table}")
+        return None
+    if not name:
+        return None
     conn = get_db_connection()
     if conn is None:
         logger.error("get_id_by_name: Database connection failed")
         return None
     cursor = conn.cursor()
     try:
-        name = name.strip()
-        #logger.info(f"get_id_by_name: Looking for '{name}' in table '{table}'")
-
-        if table == "Players":
-            name_column = "player_name"
-        elif table == "BeybladeCombinations":
-            name_column = "combination_name"
-        elif table == "Launchers":
-            name_column = "launcher_name"
-        elif table == "Stadiums":  # Add this case for Stadiums
-            name_column = "stadium_name"  # Set name_column to "stadium_name"
-        elif table == "Tournaments":  # Add this elif condition
-            name_column = "tournament_name"
-        else:
-            logger.error(f"get_id_by_name: Invalid table name: {table}")
-            return None
-
-        query = f"SELECT {id_column} FROM {table} WHERE LOWER({name_column}) = LOWER(%s)" # Use name_column
-        #logger.info(f"get_id_by_name: Executing query: {query!r} with parameter: {name!r}")
-        cursor.execute(query, (name,))
-        result = cursor.fetchone()
-        if result:
-            #logger.info(f"get_id_by_name: Found {id_column}: {result[0]} for '{name}'")
-            return result[0]
-        else:
-            #logger.info(f"get_id_by_name: No '{id_column}' found for '{name}' in table '{table}'")
-            return None
+        return resolve_names(cursor, {table: [name]})[table][name]
     except mysql.connector.Error as e:
         logger.exception(f"get_id_by_name: Database error: {e}")
         return None
@@ -370,6 +429,65 @@ def get_id_by_name(table, name, id_column):
         if conn:
             conn.close()
 
+reference_lists = ReferenceCache()  # (table, columns) -> dropdown rows, refreshed when an add_* route changes the table
+
+def get_reference_list(conn, table, columns):
+    """Returns [{column: value}] for a reference table's dropdown, served from memory until the table changes."""
+    def load():
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    return reference_lists.get_or_load((table,), (table, columns), load)
+
+def cache_validators(tables=(), matches=True):
+    """Returns the (ETag, Last-Modified) pair for the current request's content."""
+    etag = data_etag(request.full_path, tables, matches)
+    last_modified = datetime.fromtimestamp(int(get_last_change_time()), timezone.utc)
+    return etag, last_modified
+
+def is_not_modified(etag, last_modified):
+    """True when the request's validators show the client already has this content (If-None-Match wins)."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return request.if_modified_since is not None and request.if_modified_since >= last_modified
+
+def set_cache_headers(response, etag, last_modified, max_age=0):
+    """Adds the validators and Cache-Control; without max_age, caches must revalidate every time."""
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers["Cache-Control"] = f"public, max-age={max_age}" if max_age else "no-cache"
+    return response
+
+def etag_cached(*tables, matches=True, max_age=0):
+    """Answers a conditional GET with 304 while the page's reference tables (and match data) are unchanged.
+
+    The validators are computed before the view runs, so a change that lands
+    while the page renders only costs the client one extra full response.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            etag, last_modified = cache_validators(tables, matches)
+            if is_not_modified(etag, last_modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return set_cache_headers(response, etag, last_modified, max_age)
+        return wrapper
+    return decorator
+
+# The /api blueprint imports the MQTT helpers and cache validators above from
+# this module, so it is only imported (and registered) once they are defined.
+from api import api, publish_all_statistics, publish_match_statistics
+app.register_blueprint(api, url_prefix='/api')
+
 def get_all_from_table(cursor, table_name):
     """Retrieves all rows from a specified table."""
     cursor.execute(f"SELECT * FROM {table_name}")
@@ -412,6 +530,7 @@ def add_blade():
 
             conn.commit()
             conn.close()
+            bump_reference_version("Blades")
             return "Blade added successfully!"
         except mysql.connector.Error as e:
             if conn:
@@ -455,6 +574,7 @@ def add_ratchet():
 
             conn.commit()
             conn.close()
+            bump_reference_version("Ratchets")
             return "Ratchet added successfully!"
         except mysql.connector.Error as e:
             if conn:
@@ -500,6 +620,7 @@ def add_bit():
 
             conn.commit()
             conn.close()
+            bump_reference_version("Bits")
             return "Bit and stats added successfully!"
         except mysql.connector.Error as e:
             if conn:
@@ -509,6 +630,7 @@ def add_bit():
     return render_template('add_bit.html')
 
 @app.route('/add_combination', methods=['GET', 'POST'])
+@etag_cached("Blades", "Ratchets", "Bits", matches=False)
 def add_combination():
     conn = get_db_connection()
     if conn is None:
@@ -516,12 +638,9 @@ def add_combination():
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT blade_name FROM Blades")
-        blades = [{"name": row[0]} for row in cursor.fetchall()]
-        cursor.execute("SELECT ratchet_name FROM Ratchets")
-        ratchets = [{"name": row[0]} for row in cursor.fetchall()]
-        cursor.execute("SELECT bit_name FROM Bits")
-        bits = [{"name": row[0]} for row in cursor.fetchall()]
+        blades = [{"name": row["blade_name"]} for row in get_reference_list(conn, "Blades", ("blade_name",))]
+        ratchets = [{"name": row["ratchet_name"]} for row in get_reference_list(conn, "Ratchets", ("ratchet_name",))]
+        bits = [{"name": row["bit_name"]} for row in get_reference_list(conn, "Bits", ("bit_name",))]
 
         if request.method == 'POST':
             data = request.form
@@ -539,6 +658,7 @@ def add_combination():
                             %s, %s, %s)
                 """, (data['blade_name'], data['ratchet_name'], data['bit_name'], data['combination_name'], data['combination_type'], weight))
                 conn.commit()
+                bump_reference_version("BeybladeCombinations")
                 return "Combination added successfully!"
             except mysql.connector.Error as e:
                 conn.rollback()
@@ -563,6 +683,7 @@ def add_launcher():
         try:
             cursor.execute("INSERT INTO Launchers (launcher_name) VALUES (%s)", (data['launcher_name'],))
             conn.commit()
+            bump_reference_version("Launchers")
             conn.close()
             return "Launcher added successfully!"
         except mysql.connector.Error as e:
@@ -581,6 +702,7 @@ def add_player():
         try:
             cursor.execute("INSERT INTO Players (player_name) VALUES (%s)", (data['player_name'],))
             conn.commit()
+            bump_reference_version("Players")
             conn.close()
             return "Player added successfully!"
         except mysql.connector.Error as e:
@@ -617,6 +739,7 @@ def add_tournament():
             cursor.execute("INSERT INTO Tournaments (tournament_name, start_date, end_date) VALUES (%s, %s, %s)",
                            (data['tournament_name'], start_date, end_date))
             conn.commit()
+            bump_reference_version("Tournaments")
             conn.close()
             return "Tournament added successfully!"
         except mysql.connector.Error as e:
@@ -625,6 +748,7 @@ def add_tournament():
     return render_template('add_tournament.html')
 
 @app.route('/add_match', methods=['GET', 'POST'], endpoint="add_match")
+@etag_cached("Players", "BeybladeCombinations", "Launchers", "Tournaments", "Stadiums", matches=False)
 def add_match():
     conn = get_db_connection()  # Function to establish database connection
     if conn is None:
@@ -652,32 +776,27 @@ def add_match():
     try:
         # Fetch data for dropdowns (This is the same for both GET and POST)
         try:
-            cursor.execute("SELECT player_name FROM Players")
-            players = [{"player_name": player[0]} for player in cursor.fetchall()]
+            players = get_reference_list(conn, "Players", ("player_name",))
         except mysql.connector.Error as e:
             logger.debug(f"Error retrieving players: {e}")
 
         try:
-            cursor.execute("SELECT combination_name FROM BeybladeCombinations")
-            combinations = [{"combination_name": combo[0]} for combo in cursor.fetchall()]
+            combinations = get_reference_list(conn, "BeybladeCombinations", ("combination_name",))
         except mysql.connector.Error as e:
             logger.debug(f"Error retrieving combinations: {e}")
 
         try:
-            cursor.execute("SELECT launcher_name FROM Launchers")
-            launchers = [{"launcher_name": launcher[0]} for launcher in cursor.fetchall()]
+            launchers = get_reference_list(conn, "Launchers", ("launcher_name",))
         except mysql.connector.Error as e:
             logger.debug(f"Error retrieving launchers: {e}")
 
         try:
-            cursor.execute("SELECT tournament_name, tournament_id FROM Tournaments")
-            tournaments = [{"tournament_name": t[0], "tournament_id": t[1]} for t in cursor.fetchall()]
+            tournaments = get_reference_list(conn, "Tournaments", ("tournament_name", "tournament_id"))
         except mysql.connector.Error as e:
             logger.debug(f"Error retrieving tournaments: {e}")
 
         try:
-            cursor.execute("SELECT stadium_name FROM Stadiums")
-            stadiums = [{"stadium_name": stadium[0]} for stadium in cursor.fetchall()]
+            stadiums = get_reference_list(conn, "Stadiums", ("stadium_name",))
         except mysql.connector.Error as e:
             logger.debug(f"Error retrieving stadiums: {e}")
 
@@ -693,36 +812,62 @@ def add_match():
             finish_type = request.form.get('finish_type')
             winner_name = request.form.get('winner_name')
 
-            player1_id = get_id_by_name("Players", player1_name, "player_id")
-            player2_id = get_id_by_name("Players", player2_name, "player_id")
-            p1_combo_id = get_id_by_name("BeybladeCombinations", p1_combo_name, "combination_id")
-            p2_combo_id = get_id_by_name("BeybladeCombinations", p2_combo_name, "combination_id")
-            p1_launcher_id = get_id_by_name("Launchers", p1_launcher_name, "launcher_id")
-            p2_launcher_id = get_id_by_name("Launchers", p2_launcher_name, "launcher_id")
-            stadium_id = get_id_by_name("Stadiums", stadium_name, "stadium_id")
-            tournament_id = None
-            if tournament_name:
-                tournament_id = get_id_by_name("Tournaments", tournament_name, "tournament_id")
+            # Every name on the form in one pass, from the in-memory name index where possible
+            ids = resolve_names(cursor, {
+                "Players": [player1_name, player2_name, winner_name],
+                "BeybladeCombinations": [p1_combo_name, p2_combo_name],
+                "Launchers": [p1_launcher_name, p2_launcher_name],
+                "Stadiums": [stadium_name],
+                "Tournaments": [tournament_name],
+            })
+            player1_id = ids["Players"].get(player1_name)
+            player2_id = ids["Players"].get(player2_name)
+            p1_combo_id = ids["BeybladeCombinations"].get(p1_combo_name)
+            p2_combo_id = ids["BeybladeCombinations"].get(p2_combo_name)
+            p1_launcher_id = ids["Launchers"].get(p1_launcher_name)
+            p2_launcher_id = ids["Launchers"].get(p2_launcher_name)
+            stadium_id = ids["Stadiums"].get(stadium_name)
+            tournament_id = ids["Tournaments"].get(tournament_name)
             winner_id = None
             draw = False
 
             if finish_type == "Draw":
                 draw = True
             elif winner_name:
-                winner_id = get_id_by_name("Players", winner_name, "player_id")
+                winner_id = ids["Players"].get(winner_name)
 
             try:
                 sql = """
-                    INSERT INTO Matches (tournament_id, player1_id, player2_id, player1_combination_id, player2_combination_id, player1_launcher_id, player2_launcher_id, winner_id, finish_type, end_time, draw, stadium_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO Matches (tournament_id, player1_id, player2_id, player1_combination_id, player2_combination_id, player1_launcher_id, player2_launcher_id, winner_id, finish_type, end_time, draw, stadium_id, points)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """
-                val = (tournament_id, player1_id, player2_id, p1_combo_id, p2_combo_id, p1_launcher_id, p2_launcher_id, winner_id, finish_type, datetime.now(), draw, stadium_id)
+                end_time = datetime.now()
+                points = calculate_match_points(finish_type, winner_id, draw)
+                val = (tournament_id, player1_id, player2_id, p1_combo_id, p2_combo_id, p1_launcher_id, p2_launcher_id, winner_id, finish_type, end_time, draw, stadium_id, points)
 
                 cursor.execute(sql, val)
+                match = {
+                    "match_id": cursor.lastrowid,
+                    "tournament_id": tournament_id,
+                    "end_time": end_time,
+                    "player1_id": player1_id,
+                    "player2_id": player2_id,
+                    "player1_combination_id": p1_combo_id,
+                    "player2_combination_id": p2_combo_id,
+                    "player1_launcher_id": p1_launcher_id,
+                    "player2_launcher_id": p2_launcher_id,
+                    "stadium_id": stadium_id,
+                    "winner_id": winner_id,
+                    "finish_type": finish_type,
+                    "draw": draw,
+                    "points": points,
+                }
+                apply_match_to_aggregates(cursor, match)
                 conn.commit()
+                bump_match_generation()
 
-                # Publish updated stats to MQTT after successful commit
-                publish_stats()
+                # Publish the stats this match touched, in the background, after successful commit
+                stats_scheduler.request(match)
 
                 message = "Match added successfully!"
                 player1_selected = player1_name
@@ -770,6 +915,7 @@ def index():
     return render_template('index.html')
 
 @app.route('/tournaments/stats', methods=['GET'])
+@etag_cached("Players", "BeybladeCombinations", "Tournaments")
 def tournament_stats():
     conn = get_db_connection()
     if conn is None:
@@ -785,8 +931,10 @@ def tournament_stats():
     try:
         # Get all tournaments for the dropdown
         try:
-            cursor.execute("SELECT tournament_name, tournament_id FROM Tournaments")
-            all_tournaments = [{"name": t[0], "id": t[1]} for t in cursor.fetchall()]
+            all_tournaments = [
+                {"name": t["tournament_name"], "id": t["tournament_id"]}
+                for t in get_reference_list(conn, "Tournaments", ("tournament_name", "tournament_id"))
+            ]
         except mysql.connector.Error as e:
             logger.error(f"Error retrieving tournaments for dropdown: {e}")
 
@@ -802,7 +950,7 @@ def tournament_stats():
                        p1.player_name AS player1_name, p2.player_name AS player2_name,
                        bc1.combination_name AS player1_combination, bc2.combination_name AS player2_combination,
                         lt1.launcher_name as player1_launcher, lt2.launcher_name as player2_launcher,
-                       m.finish_type, COALESCE(w.player_name, 'Draw') AS winner_name, m.end_time
+                       m.finish_type, COALESCE(w.player_name, 'Draw') AS winner_name, m.end_time, m.points
                 FROM Tournaments t
                 LEFT JOIN Matches m ON t.tournament_id = m.tournament_id
                 LEFT JOIN Players p1 ON m.player1_id = p1.player_id
@@ -823,7 +971,7 @@ def tournament_stats():
         # Process Tournament and Match Data
         tournaments_data = {}
         for row in results:
-            tournament_name, start_date, end_date, match_id, player1_name, player2_name, player1_combination, player2_combination, player1_launcher, player2_launcher, finish_type, winner_name, end_time = row
+            tournament_name, start_date, end_date, match_id, player1_name, player2_name, player1_combination, player2_combination, player1_launcher, player2_launcher, finish_type, winner_name, end_time, points = row
             if tournament_name not in tournaments_data:
                 tournaments_data[tournament_name] = {
                     "start_date": start_date,
@@ -841,7 +989,8 @@ def tournament_stats():
                     "player2_launcher":player2_launcher,
                     "finish_type": finish_type,
                     "winner": winner_name,
-                    "match_time": end_time
+                    "match_time": end_time,
+                    "points": points
                 })
 
         tournaments = [] #reset the list to only include the selected tournament data
@@ -900,18 +1049,7 @@ def calculate_tournament_stats(tournament):
         if match["winner"] == "Draw":
             num_draws += 1
         elif match["winner"]: #check for a winner
-            if match["finish_type"] == "Survivor":
-                points = 1
-            elif match["finish_type"] == "Burst":
-                points = 2
-            elif match["finish_type"] == "KO":
-                points = 2
-            elif match["finish_type"] == "Extreme":
-                points = 3
-            else:
-                points = 0 # Default to 0 if finish type is unknown
-
-            player_points[match["winner"]] += points
+            player_points[match["winner"]] += match["points"]
             player_wins[match["winner"]] += 1
             if match["winner"] == match["player1"]:
                 combination_wins[match["player1_combination"]] += 1
@@ -955,6 +1093,7 @@ def calculate_tournament_stats(tournament):
     }
 
 @app.route('/players/stats', methods=['GET'])
+@etag_cached("Players", "BeybladeCombinations", "Tournaments")
 def player_stats():
     conn = get_db_connection()
     if conn is None:
@@ -968,21 +1107,20 @@ def player_stats():
     try:
         # Get all players for the dropdown
         try:
-            cursor.execute("SELECT player_name, player_id FROM Players")
-            all_players = [{"name": p[0], "id": p[1]} for p in cursor.fetchall()]
+            all_players = [{"name": p["player_name"], "id": p["player_id"]} for p in get_reference_list(conn, "Players", ("player_name", "player_id"))]
         except mysql.connector.Error as e:
             logger.error(f"Error retrieving players for dropdown: {e}")
 
         if selected_player:
             try:
-                cursor.execute(f"""
+                cursor.execute("""
                     SELECT m.player1_id, m.player2_id,
                            m.player1_combination_id, m.player2_combination_id,
                            p.player_name as player1_name, p2.player_name as player2_name,
                            bc1.combination_name as player1_combination_name, bc2.combination_name as player2_combination_name,
                            lt1.launcher_name as player1_launcher, lt2.launcher_name as player2_launcher,
                            m.finish_type, COALESCE(w.player_name, 'Draw') AS winner_name, m.end_time,
-                           t.tournament_name
+                           t.tournament_name, m.points
                     FROM Matches m
                     LEFT JOIN Players p ON m.player1_id = p.player_id
                     LEFT JOIN Players p2 ON m.player2_id = p2.player_id
@@ -992,10 +1130,10 @@ def player_stats():
                     LEFT JOIN Launchers lt2 ON m.player2_launcher_id = lt2.launcher_id
                     LEFT JOIN Players w ON m.winner_id = w.player_id
                     LEFT JOIN Tournaments t ON m.tournament_id = t.tournament_id
-                    WHERE (m.player1_id = {selected_player} OR m.player2_id = {selected_player})
+                    WHERE m.match_id IN (SELECT match_id FROM MatchSides WHERE player_id = %s)
                     AND m.player1_id != m.player2_id
                     ORDER BY m.end_time DESC
-                """)
+                """, (selected_player,))
                 results = cursor.fetchall()
             except mysql.connector.Error as e:
                 logger.error(f"Error retrieving player/match data: {e}")
@@ -1004,7 +1142,7 @@ def player_stats():
             player_data = {int(selected_player): {"matches": [], "name": None}}
 
             for row in results:
-                p1_id, p2_id, p1_comb_id, p2_comb_id, p1_name, p2_name, p1_comb_name, p2_comb_name, p1_launcher, p2_launcher, finish, winner, time, tournament = row
+                p1_id, p2_id, p1_comb_id, p2_comb_id, p1_name, p2_name, p1_comb_name, p2_comb_name, p1_launcher, p2_launcher, finish, winner, time, tournament, points = row
                 player_id = int(selected_player)
 
                 if player_data[player_id]["name"] is None:
@@ -1025,7 +1163,8 @@ def player_stats():
                     "player1_combination": p1_comb_name,
                     "player2_combination": p2_comb_name,
                     "player1_launcher": p1_launcher,
-                    "player2_launcher": p2_launcher
+                    "player2_launcher": p2_launcher,
+                    "points": points
                 })
 
             player_details = player_data[int(selected_player)]
@@ -1079,16 +1218,8 @@ def calculate_player_stats(player):
 
         if result == "win":
             wins_against_each_opponent[opponent] += 1
-            if match["finish_type"] == "Survivor":
-                points = 1
-            elif match["finish_type"] in ("Burst", "KO"):
-                points = 2
-            elif match["finish_type"] == "Extreme":
-                points = 3
-            else:
-                points = 0
             wins += 1
-            total_points += points
+            total_points += match["points"]
             win_by_finish[match["finish_type"]] += 1
 
             if current_streak_type == "win":
@@ -1144,6 +1275,7 @@ def calculate_player_stats(player):
     }
 
 @app.route('/combinations/stats', methods=['GET'])
+@etag_cached("Players", "BeybladeCombinations", "Tournaments")
 def combinations_stats():
     conn = get_db_connection()
     if conn is None:
@@ -1156,14 +1288,16 @@ def combinations_stats():
 
     try:
         try:
-            cursor.execute("SELECT combination_name, combination_id FROM BeybladeCombinations")
-            all_combinations = [{"name": c[0], "id": c[1]} for c in cursor.fetchall()]
+            all_combinations = [
+                {"name": c["combination_name"], "id": c["combination_id"]}
+                for c in get_reference_list(conn, "BeybladeCombinations", ("combination_name", "combination_id"))
+            ]
         except mysql.connector.Error as e:
             logger.error(f"Error retrieving combinations for dropdown: {e}")
 
         if selected_combination:
             try:
-                cursor.execute(f"""
+                cursor.execute("""
                     SELECT m.player1_id, m.player2_id,
                            p.player_name as player1_name, p2.player_name as player2_name,
                            bc1.combination_name as player1_combination, bc2.combination_name as player2_combination,
@@ -1176,9 +1310,9 @@ def combinations_stats():
                     LEFT JOIN BeybladeCombinations bc2 ON m.player2_combination_id = bc2.combination_id
                     LEFT JOIN Players w ON m.winner_id = w.player_id
                     LEFT JOIN Tournaments t ON m.tournament_id = t.tournament_id
-                    WHERE (m.player1_combination_id = {selected_combination} OR m.player2_combination_id = {selected_combination})
+                    WHERE m.match_id IN (SELECT match_id FROM MatchSides WHERE combination_id = %s)
                     ORDER BY m.end_time DESC
-                """)
+                """, (selected_combination,))
                 results = cursor.fetchall()
             except mysql.connector.Error as e:
                 logger.error(f"Error retrieving match data for combination: {e}")
@@ -1305,6 +1439,7 @@ def calculate_combination_stats(combination):
     }
 
 @app.route('/leaderboard', methods=['GET'])
+@etag_cached("Players", "BeybladeCombinations", "Tournaments")
 def leaderboard():
     conn = get_db_connection()
     if conn is None:
@@ -1320,97 +1455,67 @@ def leaderboard():
         columns_to_show = request.args.getlist('columns')
 
         where_clause = ""
-        query_params = [num_players]
+        player_filter = ""
+        query_params = []
 
         if tournament_id:
-            where_clause = "WHERE m.tournament_id = %s"
-            query_params.insert(0, tournament_id)
+            where_clause = "WHERE tournament_id = %s"
+            player_filter = "WHERE t.player_id IS NOT NULL"
+            query_params.append(tournament_id)
+        query_params.append(num_players)
 
+        # One pass: per-player totals plus the top combination, win type and
+        # loss type per player, each picked with ROW_NUMBER() over a grouped CTE.
         cursor.execute(f"""
+            WITH sides AS (
+                SELECT * FROM ({MATCH_SIDES_SQL}) AS all_sides
+                {where_clause}
+            ),
+            totals AS (
+                SELECT player_id, SUM(won) AS wins, SUM(lost) AS losses, SUM(drawn) AS draws, SUM(points) AS points
+                FROM sides
+                GROUP BY player_id
+            ),
+            combinations AS (
+                SELECT player_id, combination_id,
+                       ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY COUNT(*) DESC, combination_id) AS position
+                FROM sides
+                WHERE combination_id IS NOT NULL
+                GROUP BY player_id, combination_id
+            ),
+            win_types AS (
+                SELECT player_id, finish_type,
+                       ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY COUNT(*) DESC, finish_type) AS position
+                FROM sides
+                WHERE won = 1
+                GROUP BY player_id, finish_type
+            ),
+            loss_types AS (
+                SELECT player_id, finish_type,
+                       ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY COUNT(*) DESC, finish_type) AS position
+                FROM sides
+                WHERE lost = 1
+                GROUP BY player_id, finish_type
+            )
             SELECT p.player_id, p.player_name,
-                   COUNT(CASE WHEN m.winner_id = p.player_id THEN 1 END) AS wins,
-                   COUNT(CASE WHEN (m.player1_id = p.player_id OR m.player2_id = p.player_id) AND m.winner_id != p.player_id AND m.draw = FALSE AND m.winner_id IS NOT NULL THEN 1 END) AS losses,
-                   COUNT(CASE WHEN (m.player1_id = p.player_id OR m.player2_id = p.player_id) AND m.draw = TRUE THEN 1 END) AS draws,
-                   SUM(CASE
-                       WHEN m.winner_id = p.player_id AND m.finish_type = 'Survivor' THEN 1
-                       WHEN m.winner_id = p.player_id AND (m.finish_type = 'Burst' OR m.finish_type = 'KO') THEN 2
-                       WHEN m.winner_id = p.player_id AND m.finish_type = 'Extreme' THEN 3
-                       ELSE 0
-                   END) AS points
+                   COALESCE(t.wins, 0) AS wins, COALESCE(t.losses, 0) AS losses,
+                   COALESCE(t.draws, 0) AS draws, COALESCE(t.points, 0) AS points,
+                   bc.combination_name, w.finish_type, l.finish_type
             FROM Players p
-            LEFT JOIN Matches m ON p.player_id IN (m.player1_id, m.player2_id)
-            {where_clause}
-            GROUP BY p.player_id, p.player_name
+            LEFT JOIN totals t ON t.player_id = p.player_id
+            LEFT JOIN combinations c ON c.player_id = p.player_id AND c.position = 1
+            LEFT JOIN BeybladeCombinations bc ON bc.combination_id = c.combination_id
+            LEFT JOIN win_types w ON w.player_id = p.player_id AND w.position = 1
+            LEFT JOIN loss_types l ON l.player_id = p.player_id AND l.position = 1
+            {player_filter}
             ORDER BY points DESC
             LIMIT %s
         """, tuple(query_params))
 
         player_results = cursor.fetchall()
         leaderboard_data = []
-        rank = 1
-
-        for player_id, player_name, wins, losses, draws, points in player_results:
-            most_used_combination = "N/A"
-            most_common_win_type = "N/A"
-            most_common_loss_type = "N/A"
-
-            combination_query_params = [player_id, player_id]
-            win_type_query_params = [player_id]
-            loss_type_query_params = [player_id, player_id, player_id]
-            combination_where_clause = ""
-            win_type_where_clause = ""
-            loss_type_where_clause = ""
-
-            if tournament_id:
-                combination_where_clause = "AND m.tournament_id = %s"
-                win_type_where_clause = "AND m.tournament_id = %s"
-                loss_type_where_clause = "AND m.tournament_id = %s"
-                combination_query_params.append(tournament_id)
-                win_type_query_params.append(tournament_id)
-                loss_type_query_params.append(tournament_id)
-
-            cursor.execute(f"""
-                SELECT bc.combination_name
-                FROM Matches m
-                JOIN BeybladeCombinations bc ON (
-                    (m.player1_id = %s AND m.player1_combination_id = bc.combination_id) OR
-                    (m.player2_id = %s AND m.player2_combination_id = bc.combination_id)
-                )
-                {combination_where_clause}
-                GROUP BY bc.combination_name
-                ORDER BY COUNT(*) DESC
-                LIMIT 1
-            """, tuple(combination_query_params))
-            combination_result = cursor.fetchone()
-            if combination_result:
-                most_used_combination = combination_result[0]
-
-            cursor.execute(f"""
-                SELECT m.finish_type
-                FROM Matches m
-                WHERE m.winner_id = %s
-                {win_type_where_clause}
-                GROUP BY m.finish_type
-                ORDER BY COUNT(*) DESC
-                LIMIT 1
-            """, tuple(win_type_query_params))
-            win_type_result = cursor.fetchone()
-            if win_type_result:
-                most_common_win_type = win_type_result[0]
-
-            cursor.execute(f"""
-                SELECT m.finish_type
-                FROM Matches m
-                WHERE (m.player1_id = %s OR m.player2_id = %s) AND m.draw = FALSE AND m.winner_id != %s
-                {loss_type_where_clause}
-                GROUP BY m.finish_type
-                ORDER BY COUNT(*) DESC
-                LIMIT 1
-            """, tuple(loss_type_query_params))
-            loss_type_result = cursor.fetchone()
-            if loss_type_result:
-                most_common_loss_type = loss_type_result[0]
 
+        for rank, (player_id, player_name, wins, losses, draws, points, most_used_combination, most_common_win_type, most_common_loss_type) in enumerate(player_results, start=1):
             leaderboard_data.append({
                 "rank": rank,
                 "name": player_name,
@@ -1418,16 +1523,13 @@ def leaderboard():
                 "wins": wins,
                 "losses": losses,
                 "draws": draws,
-                "most_used_combination": most_used_combination,
-                "most_common_win_type": most_common_win_type,
-                "most_common_loss_type": most_common_loss_type,
+                "most_used_combination": most_used_combination or "N/A",
+                "most_common_win_type": most_common_win_type or "N/A",
+                "most_common_loss_type": most_common_loss_type or "N/A",
             })
-            rank += 1
 
         try:
-            cursor.execute("SELECT tournament_id, tournament_name FROM Tournaments")
-            tournaments = cursor.fetchall()
-            tournaments = [dict(zip([column[0] for column in cursor.description], row)) for row in tournaments]
+            tournaments = get_reference_list(conn, "Tournaments", ("tournament_id", "tournament_name"))
         except mysql.connector.Error as e:
             logger.error(f"Error fetching tournaments: {e}")
             tournaments = []
@@ -1442,7 +1544,62 @@ def leaderboard():
             conn.close()
 
 
+# tournament_id (or None for all matches) -> full ranking, refreshed after each new
+# match or when a combination or player is added
+combination_rankings = GenerationCache(maxsize=64, tables=("BeybladeCombinations", "Players"))
+
+def load_combination_ranking(cursor, tournament_id):
+    """Ranks every combination by points, then usage, in one grouped pass over the match sides."""
+    where_clause = ""
+    combination_filter = ""
+    query_params = []
+    if tournament_id:
+        where_clause = "WHERE tournament_id = %s"
+        combination_filter = "WHERE t.combination_id IS NOT NULL"
+        query_params.append(tournament_id)
+
+    # most_used_by comes from per-(combination, player) counts, ranked once
+    # with ROW_NUMBER() instead of a correlated subquery per combination.
+    cursor.execute(f"""
+        WITH sides AS (
+            SELECT * FROM ({MATCH_SIDES_SQL}) AS all_sides
+            {where_clause}
+        ),
+        totals AS (
+            SELECT combination_id, COUNT(*) AS usage_count,
+                   SUM(won) AS wins, SUM(lost) AS losses, SUM(drawn) AS draws, SUM(points) AS points
+            FROM sides
+            WHERE combination_id IS NOT NULL
+            GROUP BY combination_id
+        ),
+        users AS (
+            SELECT combination_id, player_id,
+                   ROW_NUMBER() OVER (PARTITION BY combination_id ORDER BY COUNT(*) DESC, player_id) AS position
+            FROM sides
+            WHERE combination_id IS NOT NULL AND player_id IS NOT NULL
+            GROUP BY combination_id, player_id
+        )
+        SELECT bc.combination_id, bc.combination_name,
+               COALESCE(t.usage_count, 0) AS usage_count, COALESCE(t.wins, 0) AS wins,
+               COALESCE(t.losses, 0) AS losses, COALESCE(t.draws, 0) AS draws,
+               COALESCE(t.points, 0) AS points, p.player_name AS most_used_by
+        FROM BeybladeCombinations bc
+        LEFT JOIN totals t ON t.combination_id = bc.combination_id
+        LEFT JOIN users u ON u.combination_id = bc.combination_id AND u.position = 1
+        LEFT JOIN Players p ON p.player_id = u.player_id
+        {combination_filter}
+        ORDER BY points DESC, usage_count DESC
+    """, tuple(query_params))
+
+    ranking = []
+    for rank, row in enumerate(cursor.fetchall(), start=1):
+        row['rank'] = rank
+        row['win_rate'] = (row['wins'] / (row['wins'] + row['losses']) * 100) if (row['wins'] + row['losses']) > 0 else 0
+        ranking.append(row)
+    return ranking
+
 @app.route('/combination_leaderboard', methods=['GET'])
+@etag_cached("Players", "BeybladeCombinations", "Tournaments")
 def combination_leaderboard():
     conn = get_db_connection()
     if conn is None:
@@ -1454,76 +1611,16 @@ def combination_leaderboard():
         if num_combinations < 1:
             num_combinations = 5
 
-        tournament_id = request.args.get('tournament_id')
+        tournament_id = request.args.get('tournament_id', type=int)  # None for all matches, or when not a number
         columns_to_show = request.args.getlist('columns')
         if not columns_to_show:
             columns_to_show = ["rank", "name", "usage_count", "wins", "losses", "draws", "points", "win_rate", "most_used_by"]
 
-        query = """
-            SELECT bc.combination_id, bc.combination_name,
-                   COUNT(m.match_id) AS usage_count,
-                   SUM(CASE WHEN m.winner_id = m.player1_id AND m.player1_combination_id = bc.combination_id THEN 1
-                            WHEN m.winner_id = m.player2_id AND m.player2_combination_id = bc.combination_id THEN 1
-                            ELSE 0 END) AS wins,
-                   SUM(CASE WHEN m.winner_id != m.player1_id AND m.player1_combination_id = bc.combination_id AND m.draw = FALSE AND m.winner_id IS NOT NULL THEN 1
-                            WHEN m.winner_id != m.player2_id AND m.player2_combination_id = bc.combination_id AND m.draw = FALSE AND m.winner_id IS NOT NULL THEN 1
-                            ELSE 0 END) AS losses,
-                   SUM(CASE WHEN (m.player1_combination_id = bc.combination_id OR m.player2_combination_id = bc.combination_id) AND m.draw = TRUE THEN 1 ELSE 0 END) as draws,
-                    SUM(CASE
-                        WHEN (m.winner_id = m.player1_id AND m.player1_combination_id = bc.combination_id) AND m.finish_type = 'Survivor' THEN 1
-                        WHEN (m.winner_id = m.player2_id AND m.player2_combination_id = bc.combination_id) AND m.finish_type = 'Survivor' THEN 1
-                        WHEN (m.winner_id = m.player1_id AND m.player1_combination_id = bc.combination_id) AND (m.finish_type = 'Burst' OR m.finish_type = 'KO') THEN 2
-                        WHEN (m.winner_id = m.player2_id AND m.player2_combination_id = bc.combination_id) AND (m.finish_type = 'Burst' OR m.finish_type = 'KO') THEN 2
-                        WHEN (m.winner_id = m.player1_id AND m.player1_combination_id = bc.combination_id) AND m.finish_type = 'Extreme' THEN 3
-                        WHEN (m.winner_id = m.player2_id AND m.player2_combination_id = bc.combination_id) AND m.finish_type = 'Extreme' THEN 3
-                        ELSE 0
-                    END) AS points,
-                   (SELECT p.player_name
-                    FROM Players p
-                    INNER JOIN (
-                        SELECT player1_id AS player_id, player1_combination_id AS combination_id FROM Matches %s
-                        UNION ALL
-                        SELECT player2_id, player2_combination_id FROM Matches %s
-                    ) AS player_combinations ON p.player_id = player_combinations.player_id
-                    WHERE player_combinations.combination_id = bc.combination_id
-                    GROUP BY p.player_name ORDER BY COUNT(*) DESC LIMIT 1
-                   ) AS most_used_by
-            FROM BeybladeCombinations bc
-            LEFT JOIN Matches m ON bc.combination_id IN (m.player1_combination_id, m.player2_combination_id)
-            %s
-            GROUP BY bc.combination_id, bc.combination_name
-            ORDER BY points DESC, usage_count DESC
-            LIMIT %s
-        """
-
-        query_params = []
-        subquery_condition = ""
-        main_query_condition = ""
-
-        if tournament_id:
-            subquery_condition = "WHERE tournament_id = %s"
-            main_query_condition = "WHERE tournament_id = %s"
-            query_params.extend([tournament_id, tournament_id, tournament_id])
-
-        query_params.append(num_combinations)
-
-        query = query % (subquery_condition, subquery_condition, main_query_condition, "%s")
-        cursor.execute(query, tuple(query_params))
-
-        combination_results = cursor.fetchall()
-
-        leaderboard_data = []
-        rank = 1
-        for row in combination_results:
-            row['rank'] = rank
-            row['win_rate'] = (row.get('wins',0) / (row.get('wins',0) + row.get('losses',0)) * 100) if (row.get('wins',0) + row.get('losses',0)) > 0 else 0
-            leaderboard_data.append(row)
-            rank += 1
+        ranking = combination_rankings.get_or_compute(tournament_id, lambda: load_combination_ranking(cursor, tournament_id))
+        leaderboard_data = ranking[:num_combinations]
 
         try:
-            cursor.execute("SELECT tournament_id, tournament_name FROM Tournaments")
-            tournaments = cursor.fetchall()
-            tournaments = [dict(row) for row in tournaments]
+            tournaments = get_reference_list(conn, "Tournaments", ("tournament_id", "tournament_name"))
         except mysql.connector.Error as e:
             logger.error(f"Error fetching tournaments: {e}")
             tournaments = []
@@ -1550,15 +1647,7 @@ def combinations_types_stats():
 
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT bc1.combination_type, bc2.combination_type, COALESCE(w.player_name, 'Draw') AS winner_name, m.draw
-                FROM Matches m
-                LEFT JOIN BeybladeCombinations bc1 ON m.player1_combination_id = bc1.combination_id
-                LEFT JOIN BeybladeCombinations bc2 ON m.player2_combination_id = bc2.combination_id
-                LEFT JOIN Players w ON m.winner_id = w.player_id
-            """)
-            matches = cursor.fetchall()
-            type_stats = calculate_combination_type_stats(matches)
+            type_stats = combination_type_stats.get_or_compute(None, lambda: load_combination_type_stats(cursor))
 
     except mysql.connector.Error as e:
         logger.error(f"Database error: {e}")
@@ -1569,227 +1658,202 @@ def combinations_types_stats():
 
     return render_template('combinations_types.html', type_stats=type_stats)
 
-def calculate_combination_type_stats(matches_data):
+combination_type_stats = GenerationCache()  # None -> type usage and matchup table, refreshed after each new match
+
+def load_combination_type_stats(cursor):
+    """Reads the maintained type-vs-type counters and builds the page's statistics from them."""
+    cursor.execute("SELECT type1, type2, matches_played, type1_wins, type2_wins FROM CombinationTypeMatchupAgg")
+    return calculate_combination_type_stats(cursor.fetchall())
+
+def calculate_combination_type_stats(matchup_rows):
+    """Calculates type usage and type-vs-type win rates in one pass over per-pairing counters.
+
+    Each row is (type1, type2, matches_played, type1_wins, type2_wins) with the
+    pairing sorted by type name, as stored in CombinationTypeMatchupAgg.
+    """
     type_usage = Counter()
     type_matchups = {}
 
-    for p1_type, p2_type, winner_name, draw in matches_data:
-        type_usage[p1_type] += 1
-        type_usage[p2_type] += 1
+    for type1, type2, matches_played, type1_wins, type2_wins in matchup_rows:
+        type_usage[type1] += matches_played
+        type_usage[type2] += matches_played
 
-        if draw or winner_name == 'Draw' or winner_name is None:
+        total = type1_wins + type2_wins
+        if total == 0:
             continue
-
-        matchup_key = tuple(sorted((p1_type, p2_type)))
-        matchup = type_matchups.setdefault(matchup_key, {"p1_wins": 0, "p2_wins": 0, "total": 0})
-        matchup["total"] += 1
-
-        # Correctly determine the winner based on player names
-        if winner_name in (p1_type, p2_type):  # If winner is a type
-            if winner_name == p1_type:
-                matchup["p1_wins"] += 1
-            elif winner_name == p2_type:
-                matchup["p2_wins"] += 1
-        else:  # If winner is a player name
-            for p1_type_check, p2_type_check, winner_check, draw_check in matches_data:
-                if winner_check == winner_name and not draw_check:
-                    if winner_check == p1_type_check: 
-                        winner_type = p1_type_check
-                    else:
-                        winner_type = p2_type_check
-                    if winner_type == p1_type:
-                        matchup["p1_wins"] += 1
-                    elif winner_type == p2_type:
-                        matchup["p2_wins"] += 1
-                    break 
+        type_matchups[(type1, type2)] = {
+            "p1_wins": type1_wins,
+            "p2_wins": type2_wins,
+            "total": total,
+            # In a mirror pairing both keys coincide; type1 holds every win.
+            "win_rates": {
+                type2: round((type2_wins / total) * 100, 1),
+                type1: round((type1_wins / total) * 100, 1),
+            },
+        }
 
     most_common_type = type_usage.most_common(1)[0] if type_usage else None
 
-    for matchup_key, stats in type_matchups.items():
-        total = stats["total"]
-        type_matchups[matchup_key]["win_rates"] = {
-            matchup_key[0]: round((stats["p1_wins"] / total) * 100, 1) if total > 0 else 0.0,
-            matchup_key[1]: round((stats["p2_wins"] / total) * 100, 1) if total > 0 else 0.0
-        }
-
     return {
         "most_common_type": most_common_type,
         "type_usage": type_usage,
-        "type_matchups": type_matchups
+        "type_matchups": dict(sorted(type_matchups.items())),
     }
 
-def publish_stats_to_mqtt(client):
-    conn = get_db_connection()
-    if conn is None:
-        logger.error("Could not connect to database to publish MQTT stats.")
-        return
+def publish_top_stats_bulk(stats, payload):
+    """Publishes the already-encoded /api/beyblade_stats payload once, with sensors reading each top entry out of it."""
+    mqtt_delta.publish(MQTT_TOPIC_PREFIX + "beyblade_stats", payload, retain=True)
+
+    for key, label, fields in (
+        ("top_players", "Top Player", ("name", "points", "wins", "losses", "draws")),
+        ("top_combinations", "Top Combination", ("name", "points")),
+    ):
+        for i in range(len(stats[key])):
+            for field in fields:
+                config = {
+                    "name": f"{label} {i+1} {field.capitalize()}",
+                    "state_topic": MQTT_TOPIC_PREFIX + "beyblade_stats",
+                    "value_template": f"{{{{ value_json.{key}[{i}].{field} if value_json.{key} | length > {i} else None }}}}",
+                }
+                if field != "name":
+                    config.update({"unit_of_measurement": field.capitalize(), "state_class": "measurement", "icon": "mdi:trophy"})
+                mqtt_delta.publish_once(
+                    f"{MQTT_DISCOVERY_PREFIX}/sensor/{key[:-1]}_{i+1}_{field}/config", json.dumps(config), retain=True
+                )
 
-    try:
-        with conn.cursor() as cursor:
-            # Total Matches
-            cursor.execute("SELECT COUNT(*) FROM Matches WHERE draw = 0")
-            total_matches = int(cursor.fetchone()[0])
+def load_top_stats(cursor, limit=3):
+    """Returns the top players (name, points, wins, losses, draws) and combinations (name, points) by points."""
+    cursor.execute("""
+        SELECT p.player_name, SUM(s.points) AS total_points, SUM(s.won), SUM(s.lost), SUM(s.drawn)
+        FROM MatchSides s
+        JOIN Players p ON p.player_id = s.player_id
+        GROUP BY s.player_id, p.player_name
+        ORDER BY total_points DESC
+        LIMIT %s
+    """, (limit,))
+    player_stats = cursor.fetchall()
+    cursor.execute("""
+        SELECT bc.combination_name, SUM(s.points) AS total_points
+        FROM MatchSides s
+        JOIN BeybladeCombinations bc ON bc.combination_id = s.combination_id
+        GROUP BY s.combination_id, bc.combination_name
+        ORDER BY total_points DESC
+        LIMIT %s
+    """, (limit,))
+    return player_stats, cursor.fetchall()
+
+def load_beyblade_stats(cursor):
+    """Builds the /api/beyblade_stats payload: decided matches plus the top players and combinations by points."""
+    cursor.execute("SELECT COUNT(*) FROM Matches WHERE draw = 0")
+    total_matches = int(cursor.fetchone()[0])
+    player_stats, combination_stats = load_top_stats(cursor)
+    return {
+        "total_matches": total_matches,
+        "top_players": [
+            {
+                "name": name,
+                "points": int(points or 0),
+                "wins": int(wins or 0),
+                "losses": int(losses or 0),
+                "draws": int(draws or 0)
+            }
+            for name, points, wins, losses, draws in player_stats
+        ],
+        "top_combinations": [
+            {"name": name, "points": int(points or 0)} for name, points in combination_stats
+        ]
+    }
 
-            # Player Stats Query
-            cursor.execute("""
-                SELECT 
-                    p.player_name,
-                    SUM(CASE 
-                        WHEN m.winner_id = p.player_id THEN
-                            CASE m.finish_type
-                                WHEN 'Survivor' THEN 1
-                                WHEN 'Burst' THEN 2
-                                WHEN 'KO' THEN 2
-                                WHEN 'Extreme' THEN 3
-                                ELSE 0
-                            END
-                        ELSE 0
-                    END) AS total_points,
-                  SUM(CASE WHEN m.winner_id = p.player_id THEN 1 ELSE 0 END) AS wins,
-                  SUM(CASE WHEN m.winner_id != p.player_id AND m.winner_id IS NOT NULL THEN 1 ELSE 0 END) AS losses,
-                  SUM(CASE WHEN m.draw = 1 THEN 1 ELSE 0 END) AS draws
-                FROM Matches m
-                INNER JOIN Players p ON m.player1_id = p.player_id OR m.player2_id = p.player_id
-                GROUP BY p.player_name
-                ORDER BY total_points DESC
-                LIMIT 3;
-            """)
-            player_stats = cursor.fetchall()
+def publish_stats_to_mqtt(stats, payload):
+    """Publishes the beyblade_stats built (and encoded to payload) by the route, without querying again."""
+    mqtt_delta.publish(MQTT_TOPIC_PREFIX + "total_matches", stats["total_matches"], retain=True)
+    mqtt_delta.publish_once("homeassistant/sensor/beyblade_total_matches/config", json.dumps({
+        "name": "Beyblade Total Matches",
+        "state_topic": MQTT_TOPIC_PREFIX + "total_matches",
+        "unit_of_measurement": "Matches",
+        "state_class": "measurement",
+        "icon": "mdi:counter"
+    }), retain=True)
+
+    if MQTT_BULK_MODE:
+        publish_top_stats_bulk(stats, payload)
+        return
 
-            # Combination Stats Query
-            cursor.execute("""
-                SELECT 
-                    bc.combination_name,
-                    SUM(CASE 
-                        WHEN m.player1_combination_id = bc.combination_id AND m.winner_id = m.player1_id THEN
-                            CASE m.finish_type
-                                WHEN 'Survivor' THEN 1
-                                WHEN 'Burst' THEN 2
-                                WHEN 'KO' THEN 2
-                                WHEN 'Extreme' THEN 3
-                                ELSE 0
-                            END
-                        WHEN m.player2_combination_id = bc.combination_id AND m.winner_id = m.player2_id THEN
-                             CASE m.finish_type
-                                WHEN 'Survivor' THEN 1
-                                WHEN 'Burst' THEN 2
-                                WHEN 'KO' THEN 2
-                                WHEN 'Extreme' THEN 3
-                                ELSE 0
-                            END
-                        ELSE 0  -- For losses and draws
-                    END) AS total_points
-                FROM Matches m
-                INNER JOIN BeybladeCombinations bc ON m.player1_combination_id = bc.combination_id OR m.player2_combination_id = bc.combination_id
-                GROUP BY bc.combination_name
-                ORDER BY total_points DESC
-                LIMIT 3;
-            """)
-            combination_stats = cursor.fetchall()
-
-        # Publish to MQTT (Data and Discovery Messages)
-        client.publish(MQTT_TOPIC_PREFIX + "total_matches", total_matches, retain=True)
-        client.publish("homeassistant/sensor/beyblade_total_matches/config", json.dumps({
-            "name": "Beyblade Total Matches",
-            "state_topic": MQTT_TOPIC_PREFIX + "total_matches",
-            "unit_of_measurement": "Matches",
-            "state_class": "measurement",
-            "icon": "mdi:counter"
-        }), retain=True)
+    for i, player in enumerate(stats["top_players"]):
+        base_topic = MQTT_TOPIC_PREFIX + f"top_players/{i}/"
+        for field in ("name", "points", "wins", "losses", "draws"):
+            mqtt_delta.publish(base_topic + field, player[field], retain=True)
 
-        for i, player in enumerate(player_stats):
-            base_topic = MQTT_TOPIC_PREFIX + f"top_players/{i}/"
-            player_name = player[0]
-            player_points = player[1]
-            player_wins = player[2]
-            player_losses = player[3]
-            player_draws = player[4]
-            for player, points in player_points.items():
-                # Ensure points is a Decimal object
-                if isinstance(points, decimal.Decimal):
-                    player_points[player] = str(points)  # Convert Decimal to string
-
-            client.publish(base_topic + "name", player_name, retain=True)
-            #logger.info(f"player_points data: {player_points}")  # Print the data for inspection
-            player_points_json = json.dumps(player_points)
-            client.publish(base_topic + "points", player_points_json, retain=True)
-            client.publish(base_topic + "points", player_points, retain=True)
-            client.publish(base_topic + "wins", player_wins, retain=True)
-            client.publish(base_topic + "losses", player_losses, retain=True)
-            client.publish(base_topic + "draws", player_draws, retain=True)
-
-            discovery_config_name = {
-                "name": f"Top Player {i+1} Name",
-                "state_topic": base_topic + "name",
-            }
-            client.publish(f"homeassistant/sensor/top_player_{i+1}_name/config", json.dumps(discovery_config_name), retain=True)
-
-            discovery_config_points = {
-                "name": f"Top Player {i+1} Points",
-                "state_topic": base_topic + "points",
-                "unit_of_measurement": "Points",
-                "state_class": "measurement",
-                "icon": "mdi:trophy"
-            }
-            client.publish(f"homeassistant/sensor/top_player_{i+1}_points/config", json.dumps(discovery_config_points), retain=True)
-            discovery_config_wins = {
-                "name": f"Top Player {i+1} Wins",
-                "state_topic": base_topic + "wins",
-                "unit_of_measurement": "Wins",
-                "state_class": "measurement",
-                "icon": "mdi:trophy-variant"
-            }
-            client.publish(f"homeassistant/sensor/top_player_{i+1}_wins/config", json.dumps(discovery_config_wins), retain=True)
-            discovery_config_losses = {
-                "name": f"Top Player {i+1} Losses",
-                "state_topic": base_topic + "losses",
-                "unit_of_measurement": "Losses",
-                "state_class": "measurement",
-                "icon": "mdi:trophy-variant"
-            }
-            client.publish(f"homeassistant/sensor/top_player_{i+1}_losses/config", json.dumps(discovery_config_losses), retain=True)
-            discovery_config_draws = {
-                "name": f"Top Player {i+1} Draws",
-                "state_topic": base_topic + "draws",
-                "unit_of_measurement": "Draws",
-                "state_class": "measurement",
-                "icon": "mdi:trophy-variant"
-            }
-            client.publish(f"homeassistant/sensor/top_player_{i+1}_draws/config", json.dumps(discovery_config_draws), retain=True)
+        discovery_config_name = {
+            "name": f"Top Player {i+1} Name",
+            "state_topic": base_topic + "name",
+        }
+        mqtt_delta.publish_once(f"homeassistant/sensor/top_player_{i+1}_name/config", json.dumps(discovery_config_name), retain=True)
 
+        discovery_config_points = {
+            "name": f"Top Player {i+1} Points",
+            "state_topic": base_topic + "points",
+            "unit_of_measurement": "Points",
+            "state_class": "measurement",
+            "icon": "mdi:trophy"
+        }
+        mqtt_delta.publish_once(f"homeassistant/sensor/top_player_{i+1}_points/config", json.dumps(discovery_config_points), retain=True)
+        discovery_config_wins = {
+            "name": f"Top Player {i+1} Wins",
+            "state_topic": base_topic + "wins",
+            "unit_of_measurement": "Wins",
+            "state_class": "measurement",
+            "icon": "mdi:trophy-variant"
+        }
+        mqtt_delta.publish_once(f"homeassistant/sensor/top_player_{i+1}_wins/config", json.dumps(discovery_config_wins), retain=True)
+        discovery_config_losses = {
+            "name": f"Top Player {i+1} Losses",
+            "state_topic": base_topic + "losses",
+            "unit_of_measurement": "Losses",
+            "state_class": "measurement",
+            "icon": "mdi:trophy-variant"
+        }
+        mqtt_delta.publish_once(f"homeassistant/sensor/top_player_{i+1}_losses/config", json.dumps(discovery_config_losses), retain=True)
+        discovery_config_draws = {
+            "name": f"Top Player {i+1} Draws",
+            "state_topic": base_topic + "draws",
+            "unit_of_measurement": "Draws",
+            "state_class": "measurement",
+            "icon": "mdi:trophy-variant"
+        }
+        mqtt_delta.publish_once(f"homeassistant/sensor/top_player_{i+1}_draws/config", json.dumps(discovery_config_draws), retain=True)
 
-        for i, combination in enumerate(combination_stats):
-            base_topic = MQTT_TOPIC_PREFIX + f"top_combinations/{i}/"
-            combination_name = combination[0]
-            combination_points = combination[1]
+    for i, combination in enumerate(stats["top_combinations"]):
+        base_topic = MQTT_TOPIC_PREFIX + f"top_combinations/{i}/"
+        mqtt_delta.publish(base_topic + "name", combination["name"], retain=True)
+        mqtt_delta.publish(base_topic + "points", combination["points"], retain=True)
 
-            client.publish(base_topic + "name", combination_name, retain=True)
-            client.publish(base_topic + "points", combination_points, retain=True)
+        discovery_config_points = {
+            "name": f"Top Combination {i+1} Points",
+            "state_topic": base_topic + "points",
+            "unit_of_measurement": "Points",
+            "state_class": "measurement",
+            "icon": "mdi:trophy"
+        }
+        mqtt_delta.publish_once(f"homeassistant/sensor/top_combination_{i+1}_points/config", json.dumps(discovery_config_points), retain=True)
+        discovery_config_name = {
+            "name": f"Top Combination {i+1} Name",
+            "state_topic": base_topic + "name",
+        }
+        mqtt_delta.publish_once(f"homeassistant/sensor/top_combination_{i+1}_name/config", json.dumps(discovery_config_name), retain=True)
 
-            discovery_config_points = {
-                "name": f"Top Combination {i+1} Points",
-                "state_topic": base_topic + "points",
-                "unit_of_measurement": "Points",
-                "state_class": "measurement",
-                "icon": "mdi:trophy"
-            }
-            client.publish(f"homeassistant/sensor/top_combination_{i+1}_points/config", json.dumps(discovery_config_points), retain=True)
-            discovery_config_name = {
-                "name": f"Top Combination {i+1} Name",
-                "state_topic": base_topic + "name",
-            }
-            client.publish(f"homeassistant/sensor/top_combination_{i+1}_name/config", json.dumps(discovery_config_name), retain=True)
-        client.loop_start()  # Start the network loop
-        client.publish("beyblade/stats", message_payload, qos=0)
-        client.loop_stop()  # Stop the loop after publishing (optional)
+@app.route('/api/mqtt_metrics', methods=['GET'])
+def mqtt_metrics():
+    if mqtt_publisher is None:
+        return jsonify({"error": "MQTT publisher not configured"}), 503
+    return jsonify(asdict(mqtt_publisher.metrics))
 
-    except mysql.connector.Error as e:
-        logger.error(f"Database error in publish_stats_to_mqtt: {e}")
-    finally:
-        if conn:
-            conn.close()
+@app.route('/api/db_pool_stats', methods=['GET'])
+def db_pool_stats():
+    return jsonify(pool_status())
 
 @app.route('/api/beyblade_stats', methods=['GET'])
+@etag_cached("Players", "BeybladeCombinations", max_age=API_CACHE_MAX_AGE)
 def beyblade_stats():
     conn = get_db_connection()
     if conn is None:
@@ -1797,96 +1861,20 @@ def beyblade_stats():
 
     try:
         with conn.cursor() as cursor:
-            # Total Matches
-            cursor.execute("SELECT COUNT(*) FROM Matches WHERE draw = 0")
-            total_matches = int(cursor.fetchone()[0])
-
-            # Player Stats Query
-            cursor.execute("""
-                SELECT 
-                    p.player_name,
-                    SUM(CASE 
-                        WHEN m.winner_id = p.player_id THEN
-                            CASE m.finish_type
-                                WHEN 'Survivor' THEN 1
-                                WHEN 'Burst' THEN 2
-                                WHEN 'KO' THEN 2
-                                WHEN 'Extreme' THEN 3
-                                ELSE 0
-                            END
-                        ELSE 0
-                    END) AS total_points,
-                  SUM(CASE WHEN m.winner_id = p.player_id THEN 1 ELSE 0 END) AS wins,
-                  SUM(CASE WHEN m.winner_id != p.player_id AND m.winner_id IS NOT NULL THEN 1 ELSE 0 END) AS losses,
-                  SUM(CASE WHEN m.draw = 1 THEN 1 ELSE 0 END) AS draws
-                FROM Matches m
-                INNER JOIN Players p ON m.player1_id = p.player_id OR m.player2_id = p.player_id
-                GROUP BY p.player_name
-                ORDER BY total_points DESC
-                LIMIT 3;
-            """)
-            player_stats = cursor.fetchall()
-
-            # Combination Stats Query
-            cursor.execute("""
-                SELECT 
-                    bc.combination_name,
-                    SUM(CASE 
-                        WHEN m.player1_combination_id = bc.combination_id AND m.winner_id = m.player1_id THEN
-                            CASE m.finish_type
-                                WHEN 'Survivor' THEN 1
-                                WHEN 'Burst' THEN 2
-                                WHEN 'KO' THEN 2
-                                WHEN 'Extreme' THEN 3
-                                ELSE 0
-                            END
-                        WHEN m.player2_combination_id = bc.combination_id AND m.winner_id = m.player2_id THEN
-                             CASE m.finish_type
-                                WHEN 'Survivor' THEN 1
-                                WHEN 'Burst' THEN 2
-                                WHEN 'KO' THEN 2
-                                WHEN 'Extreme' THEN 3
-                                ELSE 0
-                            END
-                        ELSE 0  -- For losses and draws
-                    END) AS total_points
-                FROM Matches m
-                INNER JOIN BeybladeCombinations bc ON m.player1_combination_id = bc.combination_id OR m.player2_combination_id = bc.combination_id
-                GROUP BY bc.combination_name
-                ORDER BY total_points DESC
-                LIMIT 3;
-            """)
-            combination_stats = cursor.fetchall()
-
-        stats = {
-            "total_matches": total_matches,
-            "top_players": [
-                {
-                    "name": name,
-                    "points": int(points),
-                    "wins": int(wins),
-                    "losses": int(losses),
-                    "draws": int(draws)
-                }
-                for name, points, wins, losses, draws in player_stats
-            ],
-            "top_combinations": [
-                {"name": name, "points": int(points)} for name, points in combination_stats
-            ]
-        }
-
-        # Publish to MQTT
-        publish_stats_to_mqtt(client)
-
-        # Return JSON response
-        return jsonify(stats)
-
+            stats = load_beyblade_stats(cursor)
     except mysql.connector.Error as e:
         logger.error(f"Database error in /api/beyblade_stats: {e}")
         return jsonify({"error": str(e)}), 500
     finally:
-        if conn:
-            conn.close()
+        conn.close()
+
+    # Encoded once; the same bytes are the HTTP body and the bulk MQTT payload.
+    payload = encode_json(stats)
+    try:
+        publish_stats_to_mqtt(stats, payload)
+    except Exception as e:
+        logger.error(f"Error publishing beyblade stats to MQTT: {e}")
+    return json_response(payload)
 
 @app.route('/add_stadium_class', methods=['GET', 'POST'], endpoint="add_stadium_class")
 def add_stadium_class():
@@ -1931,11 +1919,12 @@ def add_stadium():
         try:
             sql = """
                 INSERT INTO Stadiums (stadium_name, description, location, material, notes, stadium_class_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                VALUES (%s, %s, %s, %s, %s, %s)
             """
             val = (stadium_name, description, location, material, notes, stadium_class_id) #Include stadium_class_id
             cursor.execute(sql, val)
             conn.commit()
+            bump_reference_version("Stadiums")
             message = "Stadium added successfully!"
         except mysql.connector.Error as e:
             conn.rollback()
@@ -1951,6 +1940,120 @@ def add_stadium():
         message = request.args.get('message')
         return render_template('add_stadium.html', message=message, stadium_classes=stadium_classes)
 
+@app.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Rebuilds the materialized statistics tables from the full match history."""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Database connection error during statistics rebuild")
+        return
+    cursor = conn.cursor()
+    try:
+        rebuild_aggregates(cursor)
+        bump_stored_match_generation(cursor)
+        conn.commit()
+    except mysql.connector.Error as e:
+        conn.rollback()
+        logger.error(f"Error rebuilding statistics: {e}")
+    finally:
+        conn.close()
+
+@app.cli.command("backfill-match-sides")
+def backfill_match_sides_command():
+    """Rebuilds the MatchSides table from every match recorded so far."""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Database connection error during MatchSides backfill")
+        return
+    cursor = conn.cursor()
+    try:
+        rows = backfill_match_sides(cursor)
+        bump_stored_match_generation(cursor)
+        conn.commit()
+    except mysql.connector.Error as e:
+        conn.rollback()
+        logger.error(f"Error backfilling MatchSides: {e}")
+        return
+    finally:
+        conn.close()
+    click.echo(f"Wrote {rows} match sides")
+
+@app.cli.command("recompute-points")
+def recompute_points_command():
+    """Re-scores every match from the ScoringRules table and rebuilds the statistics that depend on points."""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Database connection error during points recompute")
+        return
+    cursor = conn.cursor()
+    try:
+        rules = load_scoring_rules(cursor)
+        changed = recompute_match_points(cursor)
+        rebuild_aggregates(cursor)
+        bump_stored_match_generation(cursor)
+        conn.commit()
+    except mysql.connector.Error as e:
+        conn.rollback()
+        logger.error(f"Error recomputing match points: {e}")
+        return
+    finally:
+        conn.close()
+    click.echo(f"Re-scored {changed} matches with {rules}")
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Applies pending schema migrations (see migrations.py)."""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Database connection error during migration")
+        return
+    try:
+        applied = apply_migrations(conn)
+    except mysql.connector.Error as e:
+        conn.rollback()
+        logger.error(f"Error applying migrations: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+    click.echo(f"Applied migrations: {', '.join(map(str, applied))}" if applied else "Schema is up to date")
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """EXPLAINs the hot Matches queries and exits non-zero if any of them scans a whole table."""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Database connection error during index check")
+        raise SystemExit(1)
+    cursor = conn.cursor()
+    try:
+        reports = explain_hot_queries(cursor)
+    finally:
+        conn.close()
+    failed = False
+    for name, plan, full_scan in reports:
+        access = ", ".join(f"{row.get('table')}:{row.get('type')}/{row.get('key') or '-'}" for row in plan)
+        click.echo(f"{'FULL SCAN' if full_scan else 'ok':9} {name}: {access}")
+        failed = failed or full_scan
+    if failed:
+        raise SystemExit(1)
+
+@app.cli.command("tune-elo")
+@click.option("--k-factor", "k_factors", multiple=True, type=float, default=(16, 24, 32, 40))
+@click.option("--participant-type", type=click.Choice(["Player", "Combination"]), default="Player")
+def tune_elo_command(k_factors, participant_type):
+    """Replays the match history for several ELO settings and reports how well each predicted it."""
+    db = SessionLocal()
+    try:
+        history = load_match_history(db, participant_type)
+    finally:
+        db.close()
+    results = sweep_elo_parameters(history, k_factors)
+    for result in sorted(results, key=lambda result: result.log_loss):
+        click.echo(
+            f"K={result.k_factor:g} log_loss={result.log_loss:.4f} brier={result.brier_score:.4f} accuracy={result.accuracy:.1%}"
+        )
+
+load_scoring_rules_at_startup()
 publish_stats_at_startup()
 
 if __name__ == '__main__':
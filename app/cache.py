@@ -0,0 +1,177 @@
+import functools
+import hashlib
+import inspect
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Bumped every time a match is committed; anything computed from match data
+# under an older generation is stale.
+_match_generation = 0
+_generation_lock = threading.Lock()
+
+# Wall-clock time of the last match or reference-data change seen by this
+# process (process start counts as one), for Last-Modified headers.
+_last_change_time = time.time()
+
+def get_last_change_time():
+    """Returns when match or reference data last changed, as a Unix timestamp."""
+    return _last_change_time
+
+def get_match_generation():
+    """Returns the current match generation."""
+    return _match_generation
+
+def bump_match_generation():
+    """Marks every cached statistic as stale. Call after a match insert commits."""
+    global _match_generation, _last_change_time
+    with _generation_lock:
+        _match_generation += 1
+        _last_change_time = time.time()
+        return _match_generation
+
+# The DataGenerations value this process last caught up with (None until the
+# first check). Commands run from another process bump the stored value
+# instead of this process's counter.
+_stored_generation = None
+
+def sync_match_generation(stored):
+    """Bumps the match generation if the stored generation moved since the last check. Returns True if it did."""
+    global _stored_generation
+    with _generation_lock:
+        changed = _stored_generation is not None and stored != _stored_generation
+        _stored_generation = stored
+    if changed:
+        bump_match_generation()
+    return changed
+
+class GenerationCache:
+    """Keeps computed values until the match generation (or a version of one of `tables`) moves on.
+
+    With maxsize, only that many of the most recently used keys are kept.
+    """
+
+    def __init__(self, maxsize=None, tables=()):
+        self.maxsize = maxsize
+        self.tables = tables
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, computing it if missing or stale."""
+        stamp = (get_match_generation(),) + tuple(get_reference_version(table) for table in self.tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+        value = compute()
+        with self._lock:
+            self._entries[key] = (stamp, value)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Drops every cached value."""
+        with self._lock:
+            self._entries.clear()
+
+# Per-table versions for reference data (players, combinations, launchers, ...),
+# bumped by the add_* routes after they commit.
+_reference_versions = {}
+
+def get_reference_version(table):
+    """Returns the current version of one reference table."""
+    return _reference_versions.get(table, 0)
+
+def bump_reference_version(table):
+    """Marks everything cached from one reference table as stale. Call after an add_* route commits."""
+    global _last_change_time
+    with _generation_lock:
+        _last_change_time = time.time()
+        _reference_versions[table] = _reference_versions.get(table, 0) + 1
+        return _reference_versions[table]
+
+class ReferenceCache:
+    """Keeps values loaded from reference tables until one of those tables' versions moves on."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, tables, key, load):
+        """Returns the cached value for key, loading it if missing or if any of tables changed since."""
+        versions = tuple(get_reference_version(table) for table in tables)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == versions:
+            return entry[1]
+        value = load()
+        with self._lock:
+            self._entries[key] = (versions, value)
+        return value
+
+    def invalidate(self, key):
+        """Drops one cached value, e.g. when it is known to be out of date."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+def cached(maxsize=256, ttl=300.0, tables=(), skip_session=True):
+    """Decorator: read-through cache of a function's results, keyed by its arguments.
+
+    A result is reused until the match generation (or the version of any of
+    `tables`) moves on, `ttl` seconds pass, or it drops out of the `maxsize`
+    most recently used entries. Arguments are bound to the function's
+    signature (defaults filled in), so f(db, 1) and f(db, player_id=1) share
+    an entry. With skip_session, the first parameter (the SQLAlchemy session)
+    is left out of the key.
+
+    Every caller gets the same cached object, not a copy: treat results as
+    read-only and copy at the call site before changing one.
+    """
+    def decorator(function):
+        entries = OrderedDict()
+        lock = threading.Lock()
+        signature = inspect.signature(function)
+        skipped = next(iter(signature.parameters)) if skip_session and signature.parameters else None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple((name, value) for name, value in bound.arguments.items() if name != skipped)
+            stamp = (get_match_generation(),) + tuple(get_reference_version(table) for table in tables)
+            now = time.monotonic()
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and entry[0] == stamp and entry[1] > now:
+                    entries.move_to_end(key)
+                    return entry[2]
+            value = function(*args, **kwargs)
+            with lock:
+                entries[key] = (stamp, now + ttl, value)
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return value
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+# Mixed into every ETag so tags handed out by a previous process never match.
+_process_token = uuid.uuid4().hex
+
+def data_etag(key, tables=(), matches=True):
+    """Builds an ETag for content derived from the given reference tables and, unless matches=False, match data."""
+    parts = [_process_token, key] + [f"{table}:{get_reference_version(table)}" for table in tables]
+    if matches:
+        parts.append(f"matches:{get_match_generation()}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
@@ -1,8 +1,7 @@
 import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 
 # Load database credentials from environment variables
 load_dotenv()
@@ -12,25 +11,55 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-# Construct the database connection string (MariaDB)
-DATABASE_URL = f"mariadb+mariadbconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+# Connection pool settings; this one pool serves both the ORM and the raw SQL in app.py
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))  # Seconds; keep below MariaDB's wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
 
-# Create the SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
-
-# Create the declarative base for models
-Base = declarative_base()
+# Construct the database connection string (MariaDB, through the same
+# mysql-connector driver the raw queries use)
+DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
-# Create the database tables (if they don't exist already)
-Base.metadata.create_all(engine)
+# Create the SQLAlchemy engine
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
 
-# Create a session maker for creating database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# One session per thread: each Flask request and the background publisher
+# get their own, and remove_session() hands its connection back to the pool.
+SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
 def get_db():
-    """Provides a new database session."""
+    """Provides the current scope's database session."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_raw_connection():
+    """Checks a DB-API (mysql.connector) connection out of the engine's pool; close() returns it."""
+    return engine.raw_connection()
+
+def remove_session(exception=None):
+    """Ends the current scope's session, e.g. at the end of a request or a publish run."""
+    SessionLocal.remove()
+
+def pool_status():
+    """Returns the shared pool's current usage."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_POOL_MAX_OVERFLOW,
+        "status": pool.status(),
+    }
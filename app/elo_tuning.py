@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+import numpy as np
+from sqlalchemy.orm import Session
+from models import MatchSide
+from match_statistics import K_FACTOR, DEFAULT_ELO_RATING, calculate_expected_score
+
+@dataclass
+class MatchHistory:
+    """Decided matches in end_time order, as compact arrays of dense participant indices."""
+    participant_ids: np.ndarray  # index -> player_id or combination_id
+    side1: np.ndarray
+    side2: np.ndarray
+    score1: np.ndarray  # 1.0 win, 0.5 draw, 0.0 loss for side 1
+
+@dataclass
+class EloSweepResult:
+    """How well one K-factor predicted the match history."""
+    k_factor: float
+    log_loss: float
+    brier_score: float
+    accuracy: float  # Share of decisive matches won by the higher-rated side
+
+def load_match_history(db: Session, participant_type="Player", tournament_id: int = None) -> MatchHistory:
+    """Loads the decided matches once into NumPy arrays for repeated what-if replays.
+
+    Reads side 1 of each match from MatchSides, whose won/drawn flags already
+    give side 1's score, so no per-row Python scoring is needed.
+    """
+    if participant_type == "Player":
+        column1, column2 = MatchSide.player_id, MatchSide.opponent_player_id
+    elif participant_type == "Combination":
+        column1, column2 = MatchSide.combination_id, MatchSide.opponent_combination_id
+    else:
+        raise ValueError(f"Unknown participant type: {participant_type}")
+
+    query = (
+        db.query(column1, column2, MatchSide.won + 0.5 * MatchSide.drawn)
+        .filter(
+            MatchSide.side == 1,
+            MatchSide.won + MatchSide.lost + MatchSide.drawn > 0,
+            column1.isnot(None), column2.isnot(None), column1 != column2,
+        )
+    )
+    if tournament_id is not None:
+        query = query.filter(MatchSide.tournament_id == tournament_id)
+
+    rows = np.array(query.order_by(MatchSide.end_time, MatchSide.match_id).all(), dtype=np.float64).reshape(-1, 3)
+    participant_ids, indices = np.unique(rows[:, :2].astype(np.int64), return_inverse=True)
+    indices = indices.reshape(-1, 2).astype(np.int32)
+    return MatchHistory(
+        participant_ids=participant_ids,
+        side1=indices[:, 0],
+        side2=indices[:, 1],
+        score1=rows[:, 2],
+    )
+
+def independent_batches(side1: np.ndarray, side2: np.ndarray) -> list:
+    """Splits the ordered matches into consecutive runs in which no participant plays twice.
+
+    Returns the start offset of each run plus the total length. Matches within
+    a run do not depend on each other's rating updates, so a run can be applied
+    in one array operation without changing the sequential result.
+    """
+    bounds = [0]
+    seen = set()
+    for m, (index1, index2) in enumerate(zip(side1.tolist(), side2.tolist())):
+        if index1 in seen or index2 in seen:
+            bounds.append(m)
+            seen.clear()
+        seen.update((index1, index2))
+    if len(side1):
+        bounds.append(len(side1))
+    return bounds
+
+def replay_history(history: MatchHistory, k_factors=(K_FACTOR,)):
+    """Replays the history once for every K-factor at the same time.
+
+    Ratings are held as a (K-factors x participants) array and the history is
+    applied one independent batch at a time (see independent_batches): each
+    step updates every match of the batch across all K-factors in a single
+    array operation. Returns the final ratings and, per match, side 1's
+    expected score *before* the match was applied.
+
+    Everyone starts at DEFAULT_ELO_RATING. The starting rating is not swept:
+    ELO only ever looks at rating differences, so shifting every participant's
+    start by the same amount changes neither the predictions nor the updates.
+    """
+    k = np.asarray(k_factors, dtype=np.float64)
+    ratings = np.full((len(k), len(history.participant_ids)), DEFAULT_ELO_RATING, dtype=np.float64)
+    expected = np.empty((len(k), len(history.score1)), dtype=np.float64)
+
+    bounds = independent_batches(history.side1, history.side2)
+    for start, stop in zip(bounds, bounds[1:]):
+        index1, index2 = history.side1[start:stop], history.side2[start:stop]
+        e = calculate_expected_score(ratings[:, index1], ratings[:, index2])
+        expected[:, start:stop] = e
+        delta = k[:, None] * (history.score1[None, start:stop] - e)
+        ratings[:, index1] += delta
+        ratings[:, index2] -= delta
+    return ratings, expected
+
+def sweep_elo_parameters(history: MatchHistory, k_factors=(K_FACTOR,)):
+    """Scores every K-factor on how well its ratings predicted each match (see replay_history)."""
+    k = np.asarray(k_factors, dtype=np.float64)
+    _, expected = replay_history(history, k)
+
+    if not len(history.score1):
+        return [EloSweepResult(float(k[i]), 0.0, 0.0, 0.0) for i in range(len(k))]
+
+    outcomes = history.score1[None, :]
+    clipped = np.clip(expected, 1e-12, 1 - 1e-12)
+    log_loss = -np.mean(outcomes * np.log(clipped) + (1 - outcomes) * np.log(1 - clipped), axis=1)
+    brier_score = np.mean((expected - outcomes) ** 2, axis=1)
+    decisive = history.score1 != 0.5
+    if decisive.any():
+        accuracy = np.mean((expected[:, decisive] > 0.5) == (history.score1[decisive] == 1.0), axis=1)
+    else:
+        accuracy = np.zeros(len(k))
+
+    return [
+        EloSweepResult(
+            k_factor=float(k[i]),
+            log_loss=float(log_loss[i]),
+            brier_score=float(brier_score[i]),
+            accuracy=float(accuracy[i]),
+        )
+        for i in range(len(k))
+    ]
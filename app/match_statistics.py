@@ -1,24 +1,82 @@
-from sqlalchemy import func, case, and_, or_, desc, Float, cast
+from sqlalchemy import func, case, and_, or_, desc, Float, String, cast, select
 from sqlalchemy.orm import Session
-from .models import Match, Player, BeybladeCombination, TournamentParticipant, Blade, Ratchet, Bit, Stadium, StadiumClass, Launcher, LauncherClass
+from cache import cached
+from models import Match, MatchSide, Player, BeybladeCombination, TournamentParticipant, Blade, Ratchet, Bit, Stadium, StadiumClass, Launcher, LauncherClass, PlayerStatsAgg, CombinationStatsAgg
 import math
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import Optional
 
 K_FACTOR = 32  # K-factor for ELO calculation (adjust as needed)
+DEFAULT_ELO_RATING = 1000  # Rating every player and combination starts from
+
+# Points awarded to the winner. These are the defaults seeded into the
+# ScoringRules table; load_scoring_rules() replaces them with the table's rows.
+FINISH_TYPE_POINTS = {"Survivor": 1, "Burst": 2, "KO": 2, "Extreme": 3}
+
+# Read-through cache bounds for the calculate_* results that the API endpoints poll.
+# Entries are also dropped as soon as a new match is committed.
+STATS_CACHE_TTL = 300  # Seconds
+STATS_CACHE_SIZE = 1024  # Entries per function
+
+def set_scoring_rules(rules: dict):
+    """Replaces the points table in place, so every module holding FINISH_TYPE_POINTS sees the change."""
+    FINISH_TYPE_POINTS.clear()
+    FINISH_TYPE_POINTS.update(rules)
+
+def calculate_match_points(finish_type, winner_id, draw) -> int:
+    """Returns the points the winner earns for a match; draws and matches without a winner are worth 0."""
+    if draw or winner_id is None:
+        return 0
+    return FINISH_TYPE_POINTS.get(finish_type, 0)
 
 def calculate_expected_score(rating1: int, rating2: int) -> float:
     """Calculates the expected score for player 1 against player 2."""
     return 1 / (1 + 10 ** ((rating2 - rating1) / 400))
 
-def update_elo_ratings(db: Session, match: Match):
-    """Updates ELO ratings for players and combinations after a match."""
-    # ... (ELO update logic - same as before, but now based on the correct models)
+def calculate_elo_update(rating1: float, rating2: float, score1: float, k_factor: float = K_FACTOR):
+    """Returns both new ratings after a match, where score1 is 1 (win), 0.5 (draw) or 0 (loss) for side 1."""
+    delta = k_factor * (score1 - calculate_expected_score(rating1, rating2))
+    return rating1 + delta, rating2 - delta
+
+def calculate_match_score(player1_id, winner_id, draw):
+    """Returns side 1's score for a match, or None if the match has no result."""
+    if draw:
+        return 0.5
+    if winner_id is None:
+        return None
+    return 1.0 if winner_id == player1_id else 0.0
+
+class EloRatings:
+    """Running ELO ratings for players and combinations, updated in O(1) per match."""
+
+    def __init__(self, k_factor: float = K_FACTOR, initial_rating: float = DEFAULT_ELO_RATING):
+        self.k_factor = k_factor
+        self.initial_rating = initial_rating
+        self.players = {}
+        self.combinations = {}
+
+    def record(self, player1_id, player2_id, combination1_id, combination2_id, winner_id, draw):
+        """Applies one match to the player and combination ratings."""
+        score1 = calculate_match_score(player1_id, winner_id, draw)
+        if score1 is None:
+            return
+        self._update(self.players, player1_id, player2_id, score1)
+        self._update(self.combinations, combination1_id, combination2_id, score1)
+
+    def _update(self, ratings: dict, id1, id2, score1: float):
+        if id1 is None or id2 is None or id1 == id2:
+            return
+        ratings[id1], ratings[id2] = calculate_elo_update(
+            ratings.get(id1, self.initial_rating), ratings.get(id2, self.initial_rating), score1, self.k_factor
+        )
 
 # --- Player Statistics Functions ---
 
 def calculate_player_matches_played(db: Session, player_id: int):
     """Calculates the total matches played by a player."""
-    return db.query(func.count()).filter(or_(Match.player1_id == player_id, Match.player2_id == player_id)).scalar()
+    return db.query(func.count()).filter(MatchSide.player_id == player_id).scalar()
 
 def calculate_player_wins(db: Session, player_id: int):
     """Calculates the total wins for a player."""
@@ -26,11 +84,11 @@ def calculate_player_wins(db: Session, player_id: int):
 
 def calculate_player_losses(db: Session, player_id: int):
     """Calculates the total losses for a player."""
-    return db.query(func.count()).filter(or_(and_(Match.player1_id == player_id, Match.winner_id != player_id, Match.draw == False), and_(Match.player2_id == player_id, Match.winner_id != player_id, Match.draw == False))).scalar()
+    return db.query(func.count()).filter(MatchSide.player_id == player_id, MatchSide.lost == 1).scalar()
 
 def calculate_player_draws(db: Session, player_id: int):
     """Calculates the total draws for a player."""
-    return db.query(func.count()).filter(or_(and_(Match.player1_id == player_id, Match.draw == True), and_(Match.player2_id == player_id, Match.draw == True))).scalar()
+    return db.query(func.count()).filter(MatchSide.player_id == player_id, MatchSide.drawn == 1).scalar()
 
 # ... (Previous Player Statistics functions)
 
@@ -105,15 +163,7 @@ def calculate_player_loss_streak(db: Session, player_id: int):
 
 def calculate_player_total_points(db: Session, player_id: int, tournament_id: int):
     """Calculates the total points for a given player in a given tournament."""
-    total_points = db.query(func.sum(case(
-        (Match.winner_id == player_id, case(
-            (Match.finish_type == "Burst", 2),
-            (Match.finish_type == "KO", 2),
-            (Match.finish_type == "Extreme", 3),
-            else_=1
-        )),
-        else_=0
-    ))).filter(or_(Match.player1_id == player_id, Match.player2_id == player_id), Match.tournament_id == tournament_id).scalar()
+    total_points = db.query(func.sum(MatchSide.points)).filter(MatchSide.player_id == player_id, MatchSide.tournament_id == tournament_id).scalar()
     return total_points if total_points is not None else 0
 
 def calculate_player_average_points_per_match(db: Session, player_id: int, tournament_id: int):
@@ -133,6 +183,237 @@ def calculate_player_elo_rating(db: Session, player_id: int, tournament_id: int)
     )
     return participant.elo_rating if participant else None
 
+# --- Player Aggregate Engine ---
+
+@dataclass
+class PlayerStats:
+    """Every player metric, as produced by a single scan of Matches."""
+    player_id: int
+    matches_played: int = 0
+    wins: int = 0
+    losses: int = 0
+    draws: int = 0
+    win_percentage: float = 0.0
+    non_loss_percentage: float = 0.0
+    most_common_winning_finish_type: Optional[str] = None
+    win_streak: int = 0
+    loss_streak: int = 0
+    total_points: int = 0
+    average_points_per_match: float = 0.0
+    elo_rating: Optional[float] = None
+
+def most_common_finish_type(counts: dict):
+    """Returns the finish type with the highest count, the alphabetically first on a tie, or None."""
+    if not counts:
+        return None
+    return min(counts.items(), key=lambda item: (-item[1], item[0] or ""))[0]
+
+class PlayerAggregate:
+    """Folds a player's matches, oldest first, into a PlayerStats record."""
+
+    def __init__(self, player_id: int):
+        self.player_id = player_id
+        self.matches_played = 0
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.total_points = 0
+        self.win_streak = 0
+        self.loss_streak = 0
+        self.winning_finish_types = Counter()
+
+    def add_side(self, won, lost, drawn, finish_type, points):
+        """Adds one match played by this player, as recorded on the player's MatchSides row."""
+        self.matches_played += 1
+        if drawn:
+            self.draws += 1
+            self.win_streak = 0
+            self.loss_streak = 0
+        elif won:
+            self.wins += 1
+            self.total_points += points or 0
+            self.winning_finish_types[finish_type] += 1
+            self.win_streak += 1
+            self.loss_streak = 0
+        elif lost:
+            self.losses += 1
+            self.loss_streak += 1
+            self.win_streak = 0
+        else:
+            self.win_streak = 0
+            self.loss_streak = 0
+
+    def result(self, elo_rating: Optional[float] = None) -> PlayerStats:
+        """Builds the PlayerStats record for everything added so far."""
+        played = self.matches_played
+        return PlayerStats(
+            player_id=self.player_id,
+            matches_played=played,
+            wins=self.wins,
+            losses=self.losses,
+            draws=self.draws,
+            win_percentage=(self.wins / played) * 100 if played else 0.0,
+            non_loss_percentage=((self.wins + self.draws) / played) * 100 if played else 0.0,
+            most_common_winning_finish_type=most_common_finish_type(self.winning_finish_types),
+            win_streak=self.win_streak,
+            loss_streak=self.loss_streak,
+            total_points=self.total_points,
+            average_points_per_match=self.total_points / played if played else 0.0,
+            elo_rating=elo_rating,
+        )
+
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
+def calculate_player_aggregate(db: Session, player_id: int, tournament_id: int = None) -> PlayerStats:
+    """Calculates every player metric from one scan of the player's matches."""
+    filters = [MatchSide.player_id == player_id]
+    if tournament_id is not None:
+        filters.append(MatchSide.tournament_id == tournament_id)
+
+    sides = (
+        db.query(MatchSide.won, MatchSide.lost, MatchSide.drawn, MatchSide.finish_type, MatchSide.points)
+        .filter(*filters)
+        .order_by(MatchSide.end_time, MatchSide.match_id)
+        .all()
+    )
+    aggregate = PlayerAggregate(player_id)
+    for won, lost, drawn, finish_type, points in sides:
+        aggregate.add_side(won, lost, drawn, finish_type, points)
+
+    if tournament_id is not None:
+        elo_rating = calculate_player_elo_rating(db, player_id, tournament_id)
+    else:
+        elo_rating = db.query(PlayerStatsAgg.elo_rating).filter(PlayerStatsAgg.player_id == player_id).scalar()
+    return aggregate.result(elo_rating if elo_rating is not None else DEFAULT_ELO_RATING)
+
+# --- Bulk Player Statistics ---
+
+def _player_sides_subquery(tournament_id: int = None):
+    """One row per (match, player) side, so per-player totals become a plain GROUP BY."""
+    query = select(
+        MatchSide.player_id,
+        MatchSide.match_id,
+        MatchSide.end_time,
+        MatchSide.finish_type,
+        MatchSide.won,
+        MatchSide.lost,
+        MatchSide.drawn,
+        MatchSide.points,
+    )
+    if tournament_id is not None:
+        query = query.where(MatchSide.tournament_id == tournament_id)
+    return query.subquery("player_sides")
+
+def _current_streaks(db: Session, sides, flag_column):
+    """Counts, per player, the flagged results since their last unflagged match.
+
+    Sides are ranked newest first by (end_time, match_id), the order the
+    in-memory fold applies them in, so matches sharing an end_time are
+    broken the same way on both paths.
+    """
+    ranked = select(
+        sides.c.player_id,
+        flag_column.label("flag"),
+        func.row_number().over(
+            partition_by=sides.c.player_id, order_by=(sides.c.end_time.desc(), sides.c.match_id.desc())
+        ).label("position"),
+    ).subquery()
+    rows = (
+        db.query(ranked.c.player_id, func.min(case((ranked.c.flag == 0, ranked.c.position))), func.count())
+        .group_by(ranked.c.player_id)
+        .all()
+    )
+    return {player_id: played if first_break is None else first_break - 1 for player_id, first_break, played in rows}
+
+def fold_player_stats(sides, elo_ratings: dict = None) -> dict:
+    """Folds a (end_time, match_id)-ordered stream of MatchSides (player_id, won, lost, drawn, finish_type, points) rows into PlayerStats."""
+    aggregates = {}
+    for player_id, won, lost, drawn, finish_type, points in sides:
+        if player_id is None:
+            continue
+        if player_id not in aggregates:
+            aggregates[player_id] = PlayerAggregate(player_id)
+        aggregates[player_id].add_side(won, lost, drawn, finish_type, points)
+    elo_ratings = elo_ratings or {}
+    return {player_id: aggregate.result(elo_ratings.get(player_id)) for player_id, aggregate in aggregates.items()}
+
+def compute_all_player_stats(db: Session, tournament_id: int = None, in_memory: bool = False) -> dict:
+    """Calculates PlayerStats for every player with a fixed number of queries.
+
+    Both paths read MatchSides, so points are the stored per-side points. The
+    default path runs a handful of GROUP BY queries over them. With
+    in_memory=True it instead streams them once, ordered by (end_time,
+    match_id), and folds the rows in Python.
+    """
+    if tournament_id is not None:
+        elo_ratings = dict(
+            db.query(TournamentParticipant.player_id, TournamentParticipant.elo_rating)
+            .filter(TournamentParticipant.tournament_id == tournament_id, TournamentParticipant.player_id.isnot(None))
+            .all()
+        )
+    else:
+        elo_ratings = dict(db.query(PlayerStatsAgg.player_id, PlayerStatsAgg.elo_rating).all())
+
+    if in_memory:
+        query = db.query(MatchSide.player_id, MatchSide.won, MatchSide.lost, MatchSide.drawn, MatchSide.finish_type, MatchSide.points)
+        if tournament_id is not None:
+            query = query.filter(MatchSide.tournament_id == tournament_id)
+        stats = fold_player_stats(query.order_by(MatchSide.end_time, MatchSide.match_id).yield_per(1000), elo_ratings)
+    else:
+        sides = _player_sides_subquery(tournament_id)
+        totals = (
+            db.query(
+                sides.c.player_id,
+                func.count(),
+                func.sum(sides.c.won),
+                func.sum(sides.c.lost),
+                func.sum(sides.c.drawn),
+                func.sum(sides.c.points),
+            )
+            .group_by(sides.c.player_id)
+            .all()
+        )
+        winning_finish_types = {}
+        finish_type_counts = (
+            db.query(sides.c.player_id, sides.c.finish_type, func.count())
+            .filter(sides.c.won == 1)
+            .group_by(sides.c.player_id, sides.c.finish_type)
+            .all()
+        )
+        for player_id, finish_type, count in finish_type_counts:
+            winning_finish_types.setdefault(player_id, {})[finish_type] = count
+        win_streaks = _current_streaks(db, sides, sides.c.won)
+        loss_streaks = _current_streaks(db, sides, sides.c.lost)
+
+        stats = {}
+        for player_id, played, wins, losses, draws, points in totals:
+            if player_id is None:
+                continue
+            wins, losses, draws, points = int(wins or 0), int(losses or 0), int(draws or 0), int(points or 0)
+            stats[player_id] = PlayerStats(
+                player_id=player_id,
+                matches_played=played,
+                wins=wins,
+                losses=losses,
+                draws=draws,
+                win_percentage=(wins / played) * 100 if played else 0.0,
+                non_loss_percentage=((wins + draws) / played) * 100 if played else 0.0,
+                most_common_winning_finish_type=most_common_finish_type(winning_finish_types.get(player_id)),
+                win_streak=win_streaks.get(player_id, 0),
+                loss_streak=loss_streaks.get(player_id, 0),
+                total_points=points,
+                average_points_per_match=points / played if played else 0.0,
+                elo_rating=elo_ratings.get(player_id),
+            )
+
+    for (player_id,) in db.query(Player.player_id).all():
+        if player_id not in stats:
+            stats[player_id] = PlayerStats(player_id=player_id, elo_rating=elo_ratings.get(player_id))
+    if tournament_id is None:
+        for player_stats in stats.values():
+            if player_stats.elo_rating is None:
+                player_stats.elo_rating = DEFAULT_ELO_RATING
+    return stats
+
 # --- Combination Statistics Functions ---
 
 def calculate_combination_matches_played(db: Session, combination_id: int):
@@ -217,29 +498,17 @@ def calculate_combination_most_common_loss_type(db: Session, combination_id: int
 
 def calculate_combination_most_common_opponent(db: Session, combination_id: int):
     """Calculates the most common opponent combination for a given combination."""
-    opponent_counts = (
-        db.query(
-            case(
-                (Match.combination1_id != combination_id, Match.combination1_id),
-                (Match.combination2_id != combination_id, Match.combination2_id),
-            ).label("opponent_id"),
-            func.count().label("count")
-        )
+    opponent = (
+        db.query(MatchSide.opponent_combination_id)
         .filter(
-            or_(
-                Match.combination1_id == combination_id,
-                Match.combination2_id == combination_id
-            ),
-            Match.combination1_id != Match.combination2_id
+            MatchSide.combination_id == combination_id,
+            MatchSide.opponent_combination_id != combination_id,
         )
-        .group_by("opponent_id")
-        .order_by(desc("count"))
+        .group_by(MatchSide.opponent_combination_id)
+        .order_by(desc(func.count()))
         .first()
     )
-    if opponent_counts:
-        return opponent_counts[0].opponent_id
-    else:
-        return None
+    return opponent[0] if opponent else None
 
 def calculate_combination_best_matchups(db: Session, combination_id: int):
     """Calculates the best matchups (highest win rate) for a combination."""
@@ -251,21 +520,7 @@ def calculate_combination_worst_matchups(db: Session, combination_id: int):
 
 def calculate_combination_total_points(db: Session, combination_id: int, tournament_id: int):
     """Calculates the total points for a given combination in a given tournament."""
-    total_points = db.query(func.sum(case(
-        (and_(Match.combination1_id == combination_id, Match.winner_id == Match.player1_id), case(
-            (Match.finish_type == "Burst", 2),
-            (Match.finish_type == "KO", 2),
-            (Match.finish_type == "Extreme", 3),
-            else_=1
-        )),
-        (and_(Match.combination2_id == combination_id, Match.winner_id == Match.player2_id), case(
-            (Match.finish_type == "Burst", 2),
-            (Match.finish_type == "KO", 2),
-            (Match.finish_type == "Extreme", 3),
-            else_=1
-        )),
-        else_=0
-    ))).filter(or_(Match.combination1_id == combination_id, Match.combination2_id == combination_id), Match.tournament_id == tournament_id).scalar()
+    total_points = db.query(func.sum(MatchSide.points)).filter(MatchSide.combination_id == combination_id, MatchSide.tournament_id == tournament_id).scalar()
     return total_points if total_points is not None else 0
 
 def calculate_combination_average_points_per_match(db: Session, combination_id: int, tournament_id: int):
@@ -369,46 +624,159 @@ def calculate_combination_worst_matchups(db: Session, combination_id: int):
     )
     return worst_matchups
 
-# --- Beyblade Part Statistics Functions (Blade, Ratchet, Bit) ---
-
-def calculate_part_usage_frequency(db: Session, part_type: str, part_id: int):
-    """Calculates the usage frequency of a Beyblade part."""
-    if part_type == "Blade":
-        return db.query(func.count()).filter(BeybladeCombination.blade_id == part_id).scalar()
-    elif part_type == "Ratchet":
-        return db.query(func.count()).filter(BeybladeCombination.ratchet_id == part_id).scalar()
-    elif part_type == "Bit":
-        return db.query(func.count()).filter(BeybladeCombination.bit_id == part_id).scalar()
-    else:
-        return 0
-    
-# ... (Previous Beyblade Part Statistics functions)
+# --- Bulk Combination Statistics ---
+
+@dataclass
+class CombinationStats:
+    """Every combination metric, as derived from the combination matchup matrix."""
+    combination_id: int
+    matches_played: int = 0
+    wins: int = 0
+    losses: int = 0
+    draws: int = 0
+    win_percentage: float = 0.0
+    non_loss_percentage: float = 0.0
+    most_common_winning_finish_type: Optional[str] = None
+    burst_rate: float = 0.0
+    most_common_loss_type: Optional[str] = None
+    most_common_opponent: Optional[int] = None
+    best_matchups: list = field(default_factory=list)
+    worst_matchups: list = field(default_factory=list)
+    total_points: int = 0
+    average_points_per_match: float = 0.0
+    elo_rating: Optional[float] = None
+
+class CombinationMatchupMatrix:
+    """Sparse combination-vs-combination win/loss/draw matrix built in one pass over Matches.
+
+    Each match is recorded once per side, so a mirror match (the same
+    combination on both sides) counts as a match played for each side.
+    Mirror matches are left out of the matchup cells, like the per-combination
+    matchup queries above.
+    """
+
+    def __init__(self):
+        self.matchups = {}  # combination_id -> {opponent_id: [wins, losses, draws]}
+        self.totals = {}  # combination_id -> [matches_played, wins, losses, draws, points]
+        self.winning_finish_types = {}  # combination_id -> Counter of finish types won by
+        self.losing_finish_types = {}  # combination_id -> Counter of finish types lost by
+
+    def add(self, combination1_id, combination2_id, player1_id, player2_id, winner_id, draw, finish_type):
+        """Adds one match to the matrix."""
+        sides = ((combination1_id, player1_id, combination2_id), (combination2_id, player2_id, combination1_id))
+        for combination_id, player_id, opponent_id in sides:
+            if combination_id is None:
+                continue
+            totals = self.totals.setdefault(combination_id, [0, 0, 0, 0, 0])
+            totals[0] += 1
+            if draw:
+                result = 2
+            elif winner_id is not None and winner_id == player_id:
+                result = 0
+                totals[4] += FINISH_TYPE_POINTS.get(finish_type, 0)
+                self.winning_finish_types.setdefault(combination_id, Counter())[finish_type] += 1
+            elif winner_id is not None:
+                result = 1
+                self.losing_finish_types.setdefault(combination_id, Counter())[finish_type] += 1
+            else:
+                continue
+            totals[result + 1] += 1
+            if opponent_id is not None and opponent_id != combination_id:
+                self.matchups.setdefault(combination_id, {}).setdefault(opponent_id, [0, 0, 0])[result] += 1
+
+    def opponent_win_rates(self, combination_id: int):
+        """Returns (opponent_id, win_rate) pairs for every opponent the combination has faced."""
+        return [
+            (opponent_id, wins / (wins + losses + draws))
+            for opponent_id, (wins, losses, draws) in self.matchups.get(combination_id, {}).items()
+            if wins + losses + draws
+        ]
+
+    def best_matchups(self, combination_id: int, limit: int = 5):
+        """Returns the opponents the combination has the highest win rate against."""
+        return sorted(self.opponent_win_rates(combination_id), key=lambda matchup: matchup[1], reverse=True)[:limit]
+
+    def worst_matchups(self, combination_id: int, limit: int = 5):
+        """Returns the opponents the combination has the lowest win rate against."""
+        return sorted(self.opponent_win_rates(combination_id), key=lambda matchup: matchup[1])[:limit]
+
+    def most_common_opponent(self, combination_id: int):
+        """Returns the opponent combination faced most often."""
+        opponents = self.matchups.get(combination_id)
+        if not opponents:
+            return None
+        return max(opponents.items(), key=lambda item: sum(item[1]))[0]
+
+    def stats(self, combination_id: int, elo_rating: Optional[float] = None) -> CombinationStats:
+        """Builds the CombinationStats record for one combination."""
+        played, wins, losses, draws, points = self.totals.get(combination_id, [0, 0, 0, 0, 0])
+        winning = self.winning_finish_types.get(combination_id, Counter())
+        losing = self.losing_finish_types.get(combination_id, Counter())
+        return CombinationStats(
+            combination_id=combination_id,
+            matches_played=played,
+            wins=wins,
+            losses=losses,
+            draws=draws,
+            win_percentage=(wins / played) * 100 if played else 0.0,
+            non_loss_percentage=((wins + draws) / played) * 100 if played else 0.0,
+            most_common_winning_finish_type=most_common_finish_type(winning),
+            burst_rate=(winning["Burst"] / wins) * 100 if wins else 0.0,
+            most_common_loss_type=most_common_finish_type(losing),
+            most_common_opponent=self.most_common_opponent(combination_id),
+            best_matchups=self.best_matchups(combination_id),
+            worst_matchups=self.worst_matchups(combination_id),
+            total_points=points,
+            average_points_per_match=points / played if played else 0.0,
+            elo_rating=elo_rating,
+        )
 
-def calculate_part_win_rate(db: Session, part_type: str, part_id: int):
-    """Calculates the win rate of combinations using a specific Beyblade part."""
-    if part_type == "Blade":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.blade_id == part_id).all()
-    elif part_type == "Ratchet":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.ratchet_id == part_id).all()
-    elif part_type == "Bit":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.bit_id == part_id).all()
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
+def build_combination_matchup_matrix(db: Session, tournament_id: int = None, combination_id: int = None) -> CombinationMatchupMatrix:
+    """Builds the combination matchup matrix from a single pass over Matches.
+
+    Pass combination_id to restrict the pass to that combination's matches when
+    only its row of the matrix is needed.
+    """
+    query = db.query(
+        Match.combination1_id, Match.combination2_id,
+        Match.player1_id, Match.player2_id,
+        Match.winner_id, Match.draw, Match.finish_type,
+    )
+    if tournament_id is not None:
+        query = query.filter(Match.tournament_id == tournament_id)
+    if combination_id is not None:
+        query = query.filter(or_(Match.combination1_id == combination_id, Match.combination2_id == combination_id))
+
+    matrix = CombinationMatchupMatrix()
+    for row in query.yield_per(1000):
+        matrix.add(*row)
+    return matrix
+
+def compute_all_combination_stats(db: Session, tournament_id: int = None) -> dict:
+    """Calculates CombinationStats for every combination from one matchup matrix."""
+    if tournament_id is not None:
+        elo_ratings = dict(
+            db.query(TournamentParticipant.combination_id, TournamentParticipant.elo_rating)
+            .filter(TournamentParticipant.tournament_id == tournament_id, TournamentParticipant.combination_id.isnot(None))
+            .all()
+        )
     else:
-        return 0.0
+        elo_ratings = dict(db.query(CombinationStatsAgg.combination_id, CombinationStatsAgg.elo_rating).all())
 
-    if not combinations:
-        return 0.0
+    matrix = build_combination_matchup_matrix(db, tournament_id)
+    combination_ids = {combination_id for (combination_id,) in db.query(BeybladeCombination.combination_id).all()}
+    combination_ids.update(matrix.totals)
+    default_rating = DEFAULT_ELO_RATING if tournament_id is None else None
+    return {
+        combination_id: matrix.stats(combination_id, elo_ratings.get(combination_id, default_rating))
+        for combination_id in combination_ids
+    }
 
-    total_wins = 0
-    total_matches = 0
-    for combination_id_tuple in combinations:
-        combination_id = combination_id_tuple[0]
-        total_wins += calculate_combination_wins(db, combination_id)
-        total_matches += calculate_combination_matches_played(db, combination_id)
-    
-    if total_matches == 0:
-        return 0.0
+# --- Beyblade Part Statistics Functions (Blade, Ratchet, Bit) ---
 
-    return (total_wins / total_matches) * 100
+# Usage, win rate and points per part come from part_statistics.compute_part_stats,
+# one grouped query over MatchSides for a whole part family (or a few parts).
 
 def calculate_most_common_combinations_with_part(db: Session, part_type: str, part_id: int):
     """Calculates the most common combinations that include a specific part."""
@@ -421,50 +789,16 @@ def calculate_most_common_combinations_with_part(db: Session, part_type: str, pa
     else:
         return []
 
-def calculate_part_total_points(db: Session, part_type: str, part_id: int, tournament_id: int):
-    """Calculates the total points accumulated by combinations using this part in a given tournament."""
-    if part_type == "Blade":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.blade_id == part_id).all()
-    elif part_type == "Ratchet":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.ratchet_id == part_id).all()
-    elif part_type == "Bit":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.bit_id == part_id).all()
-    else:
-        return 0
-
-    total_points = 0
-    for combination_id_tuple in combinations:
-        combination_id = combination_id_tuple[0]
-        total_points += calculate_combination_total_points(db, combination_id, tournament_id)
-    return total_points
-
-def calculate_part_average_points_per_match(db: Session, part_type: str, part_id: int, tournament_id: int):
-    """Calculates the average points per match accumulated by combinations using this part in a given tournament."""
-    total_points = calculate_part_total_points(db, part_type, part_id, tournament_id)
-    if part_type == "Blade":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.blade_id == part_id).all()
-    elif part_type == "Ratchet":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.ratchet_id == part_id).all()
-    elif part_type == "Bit":
-        combinations = db.query(BeybladeCombination.combination_id).filter(BeybladeCombination.bit_id == part_id).all()
-    else:
-        return 0
-    total_matches = 0
-    for combination_id_tuple in combinations:
-        combination_id = combination_id_tuple[0]
-        total_matches += calculate_combination_matches_played(db, combination_id)
-    if total_matches == 0:
-        return 0
-    return total_points / total_matches
-
 # ... (Previous functions)
 
 # --- Stadium Statistics Functions ---
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
 def calculate_matches_played_in_stadium(db: Session, stadium_id: int):
     """Calculates the total matches played in a specific stadium."""
     return db.query(func.count()).filter(Match.stadium_id == stadium_id).scalar()
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
 def calculate_win_percentage_by_stadium(db: Session, stadium_id: int, participant_type, participant_id):
     """Calculates the win percentage for a given participant in a specific stadium."""
     if participant_type not in ("Player", "Combination"):
@@ -486,6 +820,7 @@ def calculate_win_percentage_by_stadium(db: Session, stadium_id: int, participan
         return 0.0
     return (wins / matches) * 100
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
 def calculate_most_common_win_type_by_stadium(db: Session, stadium_id: int):
     """Calculates the most common win type in a specific stadium."""
     most_common_win_type = (
@@ -497,6 +832,7 @@ def calculate_most_common_win_type_by_stadium(db: Session, stadium_id: int):
     )
     return most_common_win_type[0] if most_common_win_type else None
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
 def calculate_most_common_matchups_in_stadium(db: Session, stadium_id: int, participant_type):
     """Calculates the most common matchups in a specific stadium."""
     if participant_type not in ("Player", "Combination"):
@@ -514,24 +850,26 @@ def calculate_most_common_matchups_in_stadium(db: Session, stadium_id: int, part
     )
     return matchups
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL, tables=("Stadiums",))
 def calculate_matches_played_in_stadium_class(db: Session, stadium_class_id: int):
     """Calculates the total matches played in a specific stadium class."""
-    return db.query(func.count()).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id).scalar()
+    return db.query(func.count()).select_from(Match).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id).scalar()
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL, tables=("Stadiums",))
 def calculate_win_percentage_by_stadium_class(db: Session, stadium_class_id: int, participant_type, participant_id):
     """Calculates the win percentage for a given participant in a specific stadium class."""
     if participant_type not in ("Player", "Combination"):
         return 0.0
 
     if participant_type == "Player":
-        wins = db.query(func.count()).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, Match.winner_id == participant_id).scalar()
-        matches = db.query(func.count()).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, or_(Match.player1_id == participant_id, Match.player2_id == participant_id)).scalar()
+        wins = db.query(func.count()).select_from(Match).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, Match.winner_id == participant_id).scalar()
+        matches = db.query(func.count()).select_from(Match).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, or_(Match.player1_id == participant_id, Match.player2_id == participant_id)).scalar()
     elif participant_type == "Combination":
-        wins = db.query(func.count()).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, or_(
+        wins = db.query(func.count()).select_from(Match).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, or_(
                 and_(Match.combination1_id == participant_id, Match.player1_id == Match.winner_id),
                 and_(Match.combination2_id == participant_id, Match.player2_id == Match.winner_id)
             )).scalar()
-        matches = db.query(func.count()).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, or_(Match.combination1_id == participant_id, Match.combination2_id == participant_id)).scalar()
+        matches = db.query(func.count()).select_from(Match).join(Stadium).filter(Stadium.stadium_class_id == stadium_class_id, or_(Match.combination1_id == participant_id, Match.combination2_id == participant_id)).scalar()
     else:
         return 0.0
 
@@ -539,6 +877,7 @@ def calculate_win_percentage_by_stadium_class(db: Session, stadium_class_id: int
         return 0.0
     return (wins / matches) * 100
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL, tables=("Stadiums",))
 def calculate_most_common_win_type_by_stadium_class(db: Session, stadium_class_id: int):
     """Calculates the most common win type in a specific stadium class."""
     most_common_win_type = (
@@ -551,6 +890,7 @@ def calculate_most_common_win_type_by_stadium_class(db: Session, stadium_class_i
     )
     return most_common_win_type[0] if most_common_win_type else None
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL, tables=("Stadiums",))
 def calculate_most_common_matchups_in_stadium_class(db: Session, stadium_class_id: int, participant_type):
     """Calculates the most common matchups in a specific stadium class."""
     if participant_type not in ("Player", "Combination"):
@@ -592,7 +932,7 @@ def calculate_most_common_win_type_by_launcher_class(db: Session, launcher_class
     """Calculates the most common win type for a given launcher class."""
     most_common_win_type = (
         db.query(Match.finish_type)
-        .join(Launcher)
+        .join(Launcher, or_(Match.player1_launcher_id == Launcher.launcher_id, Match.player2_launcher_id == Launcher.launcher_id))
         .filter(Launcher.launcher_class_id == launcher_class_id)
         .group_by(Match.finish_type)
         .order_by(desc(func.count(Match.finish_type)))
@@ -602,12 +942,15 @@ def calculate_most_common_win_type_by_launcher_class(db: Session, launcher_class
 
 # --- Matchups Statistics Functions ---
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
 def calculate_head_to_head_record(db: Session, player1_id: int, player2_id: int):
-    """Calculates the head-to-head record (wins, losses, draws) between two players."""
-    player1_wins = db.query(func.count()).filter(Match.player1_id == player1_id, Match.winner_id == player1_id, Match.player2_id == player2_id).scalar()
-    player2_wins = db.query(func.count()).filter(Match.player1_id == player1_id, Match.winner_id == player2_id, Match.player2_id == player2_id).scalar()
-    draws = db.query(func.count()).filter(Match.player1_id == player1_id, Match.draw == True, Match.player2_id == player2_id).scalar()
-    return player1_wins, player2_wins, draws
+    """Calculates the head-to-head record (wins, losses, draws) between two players, whichever side each played."""
+    player1_wins, player2_wins, draws = (
+        db.query(func.sum(MatchSide.won), func.sum(MatchSide.lost), func.sum(MatchSide.drawn))
+        .filter(MatchSide.player_id == player1_id, MatchSide.opponent_player_id == player2_id)
+        .one()
+    )
+    return int(player1_wins or 0), int(player2_wins or 0), int(draws or 0)
 
 def calculate_head_to_head_win_percentage(db: Session, player1_id: int, player2_id: int):
     """Calculates the head-to-head win percentage for player1 against player2."""
@@ -629,6 +972,7 @@ def calculate_head_to_head_non_loss_percentage(db: Session, player1_id: int, pla
 
 # --- Additional Statistics Functions ---
 
+@cached(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
 def calculate_finish_type_distribution(db: Session, participant_type, participant_id, stadium_id=None):
     """Calculates the distribution of finish types for a player, combination, or stadium."""
     if participant_type not in ("Player", "Combination", "Stadium"):
@@ -698,20 +1042,18 @@ def calculate_tournament_standings(db: Session, tournament_id: int, participant_
     if participant_type not in ("Player", "Combination"):
         return []
     
-    participant_id_column = Player.player_id if participant_type == "Player" else BeybladeCombination.combination_id
-    participant_table = Player if participant_type == "Player" else BeybladeCombination
-    participant_matches_table = Match
+    participant_id_column = TournamentParticipant.player_id if participant_type == "Player" else TournamentParticipant.combination_id
+    side_id_column = MatchSide.player_id if participant_type == "Player" else MatchSide.combination_id
 
     standings = (
         db.query(
-            participant_id_column,
-            func.count(case((participant_matches_table.winner_id == participant_id_column, 1))).label("wins"),
+            side_id_column,
+            func.count(case((MatchSide.won == 1, 1))).label("wins"),
             func.count().label("matches")
         )
-        .join(TournamentParticipant, and_(TournamentParticipant.participant_id == participant_id_column, TournamentParticipant.participant_type == participant_type, TournamentParticipant.tournament_id == tournament_id))
-        .join(participant_matches_table, or_(and_(participant_matches_table.player1_id == participant_id_column, participant_matches_table.tournament_id == tournament_id), and_(participant_matches_table.player2_id == participant_id_column, participant_matches_table.tournament_id == tournament_id)))
-        .filter(TournamentParticipant.tournament_id == tournament_id)
-        .group_by(participant_id_column)
+        .join(TournamentParticipant, and_(participant_id_column == side_id_column, TournamentParticipant.participant_type == participant_type, TournamentParticipant.tournament_id == tournament_id))
+        .filter(MatchSide.tournament_id == tournament_id)
+        .group_by(side_id_column)
         .order_by(desc("wins"))
         .all()
     )
@@ -0,0 +1,280 @@
+import logging
+from aggregates import rebuild_aggregates
+
+logger = logging.getLogger(__name__)
+
+# Versioned schema changes applied on top of db_init/init.sql, oldest first.
+# Each entry is (version, description, statements); a version is recorded in
+# SchemaMigrations once all of its statements have run, and never runs again.
+# A statement is either SQL or a callable that is given the cursor, for data
+# steps written in Python. Statements should be idempotent (IF NOT EXISTS) so
+# that a fresh database whose init.sql already contains the change just
+# records the version.
+# Migration 2's backfill, frozen as shipped: points use the 1/2/2/3 rules of the time.
+_V2_SIDE_SQL = """
+    SELECT m.match_id, {n}, m.tournament_id, m.stadium_id, m.end_time, m.finish_type,
+           m.player{n}_id, m.player{n}_combination_id, m.player{n}_launcher_id,
+           m.player{o}_id, m.player{o}_combination_id,
+           CASE WHEN m.draw = 1 THEN 0 WHEN m.winner_id = m.player{n}_id THEN 1 ELSE 0 END,
+           CASE WHEN m.draw = 1 THEN 0 WHEN m.winner_id != m.player{n}_id THEN 1 ELSE 0 END,
+           CASE WHEN m.draw = 1 THEN 1 ELSE 0 END,
+           CASE WHEN m.draw = 1 THEN 0 WHEN m.winner_id = m.player{n}_id THEN
+               CASE m.finish_type WHEN 'Survivor' THEN 1 WHEN 'Burst' THEN 2 WHEN 'KO' THEN 2 WHEN 'Extreme' THEN 3 ELSE 0 END
+           ELSE 0 END
+    FROM Matches m
+"""
+
+MIGRATIONS = [
+    (1, "Composite and covering indexes on Matches hot columns", [
+        # Player history: WHERE player1_id = ? OR player2_id = ? ORDER BY end_time (index merge of both)
+        "CREATE INDEX IF NOT EXISTS idx_matches_player1_end ON Matches (player1_id, end_time)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_player2_end ON Matches (player2_id, end_time)",
+        # Combination history, same shape on the combination columns
+        "CREATE INDEX IF NOT EXISTS idx_matches_combination1_end ON Matches (player1_combination_id, end_time)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_combination2_end ON Matches (player2_combination_id, end_time)",
+        # Tournament standings and per-tournament ELO replays, in end_time order
+        "CREATE INDEX IF NOT EXISTS idx_matches_tournament_end ON Matches (tournament_id, end_time)",
+        # Wins and wins-by-finish-type counts are answered from the index alone
+        "CREATE INDEX IF NOT EXISTS idx_matches_winner_finish ON Matches (winner_id, finish_type)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_stadium_end ON Matches (stadium_id, end_time)",
+        # Recent matches (ORDER BY end_time DESC LIMIT n) and the full-history replays
+        "CREATE INDEX IF NOT EXISTS idx_matches_end_time ON Matches (end_time, match_id)",
+    ]),
+    (2, "MatchSides: one row per (match, side), filled from the existing matches", [
+        """
+        CREATE TABLE IF NOT EXISTS MatchSides (
+            match_id INT NOT NULL,
+            side TINYINT NOT NULL,
+            tournament_id INT,
+            stadium_id INT,
+            end_time TIMESTAMP NULL,
+            finish_type ENUM('Draw', 'Survivor', 'KO', 'Burst', 'Extreme'),
+            player_id INT,
+            combination_id INT,
+            launcher_id INT,
+            opponent_player_id INT,
+            opponent_combination_id INT,
+            won TINYINT(1) DEFAULT 0,
+            lost TINYINT(1) DEFAULT 0,
+            drawn TINYINT(1) DEFAULT 0,
+            points INT DEFAULT 0,
+            PRIMARY KEY (match_id, side),
+            FOREIGN KEY (match_id) REFERENCES Matches(match_id) ON DELETE CASCADE,
+            INDEX idx_match_sides_player (player_id, end_time),
+            INDEX idx_match_sides_combination (combination_id, end_time),
+            INDEX idx_match_sides_launcher (launcher_id, end_time),
+            INDEX idx_match_sides_tournament (tournament_id, player_id),
+            INDEX idx_match_sides_head_to_head (player_id, opponent_player_id)
+        )
+        """,
+        "INSERT IGNORE INTO MatchSides (match_id, side, tournament_id, stadium_id, end_time, finish_type, player_id, "
+        "combination_id, launcher_id, opponent_player_id, opponent_combination_id, won, lost, drawn, points) "
+        + _V2_SIDE_SQL.format(n=1, o=2) + " UNION ALL " + _V2_SIDE_SQL.format(n=2, o=1),
+    ]),
+    (3, "Points stored on Matches, driven by a ScoringRules table", [
+        """
+        CREATE TABLE IF NOT EXISTS ScoringRules (
+            finish_type ENUM('Survivor', 'KO', 'Burst', 'Extreme') PRIMARY KEY,
+            points INT NOT NULL
+        )
+        """,
+        "INSERT IGNORE INTO ScoringRules (finish_type, points) VALUES ('Survivor', 1), ('Burst', 2), ('KO', 2), ('Extreme', 3)",
+        "ALTER TABLE Matches ADD COLUMN IF NOT EXISTS points INT NOT NULL DEFAULT 0",
+        "CREATE INDEX IF NOT EXISTS idx_matches_winner_points ON Matches (winner_id, points)",
+        """
+        UPDATE Matches m
+        LEFT JOIN ScoringRules r ON r.finish_type = m.finish_type
+        SET m.points = CASE WHEN m.draw = 1 OR m.winner_id IS NULL THEN 0 ELSE COALESCE(r.points, 0) END
+        """,
+        # MatchSides (filled by migration 2) now copies the stored points
+        """
+        UPDATE MatchSides s
+        JOIN Matches m ON m.match_id = s.match_id
+        SET s.points = CASE WHEN s.won = 1 THEN m.points ELSE 0 END
+        """,
+    ]),
+    (4, "Materialized statistics tables, filled from the existing matches", [
+        """
+        CREATE TABLE IF NOT EXISTS PlayerStatsAgg (
+            player_id INT PRIMARY KEY,
+            matches_played INT NOT NULL DEFAULT 0,
+            wins INT NOT NULL DEFAULT 0,
+            losses INT NOT NULL DEFAULT 0,
+            draws INT NOT NULL DEFAULT 0,
+            points INT NOT NULL DEFAULT 0,
+            elo_rating DOUBLE NOT NULL DEFAULT 1000
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS CombinationStatsAgg (
+            combination_id INT PRIMARY KEY,
+            matches_played INT NOT NULL DEFAULT 0,
+            wins INT NOT NULL DEFAULT 0,
+            losses INT NOT NULL DEFAULT 0,
+            draws INT NOT NULL DEFAULT 0,
+            points INT NOT NULL DEFAULT 0,
+            elo_rating DOUBLE NOT NULL DEFAULT 1000
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS PartStatsAgg (
+            part_type ENUM('Blade', 'Ratchet', 'Bit'),
+            part_id INT,
+            matches_played INT NOT NULL DEFAULT 0,
+            wins INT NOT NULL DEFAULT 0,
+            losses INT NOT NULL DEFAULT 0,
+            draws INT NOT NULL DEFAULT 0,
+            points INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (part_type, part_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS StadiumStatsAgg (
+            stadium_id INT PRIMARY KEY,
+            matches_played INT NOT NULL DEFAULT 0,
+            draws INT NOT NULL DEFAULT 0,
+            survivor_finishes INT NOT NULL DEFAULT 0,
+            ko_finishes INT NOT NULL DEFAULT 0,
+            burst_finishes INT NOT NULL DEFAULT 0,
+            extreme_finishes INT NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS CombinationTypeMatchupAgg (
+            type1 ENUM('Attack', 'Defense', 'Stamina', 'Balance', 'Unknown'),
+            type2 ENUM('Attack', 'Defense', 'Stamina', 'Balance', 'Unknown'),
+            matches_played INT NOT NULL DEFAULT 0,
+            type1_wins INT NOT NULL DEFAULT 0,
+            type2_wins INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (type1, type2)
+        )
+        """,
+        rebuild_aggregates,
+    ]),
+    (5, "StadiumClasses, and Stadiums linked to them", [
+        """
+        CREATE TABLE IF NOT EXISTS StadiumClasses (
+            stadium_class_id INT AUTO_INCREMENT PRIMARY KEY,
+            stadium_class_name VARCHAR(255) NOT NULL UNIQUE,
+            description TEXT,
+            depth DECIMAL(6, 2),
+            width DECIMAL(6, 2),
+            height DECIMAL(6, 2)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Stadiums (
+            stadium_id INT AUTO_INCREMENT PRIMARY KEY,
+            stadium_name VARCHAR(255) NOT NULL UNIQUE,
+            description TEXT,
+            location VARCHAR(255),
+            material VARCHAR(255),
+            notes TEXT,
+            stadium_class_id INT,
+            FOREIGN KEY (stadium_class_id) REFERENCES StadiumClasses(stadium_class_id)
+        )
+        """,
+        # Stadiums created before this migration have no class column yet
+        "ALTER TABLE Stadiums ADD COLUMN IF NOT EXISTS stadium_class_id INT",
+    ]),
+    (6, "DataGenerations: match data changes made outside the web process", [
+        """
+        CREATE TABLE IF NOT EXISTS DataGenerations (
+            name VARCHAR(64) PRIMARY KEY,
+            generation BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT IGNORE INTO DataGenerations (name, generation) VALUES ('matches', 0)",
+    ]),
+]
+
+_CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS SchemaMigrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(255),
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+def applied_versions(cursor):
+    """Returns the set of migration versions already recorded in the database."""
+    cursor.execute(_CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT version FROM SchemaMigrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def apply_migrations(conn):
+    """Applies every pending migration in version order. Returns the versions applied.
+
+    DDL commits implicitly in MariaDB, so each migration's version is recorded
+    (and committed) right after its statements; a failure stops the run and
+    leaves the failed migration pending for the next attempt.
+    """
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+        applied = []
+        for version, description, statements in sorted(MIGRATIONS):
+            if version in done:
+                continue
+            logger.info(f"Applying migration {version}: {description}")
+            for statement in statements:
+                if callable(statement):
+                    statement(cursor)
+                else:
+                    cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO SchemaMigrations (version, description) VALUES (%s, %s)",
+                (version, description),
+            )
+            conn.commit()
+            applied.append(version)
+        return applied
+    finally:
+        cursor.close()
+
+# Representative queries for each hot access path the indexes above are
+# meant to serve, as (name, sql, params). Full-history aggregations such as
+# MATCH_SIDES_SQL read every row by design and are deliberately left out.
+HOT_QUERIES = [
+    ("player history",
+     "SELECT m.match_id, m.end_time FROM Matches m WHERE (m.player1_id = %s OR m.player2_id = %s) ORDER BY m.end_time DESC",
+     (1, 1)),
+    ("combination history",
+     "SELECT m.match_id, m.end_time FROM Matches m "
+     "WHERE (m.player1_combination_id = %s OR m.player2_combination_id = %s) ORDER BY m.end_time DESC",
+     (1, 1)),
+    ("tournament matches",
+     "SELECT m.match_id, m.winner_id, m.finish_type FROM Matches m WHERE m.tournament_id = %s ORDER BY m.end_time",
+     (1,)),
+    ("player tournament matches",
+     "SELECT COUNT(*) FROM Matches m WHERE (m.player1_id = %s OR m.player2_id = %s) AND m.tournament_id = %s",
+     (1, 1, 1)),
+    ("wins by finish type",
+     "SELECT m.finish_type, COUNT(*) FROM Matches m WHERE m.winner_id = %s GROUP BY m.finish_type",
+     (1,)),
+    ("player sides",
+     "SELECT s.match_id FROM MatchSides s WHERE s.player_id = %s ORDER BY s.end_time DESC",
+     (1,)),
+    ("head to head",
+     "SELECT SUM(s.won), SUM(s.lost), SUM(s.drawn) FROM MatchSides s WHERE s.player_id = %s AND s.opponent_player_id = %s",
+     (1, 2)),
+    ("stadium matches",
+     "SELECT m.match_id FROM Matches m WHERE m.stadium_id = %s ORDER BY m.end_time",
+     (1,)),
+]
+
+def explain_hot_queries(cursor):
+    """EXPLAINs every hot query and returns (name, plan rows, full_scan) for each.
+
+    A query counts as a full scan when MariaDB reads any table with access
+    type ALL, whether or not it listed possible_keys: a usable index the
+    optimizer passes over still leaves the query reading every row.
+    """
+    reports = []
+    for name, sql, params in HOT_QUERIES:
+        cursor.execute("EXPLAIN " + sql, params)
+        columns = [column[0] for column in cursor.description]
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        full_scan = any(row.get("type") == "ALL" for row in plan)
+        reports.append((name, plan, full_scan))
+    return reports
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, CheckConstraint, Boolean, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, CheckConstraint, Boolean, TIMESTAMP, Float, DECIMAL
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 #from base import Base
@@ -12,14 +12,14 @@ class Player(Base):
     player_name = Column(String(255), unique=True)
 
     # Matches as player 1
-    player1_matches = relationship("Match", backref="player1")
+    player1_matches = relationship("Match", foreign_keys="[Match.player1_id]", backref="player1")
 
     # Matches as player 2
-    player2_matches = relationship("Match", backref="player2")
+    player2_matches = relationship("Match", foreign_keys="[Match.player2_id]", backref="player2")
 
     # Tournaments participated in (Player)
     player_tournaments = relationship(
-        "TournamentParticipant", foreign_keys="[TournamentParticipant.player_id]"
+        "TournamentParticipant", foreign_keys="[TournamentParticipant.player_id]", back_populates="player"
     )
 
 class Blade(Base):
@@ -30,7 +30,7 @@ class Blade(Base):
     canonical_name = Column(String(255))
     blade_type = Column(Enum("Attack", "Defense", "Stamina", "Balance", "None"))
     spin_direction = Column(Enum("Right-Spin", "Left-Spin", "Dual-Spin"))
-    blade_weight = Column(Decimal(4, 1))
+    blade_weight = Column(DECIMAL(4, 1))
 
     # Combinations this blade is part of
     combinations = relationship("BeybladeCombination", backref="blade")
@@ -42,7 +42,7 @@ class Ratchet(Base):
     ratchet_name = Column(String(255), unique=True)
     ratchet_protrusions = Column(Integer)
     ratchet_height = Column(Integer)
-    ratchet_weight = Column(Decimal(4, 1))
+    ratchet_weight = Column(DECIMAL(4, 1))
 
     # Combinations this ratchet is part of
     combinations = relationship("BeybladeCombination", backref="ratchet")
@@ -53,7 +53,7 @@ class Bit(Base):
     bit_id = Column(Integer, primary_key=True, autoincrement=True)
     bit_name = Column(String(255), unique=True)
     full_bit_name = Column(String(255))
-    bit_weight = Column(Decimal(4, 1))
+    bit_weight = Column(DECIMAL(4, 1))
     bit_type = Column(Enum("Attack", "Defense", "Stamina", "Balance", "Unknown"), default="Unknown")
 
     # Stats for this bit
@@ -79,7 +79,7 @@ class BladeStats(Base):
     attack = Column(Integer, default=0)
     defense = Column(Integer, default=0)
     stamina = Column(Integer, default=0)
-    weight = Column(Decimal(4, 1))
+    weight = Column(DECIMAL(4, 1))
 
 class RatchetStats(Base):
     __tablename__ = "RatchetStats"
@@ -111,7 +111,7 @@ class BeybladeCombination(Base):
     combination2_matches = relationship("Match", foreign_keys="[Match.combination2_id]", backref="combination2")
 
     combination_tournaments = relationship(
-        "TournamentParticipant", foreign_keys="[TournamentParticipant.combination_id]"
+        "TournamentParticipant", foreign_keys="[TournamentParticipant.combination_id]", back_populates="combination"
     )
 
 class LauncherClass(Base):
@@ -134,11 +134,25 @@ class LauncherClassSpinCompatibility(Base):
     launcher_class_id = Column(Integer, ForeignKey("LauncherClasses.id"), primary_key=True)
     spin_direction = Column(Enum("Right-Spin", "Left-Spin", "Dual-Spin"), primary_key=True)
 
+class StadiumClass(Base):
+    __tablename__ = "StadiumClasses"
+    id = Column("stadium_class_id", Integer, primary_key=True, autoincrement=True)
+    name = Column("stadium_class_name", String(255), nullable=False, unique=True)
+    description = Column(Text)
+    depth = Column(DECIMAL(6, 2))
+    width = Column(DECIMAL(6, 2))
+    height = Column(DECIMAL(6, 2))
+    stadiums = relationship("Stadium", backref="stadium_class")
+
 class Stadium(Base):
     __tablename__ = "Stadiums"
     stadium_id = Column(Integer, primary_key=True, autoincrement=True)
     stadium_name = Column(String(255), nullable=False, unique=True)
-    stadium_class = Column(String(255), nullable=False)
+    description = Column(Text)
+    location = Column(String(255))
+    material = Column(String(255))
+    notes = Column(Text)
+    stadium_class_id = Column(Integer, ForeignKey("StadiumClasses.stadium_class_id"))
     matches = relationship("Match", backref="stadium")
 
 class Match(Base):
@@ -147,8 +161,8 @@ class Match(Base):
     tournament_id = Column(Integer, ForeignKey("Tournaments.tournament_id"))
     player1_id = Column(Integer, ForeignKey("Players.player_id"))
     player2_id = Column(Integer, ForeignKey("Players.player_id"))
-    combination1_id = Column(Integer, ForeignKey("BeybladeCombinations.combination_id"))
-    combination2_id = Column(Integer, ForeignKey("BeybladeCombinations.combination_id"))
+    combination1_id = Column("player1_combination_id", Integer, ForeignKey("BeybladeCombinations.combination_id"))
+    combination2_id = Column("player2_combination_id", Integer, ForeignKey("BeybladeCombinations.combination_id"))
     player1_launcher_id = Column(Integer, ForeignKey("Launchers.launcher_id"))
     player2_launcher_id = Column(Integer, ForeignKey("Launchers.launcher_id"))
     stadium_id = Column(Integer, ForeignKey("Stadiums.stadium_id"))
@@ -157,6 +171,32 @@ class Match(Base):
     end_time = Column(TIMESTAMP)
     draw = Column(Boolean)
     start_time = Column(TIMESTAMP)
+    points = Column(Integer, default=0)  # Awarded to the winner under ScoringRules at insert time
+    tournament = relationship("Tournament", back_populates="matches")
+
+class ScoringRule(Base):
+    __tablename__ = "ScoringRules"
+    finish_type = Column(Enum('Survivor', 'KO', 'Burst', 'Extreme'), primary_key=True)
+    points = Column(Integer, nullable=False)
+
+class MatchSide(Base):
+    __tablename__ = "MatchSides"
+    # One row per (match, side); side 1 mirrors the player1_* columns of Matches.
+    match_id = Column(Integer, ForeignKey("Matches.match_id"), primary_key=True)
+    side = Column(Integer, primary_key=True)
+    tournament_id = Column(Integer)
+    stadium_id = Column(Integer)
+    end_time = Column(TIMESTAMP)
+    finish_type = Column(Enum('Draw', 'Survivor', 'KO', 'Burst', 'Extreme'))
+    player_id = Column(Integer)
+    combination_id = Column(Integer)
+    launcher_id = Column(Integer)
+    opponent_player_id = Column(Integer)
+    opponent_combination_id = Column(Integer)
+    won = Column(Integer, default=0)
+    lost = Column(Integer, default=0)
+    drawn = Column(Integer, default=0)
+    points = Column(Integer, default=0)
 
 class Tournament(Base):
     __tablename__ = "Tournaments"
@@ -190,4 +230,53 @@ class TournamentParticipant(Base):
             "(participant_type = 'Combination' AND player_id IS NULL AND combination_id IS NOT NULL)",
             name="chk_participant_type",
         ),
-    )
\ No newline at end of file
+    )
+
+class PlayerStatsAgg(Base):
+    __tablename__ = "PlayerStatsAgg"
+    player_id = Column(Integer, primary_key=True)
+    matches_played = Column(Integer, default=0)
+    wins = Column(Integer, default=0)
+    losses = Column(Integer, default=0)
+    draws = Column(Integer, default=0)
+    points = Column(Integer, default=0)
+    elo_rating = Column(Float, default=1000)
+
+class CombinationStatsAgg(Base):
+    __tablename__ = "CombinationStatsAgg"
+    combination_id = Column(Integer, primary_key=True)
+    matches_played = Column(Integer, default=0)
+    wins = Column(Integer, default=0)
+    losses = Column(Integer, default=0)
+    draws = Column(Integer, default=0)
+    points = Column(Integer, default=0)
+    elo_rating = Column(Float, default=1000)
+
+class PartStatsAgg(Base):
+    __tablename__ = "PartStatsAgg"
+    part_type = Column(Enum("Blade", "Ratchet", "Bit"), primary_key=True)
+    part_id = Column(Integer, primary_key=True)
+    matches_played = Column(Integer, default=0)
+    wins = Column(Integer, default=0)
+    losses = Column(Integer, default=0)
+    draws = Column(Integer, default=0)
+    points = Column(Integer, default=0)
+
+class StadiumStatsAgg(Base):
+    __tablename__ = "StadiumStatsAgg"
+    stadium_id = Column(Integer, primary_key=True)
+    matches_played = Column(Integer, default=0)
+    draws = Column(Integer, default=0)
+    survivor_finishes = Column(Integer, default=0)
+    ko_finishes = Column(Integer, default=0)
+    burst_finishes = Column(Integer, default=0)
+    extreme_finishes = Column(Integer, default=0)
+
+class CombinationTypeMatchupAgg(Base):
+    __tablename__ = "CombinationTypeMatchupAgg"
+    # (type1, type2) is stored sorted by name, so each pairing has one row.
+    type1 = Column(Enum("Attack", "Defense", "Stamina", "Balance", "Unknown"), primary_key=True)
+    type2 = Column(Enum("Attack", "Defense", "Stamina", "Balance", "Unknown"), primary_key=True)
+    matches_played = Column(Integer, default=0)
+    type1_wins = Column(Integer, default=0)
+    type2_wins = Column(Integer, default=0)
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from models import MatchSide, BeybladeCombination
+
+PART_COLUMNS = {
+    "Blade": BeybladeCombination.blade_id,
+    "Ratchet": BeybladeCombination.ratchet_id,
+    "Bit": BeybladeCombination.bit_id,
+}
+
+@dataclass
+class PartStats:
+    """Statistics for one blade, ratchet or bit, summed over every combination that uses it."""
+    part_type: str
+    part_id: int
+    usage_frequency: int = 0
+    matches_played: int = 0
+    wins: int = 0
+    losses: int = 0
+    draws: int = 0
+    win_rate: float = 0.0
+    total_points: int = 0
+    average_points_per_match: float = 0.0
+
+def _combination_sides_subquery(tournament_id: int = None):
+    """One row per (match, combination) side, with that side's result and points."""
+    query = select(
+        MatchSide.combination_id,
+        MatchSide.match_id,
+        MatchSide.won,
+        MatchSide.lost,
+        MatchSide.drawn,
+        MatchSide.points,
+    )
+    if tournament_id is not None:
+        query = query.where(MatchSide.tournament_id == tournament_id)
+    return query.subquery("combination_sides")
+
+def compute_part_stats(db: Session, part_type: str, tournament_id: int = None, part_ids=None) -> dict:
+    """Calculates PartStats for every part of one family (or just part_ids) with a single joined GROUP BY."""
+    if part_type not in PART_COLUMNS:
+        return {}
+
+    part_column = PART_COLUMNS[part_type]
+    sides = _combination_sides_subquery(tournament_id)
+    query = (
+        db.query(
+            part_column,
+            func.count(func.distinct(BeybladeCombination.combination_id)),
+            func.count(sides.c.match_id),
+            func.sum(sides.c.won),
+            func.sum(sides.c.lost),
+            func.sum(sides.c.drawn),
+            func.sum(sides.c.points),
+        )
+        .outerjoin(sides, sides.c.combination_id == BeybladeCombination.combination_id)
+        .filter(part_column.isnot(None))
+    )
+    if part_ids is not None:
+        query = query.filter(part_column.in_(part_ids))
+    rows = query.group_by(part_column).all()
+
+    stats = {}
+    for part_id, usage, played, wins, losses, draws, points in rows:
+        wins, losses, draws, points = int(wins or 0), int(losses or 0), int(draws or 0), int(points or 0)
+        stats[part_id] = PartStats(
+            part_type=part_type,
+            part_id=part_id,
+            usage_frequency=usage,
+            matches_played=played,
+            wins=wins,
+            losses=losses,
+            draws=draws,
+            win_rate=(wins / played) * 100 if played else 0.0,
+            total_points=points,
+            average_points_per_match=points / played if played else 0.0,
+        )
+    return stats
+
+def compute_all_part_stats(db: Session, tournament_id: int = None) -> dict:
+    """Calculates PartStats for every blade, ratchet and bit, one query per part family."""
+    return {part_type: compute_part_stats(db, part_type, tournament_id) for part_type in PART_COLUMNS}
@@ -0,0 +1,268 @@
+import functools
+import hashlib
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+class DebouncedPublisher:
+    """Runs a publish function on a background thread, coalescing bursts of requests into one run.
+
+    request() only records that a publish is wanted (plus an optional event,
+    such as the match that was just inserted) and returns immediately. The
+    worker waits until no new request has arrived for `delay` seconds (but
+    never longer than `max_delay` after the first one) and then calls
+    publish(events) once with every event queued since the previous run.
+    Requests that arrive while a publish is running schedule exactly one more.
+    """
+
+    def __init__(self, publish, delay=2.0, max_delay=10.0):
+        self._publish = publish
+        self._delay = delay
+        self._max_delay = max_delay
+        self._condition = threading.Condition()
+        self._first_request = None
+        self._last_request = None
+        self._events = []
+        self._thread = None
+
+    def request(self, event=None):
+        """Asks for a publish soon; cheap enough to call from a request handler."""
+        with self._condition:
+            now = time.monotonic()
+            if self._first_request is None:
+                self._first_request = now
+            self._last_request = now
+            if event is not None:
+                self._events.append(event)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="stats-publisher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._first_request is None:
+                    self._condition.wait()
+                while True:
+                    deadline = min(self._last_request + self._delay, self._first_request + self._max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                self._first_request = self._last_request = None
+                events, self._events = self._events, []
+            try:
+                self._publish(events)
+            except Exception as e:
+                logger.error(f"Error in background publish: {e}")
+
+class DeltaPublisher:
+    """Sends a payload only when it differs from the last one sent on the same topic.
+
+    `send(topic, payload, retain, on_failure)` does the actual publish and
+    returns True when the message was accepted (e.g. queued); if it is refused
+    later, it calls on_failure(). A topic's hash is remembered as soon as the
+    message is accepted, so a repeat that arrives while it is still queued is
+    not queued twice. A refusal, now or later, forgets the hash again, so the
+    payload is retried next cycle.
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self._hashes = {}
+        self._sent_once = set()
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload, retain=False):
+        """Publishes payload unless it is identical to the previous one on topic. Returns True if sent."""
+        digest = hashlib.sha256(_payload_bytes(payload)).digest()
+        with self._lock:
+            if self._hashes.get(topic) == digest:
+                return False
+            self._hashes[topic] = digest
+        on_failure = functools.partial(self._forget_hash, topic, digest)
+        if not self._send(topic, payload, retain, on_failure):
+            on_failure()
+            return False
+        return True
+
+    def publish_once(self, topic, payload, retain=True):
+        """Publishes payload on topic only the first time it is seen, e.g. a Home Assistant discovery config."""
+        with self._lock:
+            if topic in self._sent_once:
+                return False
+            self._sent_once.add(topic)
+        on_failure = functools.partial(self._forget_sent_once, topic)
+        if not self._send(topic, payload, retain, on_failure):
+            on_failure()
+            return False
+        return True
+
+    def _forget_hash(self, topic, digest):
+        with self._lock:
+            # A newer payload may have been accepted since; only forget this one.
+            if self._hashes.get(topic) == digest:
+                del self._hashes[topic]
+
+    def _forget_sent_once(self, topic):
+        with self._lock:
+            self._sent_once.discard(topic)
+
+    def forget(self):
+        """Forgets everything sent so far, so the next cycle republishes every topic (e.g. after a reconnect)."""
+        with self._lock:
+            self._hashes.clear()
+            self._sent_once.clear()
+
+def _payload_bytes(payload):
+    if isinstance(payload, (bytes, bytearray)):
+        return bytes(payload)
+    return str(payload).encode("utf-8")
+
+@dataclass
+class PublisherMetrics:
+    """Counters describing how well the MQTT publisher is keeping up."""
+    enqueued: int = 0
+    published: int = 0
+    acknowledged: int = 0
+    dropped: int = 0  # Rejected because the outbound queue was full
+    failed: int = 0  # Refused by the client (e.g. not connected)
+    batches: int = 0
+    window_waits: int = 0  # Times the flusher stalled on a full in-flight window
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    in_flight: int = 0
+
+class MqttPublisher:
+    """Batched, pipelined MQTT publisher on top of paho's own network thread.
+
+    Callers enqueue() messages into a bounded queue and return at once. A
+    flusher thread drains the queue in batches of up to `batch_size` and hands
+    them to client.publish(), keeping at most `max_inflight` messages between
+    publish() and the broker acknowledgement (on_publish). Network I/O runs on
+    the thread started by client.loop_start().
+
+    Works with any object offering paho's publish/loop_start/loop_stop/
+    on_publish interface, so tests can drive it with a fake client.
+    """
+
+    def __init__(self, client, max_queue=10000, max_inflight=100, batch_size=200, qos=0, enqueue_timeout=0.5, window_timeout=5.0):
+        self.client = client
+        self.qos = qos
+        self.metrics = PublisherMetrics()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._max_inflight = max_inflight
+        self._batch_size = batch_size
+        self._enqueue_timeout = enqueue_timeout
+        self._window_timeout = window_timeout
+        self._in_flight = set()
+        self._acknowledged_early = set()
+        self._window = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        if hasattr(client, "max_inflight_messages_set"):
+            client.max_inflight_messages_set(max_inflight)
+        client.on_publish = self._on_publish
+
+    def start(self):
+        """Starts paho's network thread and the flusher thread."""
+        self._stopping.clear()
+        self.client.loop_start()
+        self._thread = threading.Thread(target=self._run, name="mqtt-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Flushes what is queued (up to timeout) and stops both threads."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.client.loop_stop()
+
+    def enqueue(self, topic, payload, retain=False, qos=None, on_failure=None):
+        """Queues one message; returns False (and counts a drop) if the queue stays full.
+
+        on_failure, if given, is called on the flusher thread when the client
+        later refuses the message.
+        """
+        try:
+            self._queue.put((topic, payload, retain, self.qos if qos is None else qos, on_failure), timeout=self._enqueue_timeout)
+        except queue.Full:
+            self.metrics.dropped += 1
+            logger.warning(f"MQTT outbound queue full, dropping message for {topic}")
+            return False
+        self.metrics.enqueued += 1
+        depth = self._queue.qsize()
+        self.metrics.queue_depth = depth
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, depth)
+        return True
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.metrics.batches += 1
+            for message in batch:
+                self._wait_for_window()
+                self._publish(*message)
+            self.metrics.queue_depth = self._queue.qsize()
+
+    def _wait_for_window(self):
+        with self._window:
+            if len(self._in_flight) >= self._max_inflight:
+                self.metrics.window_waits += 1
+                # The timeout keeps a lost acknowledgement (e.g. on disconnect) from stalling us forever.
+                # Acknowledgements still pending then are given up on, so early ones for them are dropped too.
+                if not self._window.wait_for(lambda: len(self._in_flight) < self._max_inflight, timeout=self._window_timeout):
+                    self._in_flight.clear()
+                    self._acknowledged_early.clear()
+                    self.metrics.in_flight = 0
+
+    def _publish(self, topic, payload, retain, qos, on_failure):
+        try:
+            info = self.client.publish(topic, payload, qos=qos, retain=retain)
+        except Exception as e:
+            logger.error(f"Error publishing to MQTT: {e}")
+            self._failed(on_failure)
+            return
+        if info.rc != 0:
+            logger.debug(f"MQTT client refused message for {topic} (rc={info.rc})")
+            self._failed(on_failure)
+            return
+        self.metrics.published += 1
+        with self._window:
+            # on_publish may already have fired for this mid on the network thread.
+            if info.mid in self._acknowledged_early:
+                self._acknowledged_early.discard(info.mid)
+            else:
+                self._in_flight.add(info.mid)
+            self.metrics.in_flight = len(self._in_flight)
+
+    def _failed(self, on_failure):
+        if on_failure is not None:
+            try:
+                on_failure()
+            except Exception as e:
+                logger.error(f"Error in MQTT failure callback: {e}")
+        self.metrics.failed += 1
+
+    def _on_publish(self, client, userdata, mid, *args):
+        with self._window:
+            if mid in self._in_flight:
+                self._in_flight.discard(mid)
+            else:
+                self._acknowledged_early.add(mid)
+            self.metrics.acknowledged += 1
+            self.metrics.in_flight = len(self._in_flight)
+            self._window.notify()
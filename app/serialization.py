@@ -0,0 +1,28 @@
+import dataclasses
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import orjson
+from flask import Response
+from sqlalchemy.engine import Row
+
+def _encode_default(value):
+    """Encodes the types orjson does not handle natively (Decimal from MySQL aggregates, timedelta, ORM result rows)."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, Row):
+        return list(value)
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_json(data) -> bytes:
+    """Encodes data to JSON bytes once; datetimes become ISO 8601 strings and Decimals plain numbers."""
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    return orjson.dumps(data, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+def json_response(payload: bytes, status: int = 200) -> Response:
+    """Wraps already-encoded JSON bytes in a Flask response without encoding them again."""
+    return Response(payload, status=status, mimetype="application/json")
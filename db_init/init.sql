@@ -123,6 +123,36 @@ CREATE TABLE IF NOT EXISTS Tournaments (
     tournament_type ENUM('Standard', 'PlayerLadder', 'CombinationLadder') DEFAULT 'Standard'
 );
 
+-- Points the winner of a match earns, per finish type. Matches.points is
+-- filled from this at insert time; after editing it, run `flask recompute-points`.
+CREATE TABLE IF NOT EXISTS ScoringRules (
+    finish_type ENUM('Survivor', 'KO', 'Burst', 'Extreme') PRIMARY KEY,
+    points INT NOT NULL
+);
+
+INSERT IGNORE INTO ScoringRules (finish_type, points) VALUES ('Survivor', 1), ('Burst', 2), ('KO', 2), ('Extreme', 3);
+
+-- Stadium classes (standard dimensions) and the stadiums built to them
+CREATE TABLE IF NOT EXISTS StadiumClasses (
+    stadium_class_id INT AUTO_INCREMENT PRIMARY KEY,
+    stadium_class_name VARCHAR(255) NOT NULL UNIQUE,
+    description TEXT,
+    depth DECIMAL(6, 2),
+    width DECIMAL(6, 2),
+    height DECIMAL(6, 2)
+);
+
+CREATE TABLE IF NOT EXISTS Stadiums (
+    stadium_id INT AUTO_INCREMENT PRIMARY KEY,
+    stadium_name VARCHAR(255) NOT NULL UNIQUE,
+    description TEXT,
+    location VARCHAR(255),
+    material VARCHAR(255),
+    notes TEXT,
+    stadium_class_id INT,
+    FOREIGN KEY (stadium_class_id) REFERENCES StadiumClasses(stadium_class_id)
+);
+
 -- Matches table (added start_time, renamed match_time to end_time)
 CREATE TABLE IF NOT EXISTS Matches (
     match_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -139,6 +169,7 @@ CREATE TABLE IF NOT EXISTS Matches (
     end_time TIMESTAMP,
     draw TINYINT(1) DEFAULT 0,
     start_time TIMESTAMP NULL,
+    points INT NOT NULL DEFAULT 0,  -- Awarded to the winner under ScoringRules; 0 for draws
     FOREIGN KEY (tournament_id) REFERENCES Tournaments(tournament_id),
     FOREIGN KEY (player1_id) REFERENCES Players(player_id),
     FOREIGN KEY (player2_id) REFERENCES Players(player_id),
@@ -147,7 +178,45 @@ CREATE TABLE IF NOT EXISTS Matches (
     FOREIGN KEY (player1_launcher_id) REFERENCES Launchers(launcher_id),
     FOREIGN KEY (player2_launcher_id) REFERENCES Launchers(launcher_id),
     FOREIGN KEY (winner_id) REFERENCES Players(player_id),
-    FOREIGN KEY (stadium_id) REFERENCES Stadiums(stadium_id)
+    FOREIGN KEY (stadium_id) REFERENCES Stadiums(stadium_id),
+    -- Hot access paths; kept in step with migration 1 in app/migrations.py
+    INDEX idx_matches_player1_end (player1_id, end_time),
+    INDEX idx_matches_player2_end (player2_id, end_time),
+    INDEX idx_matches_combination1_end (player1_combination_id, end_time),
+    INDEX idx_matches_combination2_end (player2_combination_id, end_time),
+    INDEX idx_matches_tournament_end (tournament_id, end_time),
+    INDEX idx_matches_winner_finish (winner_id, finish_type),
+    INDEX idx_matches_stadium_end (stadium_id, end_time),
+    INDEX idx_matches_end_time (end_time, match_id),
+    INDEX idx_matches_winner_points (winner_id, points)
+);
+
+-- One row per (match, side), written by add_match alongside the Matches row,
+-- so per-participant queries are indexed equality lookups instead of
+-- "player1_id = X OR player2_id = X". Rebuilt by `flask backfill-match-sides`.
+CREATE TABLE IF NOT EXISTS MatchSides (
+    match_id INT NOT NULL,
+    side TINYINT NOT NULL,  -- 1 or 2: which player columns of Matches this row came from
+    tournament_id INT,
+    stadium_id INT,
+    end_time TIMESTAMP NULL,
+    finish_type ENUM('Draw', 'Survivor', 'KO', 'Burst', 'Extreme'),
+    player_id INT,
+    combination_id INT,
+    launcher_id INT,
+    opponent_player_id INT,
+    opponent_combination_id INT,
+    won TINYINT(1) DEFAULT 0,
+    lost TINYINT(1) DEFAULT 0,
+    drawn TINYINT(1) DEFAULT 0,
+    points INT DEFAULT 0,
+    PRIMARY KEY (match_id, side),
+    FOREIGN KEY (match_id) REFERENCES Matches(match_id) ON DELETE CASCADE,
+    INDEX idx_match_sides_player (player_id, end_time),
+    INDEX idx_match_sides_combination (combination_id, end_time),
+    INDEX idx_match_sides_launcher (launcher_id, end_time),
+    INDEX idx_match_sides_tournament (tournament_id, player_id),
+    INDEX idx_match_sides_head_to_head (player_id, opponent_player_id)
 );
 
 -- TournamentParticipant table (updated for Player/Combination participation & ELO)
@@ -170,5 +239,65 @@ CREATE TABLE IF NOT EXISTS TournamentParticipant (
     )
 );
 
+-- Materialized statistics, updated by add_match in the same transaction as the match insert
+CREATE TABLE IF NOT EXISTS PlayerStatsAgg (
+    player_id INT PRIMARY KEY,
+    matches_played INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    draws INT NOT NULL DEFAULT 0,
+    points INT NOT NULL DEFAULT 0,
+    elo_rating DOUBLE NOT NULL DEFAULT 1000
+);
+
+CREATE TABLE IF NOT EXISTS CombinationStatsAgg (
+    combination_id INT PRIMARY KEY,
+    matches_played INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    draws INT NOT NULL DEFAULT 0,
+    points INT NOT NULL DEFAULT 0,
+    elo_rating DOUBLE NOT NULL DEFAULT 1000
+);
+
+CREATE TABLE IF NOT EXISTS PartStatsAgg (
+    part_type ENUM('Blade', 'Ratchet', 'Bit'),
+    part_id INT,
+    matches_played INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    draws INT NOT NULL DEFAULT 0,
+    points INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (part_type, part_id)
+);
+
+CREATE TABLE IF NOT EXISTS StadiumStatsAgg (
+    stadium_id INT PRIMARY KEY,
+    matches_played INT NOT NULL DEFAULT 0,
+    draws INT NOT NULL DEFAULT 0,
+    survivor_finishes INT NOT NULL DEFAULT 0,
+    ko_finishes INT NOT NULL DEFAULT 0,
+    burst_finishes INT NOT NULL DEFAULT 0,
+    extreme_finishes INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS CombinationTypeMatchupAgg (
+    type1 ENUM('Attack', 'Defense', 'Stamina', 'Balance', 'Unknown'),
+    type2 ENUM('Attack', 'Defense', 'Stamina', 'Balance', 'Unknown'),
+    matches_played INT NOT NULL DEFAULT 0,
+    type1_wins INT NOT NULL DEFAULT 0,
+    type2_wins INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (type1, type2)
+);
+
+-- Bumped by CLI commands that rewrite match data (recompute-points,
+-- backfill-match-sides, rebuild-stats); the web process polls it to drop its caches.
+CREATE TABLE IF NOT EXISTS DataGenerations (
+    name VARCHAR(64) PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO DataGenerations (name, generation) VALUES ('matches', 0);
+
 GRANT ALL PRIVILEGES ON beyblade_db.* TO 'beyblade_user'@'%' IDENTIFIED BY 'Sample_DB_Password';
 FLUSH PRIVILEGES;
\ No newline at end of file
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+# The app modules import each other by flat module name, as they do when run from app/.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database holding every model's table."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from cache import bump_match_generation
+    from models import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    bump_match_generation()  # Results cached from another test's database are stale here
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def add_match(db):
+    """Adds a match plus its two MatchSides rows (built as the insert path builds them) and returns the Match."""
+    from datetime import datetime, timedelta
+    from aggregates import match_side_results
+    from match_statistics import calculate_match_points
+    from models import Match, MatchSide
+
+    def add(player1_id=1, player2_id=2, winner_id=None, finish_type=None, draw=False, **fields):
+        match_id = fields.pop("match_id", None) or (db.query(Match).count() + 1)
+        fields.setdefault("end_time", datetime(2024, 1, 1) + timedelta(minutes=match_id))
+        fields.setdefault("points", calculate_match_points(finish_type, winner_id, draw))
+        match = Match(
+            match_id=match_id, player1_id=player1_id, player2_id=player2_id,
+            winner_id=winner_id, finish_type=finish_type, draw=draw, **fields,
+        )
+        db.add(match)
+        values = {
+            "player1_id": player1_id, "player2_id": player2_id, "winner_id": winner_id, "draw": draw,
+            "finish_type": finish_type, "points": match.points,
+            "player1_combination_id": match.combination1_id, "player2_combination_id": match.combination2_id,
+        }
+        for side, (player_id, combination_id, won, lost, drawn, points) in enumerate(match_side_results(values), start=1):
+            other = 3 - side
+            db.add(MatchSide(
+                match_id=match_id, side=side, tournament_id=match.tournament_id, stadium_id=match.stadium_id,
+                end_time=match.end_time, finish_type=finish_type, player_id=player_id, combination_id=combination_id,
+                opponent_player_id=values[f"player{other}_id"], opponent_combination_id=values[f"player{other}_combination_id"],
+                won=won, lost=lost, drawn=drawn, points=points,
+            ))
+        db.commit()
+        return match
+    return add
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """A Flask test client whose /api views use the test database and publish nothing."""
+    from app import app  # Loads api too; app.py registers the blueprint once its helpers exist
+    import api
+
+    monkeypatch.setattr(api, "SessionLocal", lambda: db)
+    monkeypatch.setattr(api, "publish_mqtt_message", lambda topic, payload: None)
+    return app.test_client()
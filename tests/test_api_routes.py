@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from models import Launcher, LauncherClass, Player, Tournament, TournamentParticipant
+
+def test_stats_routes_query_with_the_request_session(db, add_match, client):
+    db.add_all([
+        Player(player_id=1, player_name="Alice"),
+        Player(player_id=2, player_name="Bob"),
+        LauncherClass(id=1, name="String"),
+        Launcher(launcher_id=1, launcher_name="String Launcher", launcher_class_id=1),
+        Tournament(tournament_id=1, tournament_name="Cup", tournament_type="Standard"),
+        TournamentParticipant(tournament_id=1, player_id=1, participant_type="Player"),
+        TournamentParticipant(tournament_id=1, player_id=2, participant_type="Player"),
+    ])
+    db.commit()
+    start = datetime(2024, 1, 1)
+    add_match(winner_id=1, finish_type="KO", tournament_id=1, player1_launcher_id=1,
+              start_time=start, end_time=start + timedelta(seconds=30))
+    add_match(winner_id=1, finish_type="KO", tournament_id=1, player2_launcher_id=1,
+              start_time=start, end_time=start + timedelta(seconds=90))
+
+    standings = client.get("/api/tournament/1/standings").get_json()["standings"]
+    assert [(s["participant_name"], s["wins"], s["matches"]) for s in standings] == [("Alice", 2, 2), ("Bob", 0, 2)]
+    launcher = client.get("/api/launcher/1").get_json()
+    assert (launcher["usage_frequency"], launcher["win_percentage"]) == (2, 50.0)
+    assert client.get("/api/launcher_class/1").get_json()["most_common_win_type"] == "KO"
+    assert client.get("/api/tournament/1/average_match_length").status_code == 200
+    assert client.get("/api/matchups/Player").get_json() == [[1, 2, 2]]
+
+class RecordingDelta:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, retain=False):
+        self.published.append((topic, payload))
+        return True
+
+    def publish_once(self, topic, payload, retain=True):
+        return True
+
+STATS = {
+    "total_matches": 3,
+    "top_players": [{"name": "Alice", "points": 5, "wins": 2, "losses": 1, "draws": 0}],
+    "top_combinations": [{"name": "DS 3-60F", "points": 4}],
+}
+
+def test_beyblade_stats_bulk_mode_publishes_the_response_bytes(monkeypatch):
+    import app
+    from serialization import encode_json
+
+    delta = RecordingDelta()
+    monkeypatch.setattr(app, "mqtt_delta", delta)
+    monkeypatch.setattr(app, "MQTT_BULK_MODE", True)
+    payload = encode_json(STATS)
+    app.publish_stats_to_mqtt(STATS, payload)
+    assert dict(delta.published)[app.MQTT_TOPIC_PREFIX + "beyblade_stats"] is payload
+
+def test_beyblade_stats_publishes_each_top_field_once(monkeypatch):
+    import app
+    from serialization import encode_json
+
+    delta = RecordingDelta()
+    monkeypatch.setattr(app, "mqtt_delta", delta)
+    monkeypatch.setattr(app, "MQTT_BULK_MODE", False)
+    app.publish_stats_to_mqtt(STATS, encode_json(STATS))
+    topics = [topic[len(app.MQTT_TOPIC_PREFIX):] for topic, _ in delta.published]
+    assert topics == [
+        "total_matches",
+        "top_players/0/name", "top_players/0/points", "top_players/0/wins", "top_players/0/losses", "top_players/0/draws",
+        "top_combinations/0/name", "top_combinations/0/points",
+    ]
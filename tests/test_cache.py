@@ -0,0 +1,88 @@
+import functools
+
+from cache import (
+    GenerationCache, ReferenceCache, bump_match_generation, bump_reference_version, cached,
+    get_match_generation, sync_match_generation,
+)
+
+def counting(function):
+    """Wraps function so the test can see how often the cache let a call through."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        wrapper.calls += 1
+        return function(*args, **kwargs)
+    wrapper.calls = 0
+    return wrapper
+
+def test_cached_shares_an_entry_between_positional_and_keyword_calls():
+    @counting
+    def compute(db, player_id, tournament_id=None):
+        return {"player_id": player_id, "tournament_id": tournament_id}
+    stats = cached()(compute)
+
+    first = stats("session", 1)
+    assert stats("another session", player_id=1) is first
+    assert stats("session", 1, tournament_id=None) is first
+    assert stats("session", 1, 2) == {"player_id": 1, "tournament_id": 2}
+    assert compute.calls == 2
+
+def test_cached_recomputes_after_a_generation_bump_ttl_or_eviction():
+    compute = counting(lambda db, value: [value])
+    stats = cached(maxsize=1, ttl=60.0, tables=("Players",))(compute)
+
+    stats(None, 1)
+    bump_match_generation()
+    stats(None, 1)
+    bump_reference_version("Players")
+    stats(None, 1)
+    stats(None, 2)  # Evicts 1
+    stats(None, 1)
+    assert compute.calls == 5
+
+    expired = counting(lambda db: 1)
+    short = cached(ttl=0.0)(expired)
+    short(None)
+    short(None)
+    assert expired.calls == 2
+
+def test_generation_cache_keeps_values_until_the_generation_or_a_table_moves():
+    cache = GenerationCache(maxsize=2, tables=("BeybladeCombinations",))
+    compute = counting(lambda: object())
+
+    value = cache.get_or_compute("a", compute)
+    assert cache.get_or_compute("a", compute) is value
+    bump_reference_version("BeybladeCombinations")
+    assert cache.get_or_compute("a", compute) is not value
+    bump_match_generation()
+    cache.get_or_compute("a", compute)
+    assert compute.calls == 3
+
+def test_generation_cache_evicts_the_least_recently_used_key():
+    cache = GenerationCache(maxsize=2)
+    compute = counting(lambda: object())
+    for key in ("a", "b", "a", "c", "a", "b"):
+        cache.get_or_compute(key, compute)
+    assert compute.calls == 4  # a, b, c, then b again after c pushed it out
+
+def test_reference_cache_reloads_when_one_of_its_tables_changes():
+    cache = ReferenceCache()
+    load = counting(lambda: {"Alice": 1})
+
+    names = cache.get_or_load(("Players", "Launchers"), "names", load)
+    assert cache.get_or_load(("Players", "Launchers"), "names", load) is names
+    bump_match_generation()  # Match data does not touch reference data
+    cache.get_or_load(("Players", "Launchers"), "names", load)
+    assert load.calls == 1
+    bump_reference_version("Launchers")
+    cache.get_or_load(("Players", "Launchers"), "names", load)
+    cache.invalidate("names")
+    cache.get_or_load(("Players", "Launchers"), "names", load)
+    assert load.calls == 3
+
+def test_sync_match_generation_bumps_only_when_the_stored_generation_moves():
+    sync_match_generation(7)
+    generation = get_match_generation()
+    assert not sync_match_generation(7)
+    assert get_match_generation() == generation
+    assert sync_match_generation(8)
+    assert get_match_generation() == generation + 1
@@ -0,0 +1,54 @@
+import pytest
+
+from match_statistics import CombinationMatchupMatrix, build_combination_matchup_matrix
+from models import BeybladeCombination
+
+def test_matchup_matrix_counts_both_sides_of_every_match():
+    matrix = CombinationMatchupMatrix()
+    # (combination1_id, combination2_id, player1_id, player2_id, winner_id, draw, finish_type)
+    matrix.add(10, 20, 1, 2, 1, False, "KO")
+    matrix.add(10, 20, 1, 2, 1, False, "Burst")
+    matrix.add(20, 10, 2, 1, 2, False, "Extreme")
+    matrix.add(10, 30, 1, 3, None, True, "Draw")
+    matrix.add(10, 10, 1, 2, 2, False, "Survivor")  # Mirror match
+
+    assert matrix.totals[10] == [6, 3, 2, 1, 2 + 2 + 1]
+    assert matrix.matchups[10] == {20: [2, 1, 0], 30: [0, 0, 1]}
+    assert matrix.matchups[20] == {10: [1, 2, 0]}
+    assert matrix.best_matchups(10) == [(20, 2 / 3), (30, 0.0)]
+    assert matrix.worst_matchups(10, limit=1) == [(30, 0.0)]
+    assert matrix.most_common_opponent(10) == 20
+
+    stats = matrix.stats(10, elo_rating=1020.0)
+    assert (stats.matches_played, stats.wins, stats.losses, stats.draws) == (6, 3, 2, 1)
+    assert stats.most_common_winning_finish_type == "Burst"  # Alphabetically first of the tied types
+    assert stats.burst_rate == pytest.approx(100 / 3)
+    assert stats.most_common_loss_type == "Extreme"
+    assert stats.elo_rating == 1020.0
+    assert matrix.stats(99).matches_played == 0
+
+def test_build_matchup_matrix_restricts_to_a_combination_or_tournament(db, add_match):
+    db.add_all([BeybladeCombination(combination_id=c, combination_name=f"Combo {c}") for c in (10, 20, 30)])
+    db.commit()
+    add_match(combination1_id=10, combination2_id=20, winner_id=1, finish_type="KO", tournament_id=1)
+    add_match(combination1_id=20, combination2_id=30, winner_id=2, finish_type="Burst")
+
+    assert set(build_combination_matchup_matrix(db).totals) == {10, 20, 30}
+    assert set(build_combination_matchup_matrix(db, combination_id=10).totals) == {10, 20}
+    assert build_combination_matchup_matrix(db, tournament_id=1).matchups == {10: {20: [1, 0, 0]}, 20: {10: [0, 1, 0]}}
+
+def test_combination_type_stats_from_type_matchup_rows():
+    from app import calculate_combination_type_stats
+
+    stats = calculate_combination_type_stats([
+        ("Attack", "Defense", 5, 3, 2),
+        ("Attack", "Attack", 2, 2, 0),
+        ("Balance", "Stamina", 1, 0, 0),  # Only draws: usage counts, no win rates
+    ])
+    assert stats["type_usage"] == {"Attack": 9, "Defense": 5, "Balance": 1, "Stamina": 1}
+    assert stats["most_common_type"] == ("Attack", 9)
+    assert stats["type_matchups"] == {
+        ("Attack", "Attack"): {"p1_wins": 2, "p2_wins": 0, "total": 2, "win_rates": {"Attack": 100.0}},
+        ("Attack", "Defense"): {"p1_wins": 3, "p2_wins": 2, "total": 5, "win_rates": {"Attack": 60.0, "Defense": 40.0}},
+    }
+    assert calculate_combination_type_stats([])["most_common_type"] is None
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+
+from aggregates import apply_match_to_elo_ratings, replay_elo_ratings
+from elo_tuning import load_match_history, replay_history, sweep_elo_parameters
+from match_statistics import DEFAULT_ELO_RATING, K_FACTOR, EloRatings, calculate_elo_update
+
+def add_history(add_match):
+    # Players 1-4 in an order that gives independent_batches several runs, including draws
+    add_match(1, 2, winner_id=1, finish_type="KO")
+    add_match(3, 4, winner_id=4, finish_type="Burst")
+    add_match(1, 3, winner_id=3, finish_type="Survivor")
+    add_match(2, 4, draw=True, finish_type="Draw")
+    add_match(4, 1, winner_id=1, finish_type="Extreme")
+    add_match(2, 3, winner_id=2, finish_type="KO")
+
+def test_sweep_replay_matches_the_sequential_replay(db, add_match):
+    add_history(add_match)
+    history = load_match_history(db, "Player")
+    ratings, _ = replay_history(history, (K_FACTOR,))
+
+    cursor = db.connection().connection.cursor()
+    replayed = replay_elo_ratings(cursor).players
+    assert dict(zip(history.participant_ids.tolist(), ratings[0].tolist())) == pytest.approx(replayed)
+
+def test_sweep_scores_each_k_factor(db, add_match):
+    add_history(add_match)
+    results = sweep_elo_parameters(load_match_history(db, "Player"), (16, 32))
+    assert [result.k_factor for result in results] == [16.0, 32.0]
+    assert all(0.0 < result.log_loss and 0.0 <= result.accuracy <= 1.0 for result in results)
+
+def test_elo_ratings_update_both_players_and_combinations():
+    ratings = EloRatings()
+    ratings.record(1, 2, 10, 20, winner_id=1, draw=False)
+    winner, loser = calculate_elo_update(DEFAULT_ELO_RATING, DEFAULT_ELO_RATING, 1.0, K_FACTOR)
+    assert ratings.players == {1: winner, 2: loser}
+    assert ratings.combinations == {10: winner, 20: loser}
+    assert winner > DEFAULT_ELO_RATING > loser
+
+def test_elo_ratings_skip_undecided_matches_and_mirror_matches():
+    ratings = EloRatings()
+    ratings.record(1, 2, 10, 20, winner_id=None, draw=False)
+    ratings.record(1, 2, 10, 10, winner_id=2, draw=False)
+    assert ratings.combinations == {}
+    assert set(ratings.players) == {1, 2}
+
+def test_replay_applies_matches_in_end_time_order(db, add_match):
+    add_match(1, 2, winner_id=2, finish_type="KO", match_id=1, end_time=datetime(2024, 1, 2))
+    add_match(1, 2, winner_id=1, finish_type="KO", match_id=2, end_time=datetime(2024, 1, 1))
+
+    expected = EloRatings()
+    expected.record(1, 2, None, None, 1, False)
+    expected.record(1, 2, None, None, 2, False)
+    assert replay_elo_ratings(db.connection().connection.cursor()).players == pytest.approx(expected.players)
+
+class ScriptedCursor:
+    """Answers the statements apply_match_to_elo_ratings issues from canned rows, and records the updates."""
+
+    def __init__(self, later_match_exists, stored, history):
+        self.later_match_exists = later_match_exists
+        self.stored = stored
+        self.history = list(history)
+        self.updates = {}
+        self._result = []
+
+    def execute(self, sql, params=()):
+        if sql.startswith("SELECT 1 FROM Matches"):
+            self._result = [(1,)] if self.later_match_exists else []
+        elif "FOR UPDATE" in sql:
+            self._result = [(entity_id, self.stored[entity_id]) for entity_id in params if entity_id in self.stored]
+        else:
+            self._result = self.history
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def fetchmany(self, size):
+        rows, self._result = self._result[:size], self._result[size:]
+        return rows
+
+    def executemany(self, sql, rows):
+        table = sql.split()[1]
+        self.updates.setdefault(table, {}).update({entity_id: rating for rating, entity_id in rows})
+
+MATCH = {"match_id": 2, "end_time": datetime(2024, 1, 1), "player1_id": 1, "player2_id": 2,
+         "player1_combination_id": None, "player2_combination_id": None, "winner_id": 1, "draw": False}
+
+def test_live_update_applies_the_latest_match_to_stored_ratings():
+    cursor = ScriptedCursor(later_match_exists=False, stored={1: 1010.0, 2: 990.0}, history=[])
+    apply_match_to_elo_ratings(cursor, MATCH)
+    assert cursor.updates["PlayerStatsAgg"] == pytest.approx(dict(zip((1, 2), calculate_elo_update(1010.0, 990.0, 1.0, K_FACTOR))))
+
+def test_live_update_replays_when_a_match_is_back_dated():
+    # Match 1 (player 2 won) ends after the new match 2, so the replay applies match 2 first
+    history = [(1, 2, None, None, 1, False), (1, 2, None, None, 2, False)]
+    cursor = ScriptedCursor(later_match_exists=True, stored={1: 984.0, 2: 1016.0}, history=history)
+    apply_match_to_elo_ratings(cursor, MATCH)
+
+    expected = EloRatings()
+    for row in history:
+        expected.record(*row)
+    assert cursor.updates["PlayerStatsAgg"] == pytest.approx(expected.players)
@@ -0,0 +1,42 @@
+from models import Bit, Blade, BeybladeCombination, Ratchet
+from part_statistics import compute_part_stats
+
+def add_parts(db):
+    db.add_all([
+        Blade(blade_id=1, blade_name="Dran Sword"),
+        Blade(blade_id=2, blade_name="Hells Scythe"),
+        Ratchet(ratchet_id=1, ratchet_name="3-60"),
+        Bit(bit_id=1, bit_name="Flat"),
+        BeybladeCombination(combination_id=10, blade_id=1, ratchet_id=1, bit_id=1, combination_name="DS 3-60F"),
+        BeybladeCombination(combination_id=20, blade_id=2, ratchet_id=1, bit_id=1, combination_name="HS 3-60F"),
+    ])
+    db.commit()
+
+def test_compute_part_stats_sums_every_combination_using_the_part(db, add_match):
+    add_parts(db)
+    add_match(combination1_id=10, combination2_id=20, winner_id=1, finish_type="KO", tournament_id=1)
+    add_match(combination1_id=10, combination2_id=20, winner_id=2, finish_type="Extreme")
+    add_match(combination1_id=20, combination2_id=10, draw=True, finish_type="Draw")
+
+    blades = compute_part_stats(db, "Blade")
+    assert (blades[1].matches_played, blades[1].wins, blades[1].losses, blades[1].draws) == (3, 1, 1, 1)
+    assert blades[1].total_points == 2
+    assert blades[2].total_points == 3
+    ratchet = compute_part_stats(db, "Ratchet")[1]
+    assert (ratchet.usage_frequency, ratchet.matches_played, ratchet.total_points) == (2, 6, 5)
+    assert compute_part_stats(db, "Blade", tournament_id=1, part_ids=[1])[1].win_rate == 100.0
+
+def test_part_endpoints_answer_from_compute_part_stats(db, add_match, client):
+    add_parts(db)
+    add_match(combination1_id=10, combination2_id=20, winner_id=1, finish_type="KO")
+    add_match(combination1_id=10, combination2_id=20, winner_id=2, finish_type="Burst")
+
+    assert client.get("/api/part/Blade/1/win_rate").get_json() == {"win_rate": 50.0}
+    assert client.get("/api/part/Blade/1/total_points").get_json() == {"total_points": 2}
+    assert client.get("/api/part/Ratchet/1/usage_frequency").get_json() == {"usage_frequency": 2}
+    assert client.get("/api/part/Bit/1/average_points_per_match").get_json() == {"average_points_per_match": 1.0}
+    assert client.get("/api/part/Blade/1/most_common_combinations").get_json() == {
+        "most_common_combinations": [{"combination_id": 10, "combination_name": "DS 3-60F"}]
+    }
+    assert client.get("/api/part/Blade/99/win_rate").status_code == 404
+    assert client.get("/api/part/Wheel/1/win_rate").status_code == 404
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from match_statistics import DEFAULT_ELO_RATING, PlayerAggregate, calculate_player_aggregate, compute_all_player_stats
+from models import Player, PlayerStatsAgg
+
+def test_player_aggregate_folds_sides_oldest_first():
+    aggregate = PlayerAggregate(1)
+    for won, lost, drawn, finish_type, points in [
+        (1, 0, 0, "KO", 2), (1, 0, 0, "KO", 2), (0, 1, 0, "Burst", 0),
+        (0, 0, 1, "Draw", 0), (1, 0, 0, "Extreme", 3), (1, 0, 0, "Survivor", 1),
+    ]:
+        aggregate.add_side(won, lost, drawn, finish_type, points)
+
+    stats = aggregate.result(1040.0)
+    assert (stats.matches_played, stats.wins, stats.losses, stats.draws) == (6, 4, 1, 1)
+    assert (stats.win_streak, stats.loss_streak) == (2, 0)
+    assert stats.total_points == 8
+    assert stats.average_points_per_match == 8 / 6
+    assert stats.win_percentage == 4 / 6 * 100
+    assert stats.non_loss_percentage == 5 / 6 * 100
+    assert stats.most_common_winning_finish_type == "KO"
+    assert stats.elo_rating == 1040.0
+
+def test_player_aggregate_without_matches_is_all_zero():
+    stats = PlayerAggregate(1).result()
+    assert (stats.matches_played, stats.win_percentage, stats.most_common_winning_finish_type) == (0, 0.0, None)
+
+def test_calculate_player_aggregate_reads_the_players_match_sides(db, add_match):
+    db.add(PlayerStatsAgg(player_id=1, elo_rating=1012.5))
+    db.commit()
+    add_match(1, 2, winner_id=1, finish_type="KO", tournament_id=1)
+    add_match(2, 1, winner_id=2, finish_type="Burst")
+    add_match(1, 3, winner_id=1, finish_type="Extreme", points=4)
+
+    stats = calculate_player_aggregate(db, 1)
+    assert (stats.matches_played, stats.wins, stats.losses, stats.win_streak) == (3, 2, 1, 1)
+    assert stats.total_points == 2 + 4
+    assert stats.elo_rating == 1012.5
+    assert calculate_player_aggregate(db, 2).elo_rating == DEFAULT_ELO_RATING
+    assert calculate_player_aggregate(db, 1, tournament_id=1).matches_played == 1
+
+def test_sql_and_in_memory_player_stats_agree(db, add_match):
+    db.add_all([Player(player_id=player_id, player_name=f"Player {player_id}") for player_id in (1, 2, 3, 4)])
+    db.commit()
+    tie = datetime(2024, 1, 1, 12)
+    add_match(1, 2, winner_id=1, finish_type="KO", tournament_id=1)
+    add_match(1, 3, winner_id=1, finish_type="Extreme", points=5)  # Stored points differ from the scoring table
+    add_match(2, 3, draw=True, finish_type="Draw", tournament_id=1)
+    # Same end_time: match_id decides which result is the latest
+    add_match(1, 2, winner_id=2, finish_type="Burst", match_id=10, end_time=tie)
+    add_match(1, 3, winner_id=1, finish_type="Survivor", match_id=11, end_time=tie)
+    add_match(3, 2, winner_id=3, finish_type="KO", tournament_id=1, match_id=12, end_time=datetime(2024, 1, 2))
+
+    for tournament_id in (None, 1):
+        sql = compute_all_player_stats(db, tournament_id=tournament_id)
+        in_memory = compute_all_player_stats(db, tournament_id=tournament_id, in_memory=True)
+        assert sql == in_memory
+
+    stats = compute_all_player_stats(db)
+    assert (stats[1].wins, stats[1].win_streak, stats[1].total_points) == (3, 1, 2 + 5 + 1)
+    assert (stats[2].loss_streak, stats[3].win_streak) == (1, 1)
+    assert stats[4].matches_played == 0
@@ -0,0 +1,172 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from publisher import DebouncedPublisher, DeltaPublisher, MqttPublisher
+
+class FakeClient:
+    """Stands in for a paho client: accepts every publish and acknowledges only when told to."""
+
+    def __init__(self):
+        self.on_publish = None
+        self.published = []
+        self._next_mid = 0
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        with self._lock:
+            self._next_mid += 1
+            self.published.append((self._next_mid, topic, payload))
+            return SimpleNamespace(rc=0, mid=self._next_mid)
+
+    def acknowledge(self, mid):
+        self.on_publish(self, None, mid)
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_enqueue_drops_when_queue_is_full():
+    publisher = MqttPublisher(FakeClient(), max_queue=2, enqueue_timeout=0.01)
+
+    assert publisher.enqueue("a", "1")
+    assert publisher.enqueue("b", "2")
+    assert not publisher.enqueue("c", "3")
+    assert publisher.metrics.enqueued == 2
+    assert publisher.metrics.dropped == 1
+    assert publisher.metrics.max_queue_depth == 2
+
+def test_in_flight_window_holds_messages_until_acknowledged():
+    client = FakeClient()
+    publisher = MqttPublisher(client, max_inflight=2)
+    publisher.start()
+    try:
+        for i in range(5):
+            publisher.enqueue(f"topic/{i}", str(i))
+
+        assert wait_until(lambda: len(client.published) == 2)
+        time.sleep(0.1)
+        assert len(client.published) == 2
+        assert publisher.metrics.in_flight == 2
+
+        client.acknowledge(1)
+        assert wait_until(lambda: len(client.published) == 3)
+        assert publisher.metrics.window_waits >= 1
+    finally:
+        for mid in range(1, 6):
+            client.acknowledge(mid)
+        publisher.stop(timeout=2.0)
+
+def test_acknowledgements_flush_the_queue():
+    client = FakeClient()
+    publisher = MqttPublisher(client, max_inflight=1)
+    publisher.start()
+    try:
+        for i in range(4):
+            publisher.enqueue(f"topic/{i}", str(i))
+        for mid in range(1, 5):
+            assert wait_until(lambda: len(client.published) == mid)
+            client.acknowledge(mid)
+    finally:
+        publisher.stop(timeout=2.0)
+
+    assert [topic for _, topic, _ in client.published] == ["topic/0", "topic/1", "topic/2", "topic/3"]
+    assert publisher.metrics.published == 4
+    assert publisher.metrics.acknowledged == 4
+    assert publisher.metrics.in_flight == 0
+
+def test_window_timeout_forgets_pending_and_early_acknowledgements():
+    client = FakeClient()
+    publisher = MqttPublisher(client, max_inflight=1, window_timeout=0.05)
+    client.acknowledge(99)  # An acknowledgement for a message the publisher never saw
+    publisher.start()
+    try:
+        publisher.enqueue("a", "1")
+        publisher.enqueue("b", "2")
+        assert wait_until(lambda: len(client.published) == 2)
+    finally:
+        publisher.stop(timeout=2.0)
+
+    assert publisher._acknowledged_early == set()
+    assert publisher.metrics.window_waits == 1
+
+class RefusingClient(FakeClient):
+    """Accepts publishes into the queue but refuses them at the client, like paho while disconnected."""
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        with self._lock:
+            self.published.append((None, topic, payload))
+        return SimpleNamespace(rc=4, mid=None)
+
+def test_delta_publisher_retries_a_payload_the_client_refused():
+    client = RefusingClient()
+    publisher = MqttPublisher(client)
+    delta = DeltaPublisher(lambda topic, payload, retain, on_failure: publisher.enqueue(topic, payload, retain, on_failure=on_failure))
+    publisher.start()
+    try:
+        assert delta.publish("stats", b"1")
+        assert delta.publish_once("config", b"{}")
+        assert wait_until(lambda: publisher.metrics.failed == 2)
+        assert delta.publish("stats", b"1")
+        assert delta.publish_once("config", b"{}")
+    finally:
+        publisher.stop(timeout=2.0)
+
+def test_debounced_publisher_coalesces_a_burst_into_one_run():
+    runs = []
+    publisher = DebouncedPublisher(runs.append, delay=0.05, max_delay=1.0)
+    for event in range(5):
+        publisher.request(event)
+    assert wait_until(lambda: len(runs) == 1)
+    time.sleep(0.1)
+    assert runs == [[0, 1, 2, 3, 4]]
+
+    publisher.request()
+    assert wait_until(lambda: len(runs) == 2)
+    assert runs[1] == []
+
+def test_debounced_publisher_runs_by_max_delay_under_steady_requests():
+    runs = []
+    publisher = DebouncedPublisher(runs.append, delay=0.1, max_delay=0.2)
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        publisher.request("match")
+        time.sleep(0.02)
+    assert wait_until(lambda: sum(len(events) for events in runs) >= 20)
+    assert len(runs) >= 2
+
+def test_delta_publisher_skips_unchanged_payloads_until_forgotten():
+    sent = []
+    delta = DeltaPublisher(lambda topic, payload, retain, on_failure: sent.append((topic, payload, retain)) or True)
+
+    assert delta.publish("stats", b"1")
+    assert not delta.publish("stats", b"1")
+    assert delta.publish("stats", b"2")
+    assert delta.publish("other", b"2")
+    assert delta.publish_once("config", "{}")
+    assert not delta.publish_once("config", "{}")
+    delta.forget()
+    assert delta.publish("stats", b"2", retain=True)
+    assert delta.publish_once("config", "{}")
+    assert [topic for topic, _, _ in sent] == ["stats", "stats", "other", "config", "stats", "config"]
+    assert sent[-2] == ("stats", b"2", True)
+
+def test_delta_publisher_retries_when_the_send_is_refused():
+    accept = []
+    delta = DeltaPublisher(lambda topic, payload, retain, on_failure: bool(accept))
+
+    assert not delta.publish("stats", b"1")
+    assert not delta.publish_once("config", "{}")
+    accept.append(True)
+    assert delta.publish("stats", b"1")
+    assert delta.publish_once("config", "{}")
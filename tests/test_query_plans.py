@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from migrations import HOT_QUERIES, explain_hot_queries
+
+class PlanCursor:
+    """Answers every EXPLAIN with the same one-row plan."""
+
+    description = [("table",), ("type",), ("possible_keys",), ("key",)]
+
+    def __init__(self, row):
+        self.row = row
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return [self.row]
+
+def test_a_scan_counts_as_full_even_when_an_index_was_possible():
+    reports = explain_hot_queries(PlanCursor(("m", "ALL", "idx_matches_player1", None)))
+    assert all(full_scan for _, _, full_scan in reports)
+    reports = explain_hot_queries(PlanCursor(("m", "ref", "idx_matches_player1", "idx_matches_player1")))
+    assert not any(full_scan for _, _, full_scan in reports)
+
+@pytest.mark.skipif(not os.environ.get("DB_HOST"), reason="needs the MariaDB database (DB_HOST and friends)")
+def test_hot_queries_use_an_index():
+    from db import get_raw_connection
+
+    conn = get_raw_connection()
+    try:
+        cursor = conn.cursor()
+        reports = explain_hot_queries(cursor)
+    finally:
+        conn.close()
+    assert len(reports) == len(HOT_QUERIES)
+    assert [name for name, _, full_scan in reports if full_scan] == []
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from match_statistics import (
+    calculate_matches_played_in_stadium_class,
+    calculate_most_common_win_type_by_stadium_class,
+    calculate_win_percentage_by_stadium_class,
+)
+from models import Match, Player, Stadium, StadiumClass
+
+def add_matches(db):
+    db.add_all([
+        StadiumClass(id=1, name="Standard"),
+        StadiumClass(id=2, name="Xtreme"),
+        Stadium(stadium_id=1, stadium_name="Home", stadium_class_id=1),
+        Stadium(stadium_id=2, stadium_name="Away", stadium_class_id=1),
+        Stadium(stadium_id=3, stadium_name="Big", stadium_class_id=2),
+        Player(player_id=1, player_name="A"),
+        Player(player_id=2, player_name="B"),
+    ])
+    rows = [
+        (1, 1, "KO", False),
+        (2, 1, "KO", False),
+        (2, 2, "Burst", False),
+        (1, None, "Draw", True),
+        (3, 2, "Extreme", False),
+    ]
+    for match_id, (stadium_id, winner_id, finish_type, draw) in enumerate(rows, start=1):
+        db.add(Match(
+            match_id=match_id, player1_id=1, player2_id=2, stadium_id=stadium_id, winner_id=winner_id,
+            finish_type=finish_type, draw=draw, end_time=datetime(2024, 1, 1, 12, match_id),
+        ))
+    db.commit()
+
+def test_stadium_class_statistics_cover_every_stadium_of_the_class(db):
+    add_matches(db)
+
+    assert calculate_matches_played_in_stadium_class(db, 1) == 4
+    assert calculate_matches_played_in_stadium_class(db, 2) == 1
+    assert calculate_win_percentage_by_stadium_class(db, 1, "Player", 1) == 50.0
+    assert calculate_most_common_win_type_by_stadium_class(db, 1) == "KO"